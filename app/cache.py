@@ -0,0 +1,135 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve
+from app.metrics import registry, stage
+from app.store import STORE_VERSION, canonical
+
+# Псевдоним кэша ответов в settings.CACHES
+CACHE_ALIAS = 'responses'
+
+# Расчетные конечные точки, ответы которых кэшируются (результат определяется телом и форматом запроса)
+CACHED_ENDPOINTS = frozenset('/api/' + name for name in (
+    'plot0', 'batch', 'sensitivity', 'monte_carlo', 'optimize', 'inverse', 'transient', 'ipr', 'history_match',
+    'layers', 'compare'))
+
+# Заголовки ответа, не сохраняемые в кэше (добавляются заново при каждом запросе)
+SKIPPED_HEADERS = frozenset(('server-timing', 'set-cookie', 'etag', 'x-skin-cache'))
+
+
+def enabled() -> bool:
+    return getattr(settings, 'SKIN_CACHE', True)
+
+
+def request_key(request):
+    """
+    Ключ кэша: SHA-256 канонического представления конечной точки, формата ответа и тела запроса
+
+    Тело JSON приводится к каноническому виду (app.store.canonical: числа с KEY_DIGITS значащими
+    цифрами, без пустых значений, ключи по порядку), так что запросы, различающиеся записью
+    чисел и порядком полей, дают один ключ; тело не в формате JSON (NDJSON) учитывается побайтно.
+
+    :return: ключ либо None, если тело больше SKIN_CACHE_MAX_BODY
+    """
+    body = request.body
+    if len(body) > getattr(settings, 'SKIN_CACHE_MAX_BODY', 1_000_000):
+        return None
+    try:
+        inputs = canonical(json.loads(body))
+    except ValueError:
+        inputs = hashlib.sha256(body).hexdigest()
+    text = json.dumps({
+        'v': STORE_VERSION,
+        'path': request.path_info,
+        'query': sorted(request.GET.lists()),
+        'accept': request.headers.get('Accept', ''),
+        'content_type': request.content_type,
+        'inputs': inputs,
+    }, sort_keys=True, separators=(',', ':'))
+    return 'skin:' + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def etag_matches(request, etag: str) -> bool:
+    """
+    Проверка заголовка If-None-Match (слабое сравнение, "*" - любое значение)
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+def cached_response(request, entry: dict, result: str):
+    """
+    Ответ по записи кэша: полный либо 304 Not Modified при совпадении ETag
+    """
+    if etag_matches(request, entry['etag']):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for name, value in entry['headers']:
+            response[name] = value
+    response['ETag'] = entry['etag']
+    response['X-Skin-Cache'] = result
+    return response
+
+
+class ResponseCacheMiddleware:
+    """
+    Промежуточный слой кэширования ответов расчетных конечных точек
+
+    Успешные (200) нестриминговые ответы не больше SKIN_CACHE_MAX_BYTES сохраняются в кэше
+    settings.CACHES['responses'] (ограниченный по числу записей LocMemCache либо FileBasedCache)
+    по ключу request_key; повторный запрос получает сохраненный ответ без расчета. Ответ снабжается
+    заголовком ETag (хэш тела), при совпадении с If-None-Match возвращается 304 Not Modified.
+    Попадания и промахи учитываются в метрике skin_cache_total. При SKIN_CACHE = False не подключается.
+    """
+    def __init__(self, get_response) -> None:
+        if not enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method != 'POST' or request.path_info not in CACHED_ENDPOINTS:
+            return self.get_response(request)
+        key = request_key(request)
+        if key is None:
+            return self.get_response(request)
+        cache = caches[CACHE_ALIAS]
+        with stage(request, 'cache'):
+            entry = cache.get(key)
+        labels = (('endpoint', request.path_info),)
+        if entry is not None:
+            registry.count('skin_cache_total', labels + (('result', 'hit'),))
+            # метки метрик запроса: конечная точка и тип заканчивания, как при расчете
+            try:
+                request.resolver_match = resolve(request.path_info)
+            except Resolver404:
+                pass
+            if entry['type'] and getattr(request, 'skin_timings', None) is not None:
+                request.skin_type = entry['type']
+            return cached_response(request, entry, 'hit')
+        registry.count('skin_cache_total', labels + (('result', 'miss'),))
+        response = self.get_response(request)
+        if response.status_code != 200 or response.streaming or response.has_header('Set-Cookie'):
+            return response
+        content = response.content
+        entry = {
+            'status': response.status_code,
+            'headers': [(name, value) for name, value in response.items() if name.lower() not in SKIPPED_HEADERS],
+            'content': content,
+            'etag': '"' + hashlib.sha256(content).hexdigest()[:32] + '"',
+            'type': getattr(request, 'skin_type', ''),
+        }
+        if len(content) <= getattr(settings, 'SKIN_CACHE_MAX_BYTES', 5_000_000):
+            with stage(request, 'cache'):
+                cache.set(key, entry)
+        if etag_matches(request, entry['etag']):
+            return cached_response(request, entry, 'miss')
+        response['ETag'] = entry['etag']
+        response['X-Skin-Cache'] = 'miss'
+        return response
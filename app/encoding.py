@@ -0,0 +1,210 @@
+import base64
+import io
+import numpy as np
+from django.http import HttpResponse, StreamingHttpResponse
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Форматы ответа расчетных запросов:
+#   json     - числа в виде текста JSON (по умолчанию);
+#   base64   - JSON, массивы в виде {"dtype", "shape", "data"} с данными little-endian в base64;
+#   columnar - JSON со столбцами вместо списка строк (пакетный расчет);
+#   npy      - двоичный файл NumPy .npy со структурированным массивом (поле на столбец);
+#   arrow    - поток Apache Arrow IPC (требуется pyarrow)
+FORMATS = ('json', 'base64', 'columnar', 'npy', 'arrow')
+
+# Тип содержимого ответа для двоичных форматов; по заголовку Accept выбирается формат
+MEDIA_TYPES = {
+    'npy': 'application/x-npy',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# Разрядность чисел с плавающей точкой в двоичных форматах (порядок байт - little-endian)
+DTYPES = {'float64': '<f8', 'float32': '<f4'}
+
+
+def negotiate(request, allowed: tuple = FORMATS) -> tuple:
+    """
+    Выбор формата ответа по параметру запроса format или заголовку Accept
+
+    Parameters
+    ----------
+    :param request: запрос Django; параметры ?format=npy&dtype=float32;
+    :param allowed: форматы, поддерживаемые конечной точкой;
+
+    :return: (формат, тип чисел NumPy '<f8' или '<f4')
+
+    ----------
+    """
+    fmt = request.GET.get('format')
+    if fmt is None:
+        accept = request.headers.get('Accept', '')
+        fmt = next((name for name, media_type in MEDIA_TYPES.items() if media_type in accept), 'json')
+    if fmt not in allowed:
+        raise ValueError(f'неподдерживаемый формат ответа: {fmt}; допустимы {", ".join(allowed)}')
+    if fmt == 'arrow' and pyarrow is None:
+        raise ValueError('формат arrow недоступен: не установлен пакет pyarrow')
+    dtype = request.GET.get('dtype', 'float64')
+    if dtype not in DTYPES:
+        raise ValueError(f'неподдерживаемый тип чисел: {dtype}; допустимы {", ".join(DTYPES)}')
+    return fmt, DTYPES[dtype]
+
+
+def column_dtype(column: np.ndarray, dtype: str) -> np.dtype:
+    """
+    Тип столбца в двоичном представлении: числа с плавающей точкой - заданной разрядности,
+    целые - int64, логические - bool; порядок байт - little-endian
+    """
+    if column.dtype.kind in 'iu':
+        return np.dtype('<i8')
+    if column.dtype.kind == 'b':
+        return np.dtype('|b1')
+    return np.dtype(dtype)
+
+
+def response_part(request, parts: tuple) -> str:
+    """
+    Часть результата для двоичного ответа по параметру запроса part (по умолчанию - первая):
+    двоичный ответ содержит один набор столбцов, поэтому описание кривых запрашивается отдельно
+
+    :param parts: допустимые части, например ('points', 'table');
+    """
+    part = request.GET.get('part', parts[0])
+    if part not in parts:
+        raise ValueError(f'неизвестная часть результата: {part}; допустимы {", ".join(parts)}')
+    return part
+
+
+def records_columns(records: list, names: tuple) -> dict:
+    """
+    Столбцы по списку словарей (строк таблицы результата); None - nan
+    """
+    columns = {}
+    for name in names:
+        values = [record[name] for record in records]
+        if all(isinstance(value, int) for value in values):
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            columns[name] = np.array([np.nan if value is None else value for value in values], dtype=float)
+    return columns
+
+
+def b64_array(arr, dtype: str) -> dict:
+    """
+    Массив в виде {"dtype", "shape", "data"}: данные little-endian, закодированные в base64
+    """
+    arr = np.asarray(arr)
+    arr = np.ascontiguousarray(arr, dtype=column_dtype(arr, dtype))
+    return {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'data': base64.b64encode(arr.data).decode('ascii')}
+
+
+def b64_columns(columns: dict, dtype: str) -> dict:
+    return {name: b64_array(column, dtype) for name, column in columns.items()}
+
+
+def structured(columns: dict, dtype: str) -> np.ndarray:
+    """
+    Структурированный массив NumPy со столбцами в качестве полей
+    """
+    columns = {name: np.asarray(column) for name, column in columns.items()}
+    n = len(next(iter(columns.values()))) if columns else 0
+    arr = np.empty(n, dtype=[(name, column_dtype(column, dtype)) for name, column in columns.items()])
+    for name, column in columns.items():
+        arr[name] = column
+    return arr
+
+
+def npy_header(dtype: np.dtype, n: int) -> bytes:
+    """
+    Заголовок файла .npy для одномерного массива длины n (позволяет передавать данные потоком)
+    """
+    f = io.BytesIO()
+    np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                             'fortran_order': False, 'shape': (n,)})
+    return f.getvalue()
+
+
+def npy_bytes(columns: dict, dtype: str) -> bytes:
+    arr = structured(columns, dtype)
+    return npy_header(arr.dtype, len(arr)) + arr.tobytes()
+
+
+def arrow_batch(columns: dict, dtype: str):
+    return pyarrow.RecordBatch.from_pydict(
+        {name: np.asarray(column, dtype=column_dtype(np.asarray(column), dtype)) for name, column in columns.items()})
+
+
+def arrow_bytes(columns: dict, dtype: str) -> bytes:
+    return b''.join(arrow_stream(iter([columns]), dtype))
+
+
+def arrow_stream(chunks, dtype: str):
+    """
+    Поток Apache Arrow IPC: схема по первой порции, далее по пакету записей на порцию столбцов
+    """
+    sink = io.BytesIO()
+    writer = None
+    for columns in chunks:
+        batch = arrow_batch(columns, dtype)
+        if writer is None:
+            writer = pyarrow.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    if writer is not None:
+        writer.close()
+        yield sink.getvalue()
+
+
+def columns_response(columns: dict, fmt: str, dtype: str, headers: dict = None) -> HttpResponse:
+    """
+    Двоичный ответ (npy или arrow) со столбцами результата
+
+    Parameters
+    ----------
+    :param columns: словарь одномерных массивов одинаковой длины;
+    :param fmt: формат ответа: npy или arrow;
+    :param dtype: тип чисел с плавающей точкой ('<f8' или '<f4');
+    :param headers: дополнительные заголовки ответа (скалярные результаты расчета);
+
+    ----------
+    """
+    content = npy_bytes(columns, dtype) if fmt == 'npy' else arrow_bytes(columns, dtype)
+    response = HttpResponse(content, content_type=MEDIA_TYPES[fmt])
+    for name, value in (headers or {}).items():
+        response[name] = str(value)
+    return response
+
+
+def columns_stream(chunks, n: int, names: tuple, fmt: str, dtype: str) -> StreamingHttpResponse:
+    """
+    Потоковый двоичный ответ (npy или arrow) из порций столбцов
+
+    Parameters
+    ----------
+    :param chunks: итератор словарей столбцов (порции результата);
+    :param n: общее число строк (записывается в заголовок .npy до начала расчета);
+    :param names: имена столбцов в порядке вывода;
+    :param fmt: формат ответа: npy или arrow;
+    :param dtype: тип чисел с плавающей точкой ('<f8' или '<f4');
+
+    ----------
+    """
+    chunks = ({name: chunk[name] for name in names} for chunk in chunks)
+    if fmt == 'arrow':
+        return StreamingHttpResponse(arrow_stream(chunks, dtype), content_type=MEDIA_TYPES[fmt])
+
+    def stream():
+        header = None
+        for columns in chunks:
+            arr = structured(columns, dtype)
+            if header is None:
+                header = npy_header(arr.dtype, n)
+                yield header
+            yield arr.tobytes()
+
+    return StreamingHttpResponse(stream(), content_type=MEDIA_TYPES[fmt])
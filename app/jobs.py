@@ -0,0 +1,243 @@
+import math
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from app.encoding import npy_bytes
+from app.models import Job
+from app.store import calc_batch_stored
+from app.skin import monte_carlo as mc
+from app.skin import sweep as sw
+
+# Минимальный интервал между записями прогресса задачи в базу, с
+PROGRESS_INTERVAL = 0.5
+
+# Интервал подтверждения процессом своих незавершенных задач, с
+HEARTBEAT_INTERVAL = 10
+
+# Незавершенная задача без подтверждения дольше этого времени считается прерванной, с
+ORPHAN_TIMEOUT = 60
+
+# Предельное число узлов сетки фоновой задачи (больше - синхронный потоковый расчет /sweep)
+MAX_JOB_GRID_POINTS = 1_000_000
+
+ORPHAN_ERROR = 'задача прервана: процесс, выполнявший задачу, завершился (перезапуск или сбой)'
+
+
+class JobCancelled(Exception):
+    """
+    Задача отменена пользователем
+    """
+
+
+def check_batch(payload) -> None:
+    if not isinstance(payload, list):
+        raise ValueError('ожидается JSON-массив скважин')
+
+
+def check_sweep(payload) -> None:
+    args = sw.request_args(payload)
+    sw.sweep(**args)
+    size = sw.grid_size(args['axes'])
+    if size > MAX_JOB_GRID_POINTS:
+        raise ValueError(f'сетка слишком велика для фоновой задачи: {size} узлов (не более {MAX_JOB_GRID_POINTS}), '
+                         f'используйте потоковый расчет /sweep')
+
+
+def run_batch(payload, progress) -> dict:
+    results = calc_batch_stored(payload, progress)
+    n_errors = sum('error' in res for res in results)
+    return {'n_ok': len(results) - n_errors, 'n_errors': n_errors, 'results': results}
+
+
+def run_sweep(payload, progress) -> dict:
+    """
+    Расчет сетки: столбцы результата собираются в массивы и сохраняются двоично (Job.data, .npy)
+    """
+    args = sw.request_args(payload)
+    size, done, columns = sw.grid_size(args['axes']), 0, {}
+    for chunk in sw.sweep(**args):
+        n = len(chunk['S'])
+        for name, column in chunk.items():
+            columns.setdefault(name, np.empty(size))[done:done + n] = column
+        done += n
+        progress(done/size)
+    return {'type': args['type_'], 'axes': [axis['param'] for axis in args['axes']], 'size': size,
+            'columns': columns}
+
+
+def run_monte_carlo(payload, progress) -> dict:
+    return mc.monte_carlo(**mc.request_args(payload), progress=progress)
+
+
+# Вид задачи -> (функция проверки данных, функция расчета)
+RUNNERS = {
+    'batch': (check_batch, run_batch),
+    'sweep': (check_sweep, run_sweep),
+    'monte_carlo': (mc.request_args, run_monte_carlo),
+}
+
+
+def jsonable(value):
+    """
+    Замена нечисловых значений float (nan, inf) на None для записи результата в JSON-поле
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return value
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач на локальном пуле потоков
+
+    Метаданные, прогресс и результаты задач хранятся в базе (модель Job), поэтому
+    состояние задачи доступно любому процессу приложения без внешнего брокера.
+    Число одновременно выполняемых задач ограничено настройкой SKIN_JOBS_MAX_WORKERS.
+    Процесс раз в HEARTBEAT_INTERVAL подтверждает свои незавершенные задачи; задачи,
+    оставшиеся без подтверждения после перезапуска или сбоя процесса, завершаются с ошибкой.
+
+    submit - постановка задачи в очередь
+
+    cancel - отмена задачи
+
+    recover - завершение прерванных задач
+    """
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self.worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.executor = None
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.recovered = False
+
+    def submit(self, kind: str, payload) -> Job:
+        """
+        Метод проверки данных и постановки задачи в очередь
+
+        :param kind: вид задачи (batch, sweep, monte_carlo);
+        :param payload: данные задачи в формате соответствующего синхронного запроса;
+        """
+        if kind not in RUNNERS:
+            raise ValueError(f'неизвестный вид задачи: {kind}; допустимы {", ".join(RUNNERS)}')
+        RUNNERS[kind][0](payload)
+        self.recover()
+        job = Job.objects.create(kind=kind, payload=payload, worker=self.worker, heartbeat=timezone.now())
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='skin-job')
+                threading.Thread(target=self._heartbeat, name='skin-job-heartbeat', daemon=True).start()
+            self.futures[job.id] = self.executor.submit(self._run, job.id)
+        return job
+
+    def get(self, job_id):
+        """
+        Метод получения задачи: прерванная задача (см. recover) завершается с ошибкой
+
+        :return: задача Job либо None
+        """
+        self.recover()
+        job = Job.objects.filter(id=job_id).first()
+        if job is not None and job.status in (Job.QUEUED, Job.RUNNING) and self.recover(job_id):
+            job.refresh_from_db()
+        return job
+
+    def recover(self, job_id=None) -> int:
+        """
+        Метод завершения с ошибкой задач, прерванных перезапуском или сбоем выполнявшего их процесса:
+        незавершенных задач других процессов без подтверждения дольше ORPHAN_TIMEOUT. Без job_id
+        выполняется один раз при первом обращении процесса к очереди.
+
+        :param job_id: проверяемая задача (по умолчанию - все задачи);
+
+        :return: число завершенных задач
+        """
+        if job_id is None:
+            if self.recovered:
+                return 0
+            self.recovered = True
+        now = timezone.now()
+        jobs = Job.objects.filter(status__in=(Job.QUEUED, Job.RUNNING)).exclude(worker=self.worker).filter(
+            Q(heartbeat__isnull=True) | Q(heartbeat__lt=now - timedelta(seconds=ORPHAN_TIMEOUT)))
+        if job_id is not None:
+            jobs = jobs.filter(id=job_id)
+        return jobs.update(status=Job.FAILED, finished=now, error=ORPHAN_ERROR)
+
+    def cancel(self, job_id) -> Job:
+        """
+        Метод отмены задачи: задача в очереди снимается сразу, выполняемая - после текущей порции расчета
+        """
+        Job.objects.filter(id=job_id, status__in=(Job.QUEUED, Job.RUNNING)).update(cancel_requested=True)
+        with self.lock:
+            future = self.futures.get(job_id)
+        if future is not None and future.cancel():
+            self._finish(job_id, Job.CANCELLED)
+        return self.get(job_id)
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            with self.lock:
+                active = list(self.futures)
+            if not active:
+                continue
+            try:
+                Job.objects.filter(id__in=active, status__in=(Job.QUEUED, Job.RUNNING)).update(
+                    heartbeat=timezone.now())
+            except DatabaseError:
+                pass
+            finally:
+                close_old_connections()
+
+    def _run(self, job_id) -> None:
+        close_old_connections()
+        try:
+            job = Job.objects.get(id=job_id)
+            if job.cancel_requested:
+                self._finish(job_id, Job.CANCELLED)
+                return
+            now = timezone.now()
+            Job.objects.filter(id=job_id).update(status=Job.RUNNING, started=now, heartbeat=now)
+            last = [0.0]
+
+            def progress(fraction):
+                now = time.monotonic()
+                if now - last[0] < PROGRESS_INTERVAL and fraction < 1:
+                    return
+                last[0] = now
+                Job.objects.filter(id=job_id).update(progress=fraction)
+                if Job.objects.filter(id=job_id, cancel_requested=True).exists():
+                    raise JobCancelled()
+
+            result = RUNNERS[job.kind][1](job.payload, progress)
+            # столбцы массивов (сетка) хранятся двоично, остальной результат - в JSON-поле
+            columns = result.pop('columns', None)
+            data = None if columns is None else npy_bytes(columns, '<f8')
+            self._finish(job_id, Job.DONE, result=jsonable(result), data=data, progress=1)
+        except JobCancelled:
+            self._finish(job_id, Job.CANCELLED)
+        except Exception as e:
+            self._finish(job_id, Job.FAILED, error=f'{e}\n{traceback.format_exc()}' if settings.DEBUG else str(e))
+        finally:
+            with self.lock:
+                self.futures.pop(job_id, None)
+            close_old_connections()
+
+    def _finish(self, job_id, status, **fields) -> None:
+        Job.objects.filter(id=job_id).update(status=status, finished=timezone.now(), **fields)
+
+
+queue = JobQueue(getattr(settings, 'SKIN_JOBS_MAX_WORKERS', 2))
@@ -0,0 +1,249 @@
+import bisect
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, Http404
+from ninja import NinjaAPI
+from ninja.renderers import JSONRenderer
+
+# Границы интервалов гистограмм длительности, с
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def enabled() -> bool:
+    return getattr(settings, 'SKIN_METRICS', True)
+
+
+class Histogram:
+    """
+    Гистограмма длительностей в формате Prometheus (накопленные счетчики по интервалам, сумма, число)
+    """
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self) -> None:
+        self.counts = [0]*(len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Хранилище метрик процесса приложения
+
+    Метрики накапливаются в памяти каждого процесса (воркера) отдельно; Prometheus
+    опрашивает процессы независимо и суммирует значения при запросе.
+
+    observe - учет длительности запроса и его этапов
+
+    count - увеличение счетчика
+
+    render - вывод метрик в текстовом формате Prometheus
+    """
+    def __init__(self) -> None:
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        with self.lock:
+            histogram = self.histograms.setdefault((name, labels), Histogram())
+            histogram.observe(value)
+
+    def count(self, name: str, labels: tuple, value: float = 1) -> None:
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in self.histograms.items())
+            counters = sorted(self.counters.items())
+        described = set()
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in described:
+                described.add(name)
+                lines += [f'# HELP {name} {HELP.get(name, name)}', f'# TYPE {name} histogram']
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                lines += [f'# HELP {name} {HELP.get(name, name)}', f'# TYPE {name} counter']
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+HELP = {
+    'skin_request_duration_seconds': 'Длительность обработки запроса API, с',
+    'skin_stage_duration_seconds': 'Длительность этапа обработки запроса API, с',
+    'skin_requests_total': 'Число запросов API',
+    'skin_errors_total': 'Число ошибок запросов API по видам',
+    'skin_store_total': 'Число обращений к хранилищу сценариев по результату (hit, miss)',
+    'skin_cache_total': 'Число обращений к кэшу ответов по конечной точке и результату (hit, miss)',
+}
+
+registry = Registry()
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels) + '}'
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Stage:
+    """
+    Измерение длительности этапа обработки запроса (контекстный менеджер)
+    """
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings: list, name: str) -> None:
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.timings.append((self.name, time.perf_counter() - self.start))
+
+
+class NullStage:
+    """
+    Пустой контекстный менеджер, используемый при отключенных метриках
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+def stage(request, name: str):
+    """
+    Контекстный менеджер измерения этапа обработки запроса
+
+    Parameters
+    ----------
+    :param request: запрос Django;
+    :param name: имя этапа (выводится в заголовке Server-Timing и метке stage);
+
+    :return: Stage либо пустой контекстный менеджер, если метрики отключены
+
+    ----------
+    """
+    timings = getattr(request, 'skin_timings', None)
+    if timings is None:
+        return NULL_STAGE
+    return Stage(timings, name)
+
+
+def mark(request, name: str) -> None:
+    """
+    Учет этапа, длящегося от начала обработки запроса до текущего момента (например,
+    разбор и проверка тела запроса, выполняемые ninja до вызова представления)
+    """
+    timings = getattr(request, 'skin_timings', None)
+    if timings is not None:
+        timings.append((name, time.perf_counter() - request.skin_start))
+
+
+def set_type(request, type_) -> None:
+    """
+    Привязка запроса к типу заканчивания скважины (метка type)
+    """
+    if getattr(request, 'skin_timings', None) is not None:
+        request.skin_type = str(int(type_))
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер ninja с измерением этапа сериализации ответа
+    """
+    def render(self, request, data, *, response_status):
+        with stage(request, 'serialize'):
+            return self.dumps(data)
+
+    def dumps(self, data):
+        return json.dumps(data, cls=self.encoder_class, **self.json_dumps_params)
+
+
+class InstrumentedAPI(NinjaAPI):
+    """
+    NinjaAPI с измерением сериализации ответа и учетом вида исключений в метриках ошибок
+    """
+    def __init__(self, *args, renderer=None, **kwargs) -> None:
+        super().__init__(*args, renderer=renderer or TimedJSONRenderer(), **kwargs)
+
+    def on_exception(self, request, exc):
+        if getattr(request, 'skin_timings', None) is not None:
+            request.skin_error = type(exc).__name__
+        return super().on_exception(request, exc)
+
+
+class MetricsMiddleware:
+    """
+    Промежуточный слой учета длительности запросов API
+
+    Добавляет к ответу заголовок Server-Timing с длительностями этапов и учитывает
+    запрос в гистограммах и счетчиках. При SKIN_METRICS = False не подключается.
+    """
+    def __init__(self, get_response) -> None:
+        if not enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+        request.skin_timings = timings = []
+        request.skin_start = start = time.perf_counter()
+        response = self.get_response(request)
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        endpoint = '/' + match.route if match is not None else 'unmatched'
+        labels = (('endpoint', endpoint), ('type', getattr(request, 'skin_type', '')))
+        registry.observe('skin_request_duration_seconds', labels, total)
+        for name, duration in timings:
+            registry.observe('skin_stage_duration_seconds', labels + (('stage', name),), duration)
+        registry.count('skin_requests_total', labels + (('status', response.status_code),))
+        if response.status_code >= 400:
+            error = getattr(request, 'skin_error', None) or f'http_{response.status_code}'
+            registry.count('skin_errors_total', labels + (('error', error),))
+        response['Server-Timing'] = ', '.join(
+            [f'{name};dur={duration*1000:.3f}' for name, duration in timings] + [f'total;dur={total*1000:.3f}'])
+        return response
+
+    def process_exception(self, request, exception) -> None:
+        if getattr(request, 'skin_timings', None) is not None:
+            request.skin_error = type(exception).__name__
+
+
+def metrics(request):
+    """
+    Метрики приложения в текстовом формате Prometheus
+    """
+    if not enabled():
+        raise Http404()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
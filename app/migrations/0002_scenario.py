@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scenario',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('kind', models.CharField(max_length=16)),
+                ('type', models.PositiveSmallIntegerField()),
+                ('inputs', models.JSONField()),
+                ('S', models.FloatField()),
+                ('skin', models.JSONField(default=dict)),
+                ('q', models.FloatField(null=True)),
+                ('r_arr', models.BinaryField(null=True)),
+                ('p_arr', models.BinaryField(null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('used', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
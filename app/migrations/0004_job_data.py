@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='data',
+            field=models.BinaryField(null=True),
+        ),
+    ]
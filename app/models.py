@@ -1,3 +1,62 @@
+import uuid
 from django.db import models
 
-# Create your models here.
+
+class Job(models.Model):
+    """
+    Фоновая задача расчета (пакетный расчет, сетка, Монте-Карло)
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUSES = [(status, status) for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED, db_index=True)
+    progress = models.FloatField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    payload = models.JSONField()
+    result = models.JSONField(null=True, blank=True)
+    # столбцы результата (сетка) в формате .npy: структурированный массив little-endian
+    data = models.BinaryField(null=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # процесс, выполняющий задачу, и время его последнего подтверждения (см. JobQueue.recover)
+    worker = models.CharField(max_length=128, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+
+    def as_dict(self) -> dict:
+        return {
+            'id': str(self.id),
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'created': self.created.isoformat(),
+            'started': self.started.isoformat() if self.started else None,
+            'finished': self.finished.isoformat() if self.finished else None,
+        }
+
+
+class Scenario(models.Model):
+    """
+    Сохраненный результат расчета скважины, найденный по хэшу канонического представления входных данных
+    (app.store): скин-фактор с составляющими, дебит и профиль давления
+    """
+    key = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=16)
+    type = models.PositiveSmallIntegerField()
+    inputs = models.JSONField()
+    S = models.FloatField()
+    skin = models.JSONField(default=dict)
+    q = models.FloatField(null=True)
+    r_arr = models.BinaryField(null=True)
+    p_arr = models.BinaryField(null=True)
+    hits = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    used = models.DateTimeField(db_index=True)
@@ -0,0 +1,44 @@
+import numpy as np
+from ninja.responses import NinjaJSONEncoder
+from app.metrics import TimedJSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class NumpyJSONEncoder(NinjaJSONEncoder):
+    """
+    Кодировщик JSON стандартной библиотеки с поддержкой массивов и скаляров NumPy
+    """
+    def default(self, o):
+        if isinstance(o, np.ndarray):
+            return np.where(np.isfinite(o), o, None).tolist() if o.dtype.kind == 'f' else o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return super().default(o)
+
+
+def orjson_default(o):
+    """
+    Типы, не поддерживаемые orjson напрямую (массивы с нестандартным размещением, Decimal и т.п.)
+    """
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    return NinjaJSONEncoder().default(o)
+
+
+class NumpyJSONRenderer(TimedJSONRenderer):
+    """
+    Рендерер JSON, сериализующий массивы NumPy напрямую, без перевода в списки Python
+
+    Использует orjson (OPT_SERIALIZE_NUMPY), если он установлен; иначе - стандартный json
+    с NumpyJSONEncoder. Нечисловые значения (nan, inf) выводятся как null.
+    """
+    encoder_class = NumpyJSONEncoder
+
+    def dumps(self, data):
+        if orjson is None:
+            return super().dumps(data)
+        return orjson.dumps(data, default=orjson_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,166 @@
+from typing import Annotated, Literal, Optional, Union
+from pydantic import BaseModel, Discriminator, Field, Tag, field_validator, model_validator
+from app.skin.completions import check_phi
+
+Positive = Annotated[float, Field(gt=0)]
+Model = Annotated[int, Field(ge=0, le=1, description='0 - Papatzacos / Cinco-Ley, 1 - Vrbik / Ozkan')]
+
+
+class WellIn(BaseModel):
+    """
+    Общие параметры запроса plot0: пласт, флюид, забойное давление и сетка профиля давления
+
+    Пустые строки (скрытые поля формы) считаются незаданными значениями. Схемы наследуют
+    pydantic.BaseModel, а не ninja.Schema: проверка "before" получает тело запроса как есть (dict).
+    """
+    type: int
+    k: Positive
+    h: Positive
+    Pres: float
+    Pwf: float
+    mu: Positive
+    B: Positive
+    re: Positive
+    rw: Positive
+    n_points: Optional[int] = Field(None, ge=2, le=5000)
+    r_max: Optional[Positive] = None
+    spacing: Literal['log', 'linear', 'adaptive'] = 'log'
+
+    @model_validator(mode='before')
+    @classmethod
+    def drop_empty(cls, data):
+        if isinstance(data, dict):
+            return {key: value for key, value in data.items() if value not in ('', None)}
+        return data
+
+    @model_validator(mode='after')
+    def radii(self):
+        if not self.re > self.rw:
+            raise ValueError('радиус контура питания re должен быть больше радиуса скважины rw')
+        if self.r_max is not None and not self.r_max > self.rw:
+            raise ValueError('внешний радиус профиля r_max должен быть больше радиуса скважины rw')
+        return self
+
+
+class DamageIn(WellIn):
+    kd: Positive
+    rd: Positive
+
+
+class PartialIn(DamageIn):
+    hw: Positive
+    zw: float
+    kv: Positive
+
+
+class PerforationIn(DamageIn):
+    phi: float
+    Lp: Positive
+    rp: Positive
+    ns: Positive
+    kv: Positive
+    kcz: Positive
+    rcz: Positive
+
+    @field_validator('phi')
+    @classmethod
+    def known_phi(cls, phi):
+        if not check_phi(phi):
+            raise ValueError('фазировка отсутствует в таблице Karakas-Tariq (0, 45, 60, 90, 120, 180, 360)')
+        return phi
+
+
+class UncasedPerfectIn(DamageIn):
+    """
+    10 - совершенная по степени вскрытия вертикальная скважина
+    """
+
+
+class UncasedPartialIn(PartialIn):
+    """
+    11 - несовершенная по степени вскрытия вертикальная скважина
+    """
+    model: Model
+    y: Positive = 1
+
+
+class PerfFullIn(PerforationIn):
+    """
+    20 - полностью перфорированная вертикальная скважина
+    """
+
+
+class PerfPartialIn(PerforationIn):
+    """
+    21 - частично перфорированная вертикальная скважина
+    """
+    model: Model
+    hw: Positive
+    zw: float
+    y: Positive = 1
+
+
+class DirectionalPerfectIn(PartialIn):
+    """
+    30 - совершенная по степени вскрытия необсаженная наклонно-направленная скважина
+    """
+    model: Model
+    teta: float
+
+
+class DirectionalPartialIn(PartialIn):
+    """
+    31 - несовершенная по степени вскрытия наклонно-направленная скважина
+    """
+    teta: float
+    Lwpc: Positive
+
+
+class DirectionalPerfFullIn(PerforationIn):
+    """
+    40 - полностью перфорированная наклонно-направленная скважина
+    """
+    model: Model
+    teta: float
+    hw: Positive
+    zw: float
+
+
+class DirectionalPerfPartialIn(PerforationIn):
+    """
+    41 - частично перфорированная наклонно-направленная скважина
+    """
+    teta: float
+    hw: Positive
+    zw: float
+
+
+# Тип заканчивания -> схема входных данных
+WELL_SCHEMAS = {
+    10: UncasedPerfectIn,
+    11: UncasedPartialIn,
+    20: PerfFullIn,
+    21: PerfPartialIn,
+    30: DirectionalPerfectIn,
+    31: DirectionalPartialIn,
+    40: DirectionalPerfFullIn,
+    41: DirectionalPerfPartialIn,
+}
+
+
+def well_type(data) -> Optional[str]:
+    """
+    Определение схемы по полю type (число или строка, как его передает форма)
+    """
+    value = data.get('type') if isinstance(data, dict) else getattr(data, 'type', None)
+    try:
+        return str(int(float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+Plot0In = Annotated[
+    Union[tuple(Annotated[schema, Tag(str(type_))] for type_, schema in WELL_SCHEMAS.items())],
+    Discriminator(well_type, custom_error_type='invalid_type',
+                  custom_error_message=f'неизвестный тип заканчивания; допустимы {", ".join(map(str, WELL_SCHEMAS))}'),
+]
@@ -0,0 +1,41 @@
+"""
+Пакетный расчет скин-фактора и дебита для файла скважин без запуска Django
+
+    python -m app.skin wells.csv -o result.csv                - все ядра, порции по 100000 строк
+    python -m app.skin wells.parquet -o result.parquet -j 4   - Parquet (требуется pyarrow)
+    python -m app.skin wells.csv -o result.csv --delimiter ';' --chunk-size 50000
+
+Заголовок входного файла - имена параметров, как в запросе plot0 (type, k, h, Pres, ...);
+пустые ячейки - незаданные значения. Результат: index, type, S, q, составляющие скин-фактора, error.
+"""
+import argparse
+import json
+import sys
+from .bulk import CHUNK_SIZE, progress_report, run_file
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.skin', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='входной файл CSV либо Parquet')
+    parser.add_argument('-o', '--output', required=True, help='файл результатов CSV либо Parquet (по расширению)')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='число процессов (по умолчанию - число ядер)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='число строк в порции')
+    parser.add_argument('--delimiter', default=',', help='разделитель полей CSV')
+    parser.add_argument('-q', '--quiet', action='store_true', help='без вывода хода расчета')
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1 or (args.processes is not None and args.processes < 1):
+        parser.error('размер порции и число процессов должны быть положительными')
+
+    try:
+        summary = run_file(args.input, args.output, args.chunk_size, args.processes, args.delimiter,
+                           None if args.quiet else progress_report())
+    except (OSError, ValueError) as e:
+        print(f'ошибка: {e}', file=sys.stderr)
+        return 2
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import math as m
+import numpy as np
+from .completions import COMPLETIONS, DEFAULTS, RATE_FIELDS, calc_skin, calc_rate, check_phi, required_fields
+from .kernel import KT_PHI
+
+
+def coerce_value(value):
+    """
+    Приведение значения параметра к float: пустая строка и None - отсутствующее значение
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError('логическое значение вместо числа')
+    return float(value)
+
+
+def row_type(row: dict) -> int:
+    """
+    Тип заканчивания строки (целая часть числа, как int())
+    """
+    try:
+        return int(coerce_value(row.get('type')))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'некорректный тип заканчивания: {row.get("type")!r}')
+
+
+def validate_row(row: dict) -> tuple:
+    """
+    Валидация параметров одной скважины
+
+    Parameters
+    ----------
+    :param row: словарь параметров скважины (как в запросе plot0);
+
+    :return: (тип заканчивания, словарь параметров, приведенных к float)
+
+    ----------
+    """
+    if not isinstance(row, dict):
+        raise ValueError('строка должна быть JSON-объектом')
+    type_ = row_type(row)
+    if type_ not in COMPLETIONS:
+        raise ValueError(f'неизвестный тип заканчивания: {type_}')
+    values, missing = {}, []
+    for field in required_fields(type_) + tuple(DEFAULTS):
+        try:
+            value = coerce_value(row.get(field))
+        except (TypeError, ValueError):
+            raise ValueError(f'параметр {field} должен быть числом: {row.get(field)!r}')
+        if value is None:
+            if field not in DEFAULTS:
+                missing.append(field)
+        elif not m.isfinite(value):
+            raise ValueError(f'параметр {field} должен быть конечным числом')
+        else:
+            values[field] = value
+    if missing:
+        raise ValueError(f'не заданы обязательные параметры: {", ".join(missing)}')
+    if 'phi' in COMPLETIONS[type_][2] and not check_phi(values['phi']):
+        raise ValueError(f'неизвестная фазировка перфорационных зарядов: {values["phi"]}')
+    return type_, values
+
+
+def calc_group(type_: int, rows: list) -> tuple:
+    """
+    Расчет скин-фактора и дебита для группы скважин одного типа заканчивания за один проход
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания;
+    :param rows: список словарей параметров, прошедших валидацию;
+
+    :return: (словарь массивов составляющих скин-фактора, массив дебитов)
+
+    ----------
+    """
+    fields = {field for row in rows for field in row}
+    cols = {field: np.array([row.get(field, DEFAULTS.get(field, np.nan)) for row in rows]) for field in fields}
+    with np.errstate(all='ignore'):
+        skin = calc_skin(type_, cols)
+        q = calc_rate(cols, skin['S'])
+    return skin, q
+
+
+def calc_batch(rows: list, progress=None) -> list:
+    """
+    Пакетный расчет скин-фактора и дебита для множества скважин разных типов заканчивания
+
+    Строки группируются по типу заканчивания, каждая группа рассчитывается векторизованно.
+    Ошибки валидации и расчета возвращаются построчно и не прерывают расчет остальных скважин.
+
+    Parameters
+    ----------
+    :param rows: список словарей параметров скважин (как в запросе plot0);
+        элемент списка может быть исключением - ошибкой разбора соответствующей строки;
+    :param progress: функция, вызываемая с долей выполненной работы после расчета каждой группы;
+
+    :return: список результатов в порядке входных строк: {"index", "type", "S", "skin", "q"}
+        либо {"index", "type" (если задан числом), "error"}
+
+    ----------
+    """
+    results = [None]*len(rows)
+    groups = {}
+    for i, row in enumerate(rows):
+        if isinstance(row, Exception):
+            results[i] = {'index': i, 'error': str(row)}
+            continue
+        try:
+            type_, values = validate_row(row)
+        except ValueError as e:
+            results[i] = {'index': i, 'error': str(e)}
+            # тип заканчивания строки с ошибкой - если он задан числом (в том числе неизвестный)
+            try:
+                results[i]['type'] = row_type(row)
+            except (ValueError, AttributeError):
+                pass
+            continue
+        groups.setdefault(type_, ([], []))
+        groups[type_][0].append(i)
+        groups[type_][1].append(values)
+    done = len(rows) - sum(len(index) for index, _ in groups.values())
+    for type_, (index, values) in groups.items():
+        skin, q = calc_group(type_, values)
+        for j, i in enumerate(index):
+            if not (np.isfinite(skin['S'][j]) and np.isfinite(q[j])):
+                results[i] = {'index': i, 'type': type_, 'error': 'расчет не дал конечного результата, проверьте параметры'}
+                continue
+            results[i] = {
+                'index': i,
+                'type': type_,
+                'S': float(skin['S'][j]),
+                'skin': {name: float(value[j]) for name, value in skin.items() if name != 'S'},
+                'q': float(q[j]),
+            }
+        done += len(index)
+        if progress:
+            progress(done/len(rows))
+    return results
+
+
+# Составляющие скин-фактора в столбцовом представлении результатов пакетного расчета
+SKIN_COMPONENTS = ('Sd', 'Sp', 'Scz', 'Spp', 'Steta', 'Sopp')
+
+
+def batch_columns(results: list) -> tuple:
+    """
+    Перевод результатов calc_batch в столбцовое представление
+
+    Parameters
+    ----------
+    :param results: список результатов calc_batch;
+
+    :return: (словарь массивов index, type (0 - тип не определен), S, q и составляющих скин-фактора
+        (nan - составляющая не входит в расчет либо строка с ошибкой), словарь ошибок {индекс: сообщение})
+
+    ----------
+    """
+    n = len(results)
+    columns = {'index': np.arange(n), 'type': np.zeros(n, dtype=np.int64)}
+    for name in ('S', 'q') + SKIN_COMPONENTS:
+        columns[name] = np.full(n, np.nan)
+    errors = {}
+    for i, res in enumerate(results):
+        columns['type'][i] = res.get('type', 0)
+        if 'error' in res:
+            errors[i] = res['error']
+            continue
+        columns['S'][i] = res['S']
+        columns['q'][i] = res['q']
+        for name, value in res['skin'].items():
+            columns[name][i] = value
+    return columns, errors
+
+
+def column_errors(type_: int, rows: np.ndarray, sub: dict, invalid: dict) -> dict:
+    """
+    Ошибки проверки параметров строк одного типа заканчивания - те же, что у validate_row:
+    первый по порядку нечисловой или бесконечный параметр, иначе список незаданных обязательных
+
+    :param rows: номера строк группы;
+    :param sub: столбцы параметров группы (до подстановки значений по умолчанию);
+    :param invalid: {параметр: {номер строки: исходное значение}} - значения, не являющиеся числом;
+
+    :return: {номер строки: сообщение}
+    """
+    fields = required_fields(type_) + tuple(DEFAULTS)
+    hard = np.zeros((rows.size, len(fields)), dtype=bool)
+    missing = np.zeros((rows.size, len(fields)), dtype=bool)
+    for j, field in enumerate(fields):
+        marked = np.isin(rows, list(invalid.get(field) or ()))
+        hard[:, j] = marked | np.isinf(sub[field])
+        if field not in DEFAULTS:
+            missing[:, j] = ~marked & np.isnan(sub[field])
+    errors = {}
+    for k in np.flatnonzero(hard.any(axis=1) | missing.any(axis=1)):
+        row = int(rows[k])
+        if hard[k].any():
+            field = fields[int(np.argmax(hard[k]))]
+            raw = invalid.get(field, {}).get(row)
+            try:
+                coerce_value(raw)
+                errors[row] = f'параметр {field} должен быть конечным числом'
+            except (TypeError, ValueError):
+                errors[row] = f'параметр {field} должен быть числом: {raw!r}'
+        else:
+            names = [field for field, flag in zip(fields, missing[k]) if flag]
+            errors[row] = f'не заданы обязательные параметры: {", ".join(names)}'
+    return errors
+
+
+def calc_columns(cols: dict, invalid: dict = None) -> tuple:
+    """
+    Пакетный расчет по столбцам параметров (без построчных словарей): строки группируются по типу
+    заканчивания, проверка обязательных параметров и расчет выполняются над массивами.
+    Результаты и тексты ошибок - те же, что у calc_batch (через batch_columns).
+
+    Parameters
+    ----------
+    :param cols: словарь столбцов float одинаковой длины: type и параметры скважин
+        (nan - значение не задано);
+    :param invalid: {параметр: {номер строки: исходное значение}} - значения, которые не удалось
+        привести к числу (в столбце - nan), и нечисловые записи вида "nan";
+
+    :return: (столбцы в формате batch_columns, словарь ошибок {индекс строки: сообщение})
+
+    ----------
+    """
+    invalid = invalid or {}
+    raw_types = np.asarray(cols['type'], dtype=float)
+    n = len(raw_types)
+    # тип - целая часть числа, как int() в validate_row
+    typed = np.isfinite(raw_types) & (np.abs(raw_types) < 2.0**63)
+    typed[list(invalid.get('type') or ())] = False
+    types = np.where(typed, np.trunc(raw_types), np.nan)
+    columns = {'index': np.arange(n), 'type': np.where(typed, types, 0).astype(np.int64)}
+    for name in ('S', 'q') + SKIN_COMPONENTS:
+        columns[name] = np.full(n, np.nan)
+    errors = {}
+    for i in np.flatnonzero(~typed):
+        raw = invalid.get('type', {}).get(int(i), None if np.isnan(raw_types[i]) else float(raw_types[i]))
+        errors[int(i)] = f'некорректный тип заканчивания: {raw!r}'
+    known = ~typed
+    for type_ in COMPLETIONS:
+        rows = np.flatnonzero(types == type_)
+        if not rows.size:
+            continue
+        known[rows] = True
+        sub = {field: np.asarray(cols[field], dtype=float)[rows] if field in cols else np.full(rows.size, np.nan)
+               for field in required_fields(type_) + tuple(DEFAULTS)}
+        failed = column_errors(type_, rows, sub, invalid)
+        errors.update(failed)
+        bad = np.isin(rows, list(failed))
+        for field, default in DEFAULTS.items():
+            sub[field] = np.where(np.isnan(sub[field]), default, sub[field])
+        if 'phi' in COMPLETIONS[type_][2]:
+            wrong = ~bad & ~np.isin(sub['phi'], KT_PHI)
+            for j in np.flatnonzero(wrong):
+                errors[int(rows[j])] = f'неизвестная фазировка перфорационных зарядов: {sub["phi"][j]}'
+            bad |= wrong
+        good = ~bad
+        if not good.any():
+            continue
+        with np.errstate(all='ignore'):
+            skin = calc_skin(type_, {field: value[good] for field, value in sub.items()})
+            q = calc_rate({field: sub[field][good] for field in RATE_FIELDS}, skin['S'])
+        target = rows[good]
+        columns['S'][target] = skin['S']
+        columns['q'][target] = q
+        for name, value in skin.items():
+            if name != 'S':
+                columns[name][target] = value
+        for j in np.flatnonzero(~(np.isfinite(skin['S']) & np.isfinite(q))):
+            errors[int(target[j])] = 'расчет не дал конечного результата, проверьте параметры'
+    for i in np.flatnonzero(~known):
+        errors[int(i)] = f'неизвестный тип заканчивания: {int(types[i])}'
+    for i in errors:
+        columns['S'][i] = columns['q'][i] = np.nan
+        for name in SKIN_COMPONENTS:
+            columns[name][i] = np.nan
+    return columns, errors
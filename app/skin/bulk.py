@@ -0,0 +1,305 @@
+import csv
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .batch import SKIN_COMPONENTS, calc_columns, coerce_value
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Число строк в порции чтения и расчета
+CHUNK_SIZE = 100_000
+
+# Число порций в обработке на один процесс (ограничивает потребление памяти)
+CHUNKS_PER_PROCESS = 2
+
+# Минимальный интервал между сообщениями о ходе расчета, с
+PROGRESS_INTERVAL = 0.5
+
+# Столбцы результата
+OUTPUT_COLUMNS = ('index', 'type', 'S', 'q') + SKIN_COMPONENTS + ('error',)
+
+
+def file_format(path: str) -> str:
+    """
+    Формат файла по расширению: parquet (.parquet, .pq) либо csv
+    """
+    fmt = 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+    if fmt == 'parquet' and pyarrow is None:
+        raise ValueError('для файлов Parquet требуется пакет pyarrow')
+    return fmt
+
+
+def read_csv(path: str, chunk_size: int, delimiter: str = ','):
+    """
+    Чтение CSV порциями строк без разбора (разбор выполняется в процессах расчета)
+
+    :return: генератор (порция, доля прочитанного файла); порция - ('csv', заголовок, строки, разделитель)
+    """
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8-sig')], delimiter=delimiter))
+        header = [name.strip() for name in header]
+        if 'type' not in header:
+            raise ValueError('в заголовке CSV нет столбца type')
+        lines = []
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= chunk_size:
+                yield ('csv', header, lines, delimiter), f.tell()/size
+                lines = []
+        if lines:
+            yield ('csv', header, lines, delimiter), 1.0
+
+
+def read_parquet(path: str, chunk_size: int):
+    """
+    Чтение Parquet порциями записей
+
+    :return: генератор (порция, доля прочитанных строк); порция - ('columns', словарь массивов)
+    """
+    parquet = pyarrow.parquet.ParquetFile(path)
+    total, done = parquet.metadata.num_rows or 1, 0
+    for batch in parquet.iter_batches(batch_size=chunk_size):
+        cols = {name: column.to_numpy(zero_copy_only=False) for name, column in zip(batch.schema.names, batch.columns)}
+        if 'type' not in cols:
+            raise ValueError('в файле Parquet нет столбца type')
+        done += batch.num_rows
+        yield ('columns', cols), done/total
+
+
+def to_float(values) -> tuple:
+    """
+    Перевод столбца в float: пустые и нечисловые значения - nan
+
+    :return: (массив, {номер строки: исходное значение} - значения, не являющиеся конечным числом
+        или пустыми, для текста ошибки как у validate_row)
+    """
+    if np.asarray(values).dtype.kind in 'iuf':
+        return np.array(values, dtype=float), {}
+    res = np.empty(len(values))
+    invalid = {}
+    for i, value in enumerate(values):
+        try:
+            number = coerce_value(value)
+        except (TypeError, ValueError):
+            number = np.nan
+            invalid[i] = value
+        if number is None:
+            number = np.nan
+        elif np.isnan(number):
+            invalid[i] = value
+        res[i] = number
+    return res, invalid
+
+
+def fill_empty(data: bytes, delimiter: str) -> bytes:
+    """
+    Замена пустых полей CSV на nan (в начале строки, между разделителями, в конце строки)
+    """
+    d = delimiter.encode('utf-8')
+    data = b'\n' + data.replace(b'\r\n', b'\n')
+    # два прохода: соседние пустые поля перекрываются
+    data = data.replace(d + d, d + b'nan' + d).replace(d + d, d + b'nan' + d)
+    data = data.replace(b'\n' + d, b'\nnan' + d).replace(d + b'\n', d + b'nan\n')
+    return data[1:]
+
+
+def parse_chunk(chunk: tuple) -> tuple:
+    """
+    Столбцы параметров порции (разбор строк CSV либо приведение столбцов Parquet к float)
+
+    Числовой CSV разбирается построчным парсером NumPy (пустые поля заменяются на nan);
+    строки с кавычками, нечисловыми значениями или записями nan - модулем csv.
+
+    :return: (словарь столбцов, {параметр: {номер строки: исходное значение}} - значения, не
+        являющиеся конечным числом, см. calc_columns)
+    """
+    if chunk[0] == 'columns':
+        parsed = {name: to_float(values) for name, values in chunk[1].items()}
+    else:
+        _, header, lines, delimiter = chunk
+        data = b''.join(line if line.endswith(b'\n') else line + b'\n' for line in lines)
+        # nan в числовом разборе означает пустое поле, поэтому записи nan (nN) - только через модуль csv
+        if b'"' not in data and b'n' not in data and b'N' not in data:
+            try:
+                table = np.loadtxt(io.BytesIO(fill_empty(data, delimiter)), delimiter=delimiter,
+                                   ndmin=2, encoding='utf-8')
+            except ValueError:
+                table = None
+            if table is not None and table.shape == (len(lines), len(header)):
+                return {name: table[:, j] for j, name in enumerate(header)}, {}
+        rows = list(csv.reader((line.decode('utf-8') for line in lines), delimiter=delimiter))
+        width = len(header)
+        rows = [row + ['']*(width - len(row)) if len(row) < width else row[:width] for row in rows]
+        parsed = {name: to_float(values) for name, values in zip(header, zip(*rows))}
+    cols = {name: column for name, (column, _) in parsed.items()}
+    return cols, {name: invalid for name, (_, invalid) in parsed.items() if invalid}
+
+
+def format_csv(columns: dict, errors: dict) -> str:
+    """
+    Текст CSV порции результата (без заголовка); нечисловые значения - пустые поля
+    """
+    text = []
+    for name in OUTPUT_COLUMNS[:-1]:
+        column = columns[name]
+        if column.dtype.kind in 'iu':
+            text.append(column.astype(str))
+        else:
+            values = list(map(repr, column.tolist()))
+            for i in np.flatnonzero(~np.isfinite(column)).tolist():
+                values[i] = ''
+            text.append(values)
+    text.append([errors.get(i, '') for i in range(len(columns['index']))])
+    out = io.StringIO()
+    csv.writer(out, lineterminator='\n').writerows(zip(*text))
+    return out.getvalue()
+
+
+def process_chunk(args) -> dict:
+    """
+    Расчет порции в процессе пула
+
+    :param args: (порция, индекс первой строки порции, формат результата);
+
+    :return: {"n", "n_errors", "text" (csv) либо "columns", "errors" (parquet)}
+    """
+    chunk, offset, out_format = args
+    columns, errors = calc_columns(*parse_chunk(chunk))
+    columns['index'] = columns['index'] + offset
+    result = {'n': len(columns['index']), 'n_errors': len(errors)}
+    if out_format == 'csv':
+        result['text'] = format_csv(columns, errors)
+    else:
+        result['columns'] = columns
+        result['errors'] = errors
+    return result
+
+
+class CsvWriter:
+    def __init__(self, path: str) -> None:
+        self.f = open(path, 'w', encoding='utf-8', newline='')
+        self.f.write(','.join(OUTPUT_COLUMNS) + '\n')
+
+    def write(self, result: dict) -> None:
+        self.f.write(result['text'])
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class ParquetWriter:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.writer = None
+
+    def write(self, result: dict) -> None:
+        columns, errors = result['columns'], result['errors']
+        data = {name: columns[name] for name in OUTPUT_COLUMNS[:-1]}
+        data['error'] = [errors.get(i) for i in range(result['n'])]
+        table = pyarrow.table(data)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def progress_report(stream=sys.stderr):
+    """
+    Функция вывода хода расчета: число строк, доля файла, скорость (не чаще PROGRESS_INTERVAL)
+    """
+    start = time.monotonic()
+    last = [0.0]
+
+    def report(done: int, n_errors: int, fraction: float, final: bool = False) -> None:
+        now = time.monotonic()
+        if not final and now - last[0] < PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        elapsed = max(now - start, 1e-9)
+        stream.write(f'\r{done} строк ({fraction:.0%}), ошибок {n_errors}, {done/elapsed:,.0f} строк/с, {elapsed:.1f} с'
+                     + ('\n' if final else ''))
+        stream.flush()
+
+    return report
+
+
+def run_file(input_path: str, output_path: str, chunk_size: int = CHUNK_SIZE, processes: int = None,
+             delimiter: str = ',', progress=None) -> dict:
+    """
+    Потоковый расчет скин-фактора и дебита для файла скважин
+
+    Файл читается порциями по chunk_size строк, порции рассчитываются в пуле процессов
+    (векторизованно, по типам заканчивания) и записываются по порядку по мере готовности;
+    одновременно в обработке не более CHUNKS_PER_PROCESS порций на процесс, так что
+    потребление памяти не зависит от размера файла.
+
+    Parameters
+    ----------
+    :param input_path: входной файл CSV (заголовок - имена параметров, как в plot0) либо Parquet;
+    :param output_path: файл результатов CSV либо Parquet (по расширению);
+    :param chunk_size: число строк в порции;
+    :param processes: число процессов (по умолчанию - число ядер; 1 - расчет в текущем процессе);
+    :param delimiter: разделитель полей CSV;
+    :param progress: функция (строк, ошибок, доля файла, final), вызываемая после каждой порции;
+
+    :return: {"rows", "errors", "seconds"}
+
+    ----------
+    """
+    start = time.perf_counter()
+    in_format, out_format = file_format(input_path), file_format(output_path)
+    chunks = read_parquet(input_path, chunk_size) if in_format == 'parquet' else read_csv(input_path, chunk_size, delimiter)
+    processes = processes or os.cpu_count() or 1
+    writer = ParquetWriter(output_path) if out_format == 'parquet' else CsvWriter(output_path)
+    done = n_errors = 0
+    fraction = 0.0
+
+    def tasks():
+        offset = 0
+        for chunk, read in chunks:
+            n = len(chunk[2]) if chunk[0] == 'csv' else len(chunk[1]['type'])
+            yield (chunk, offset, out_format), read
+            offset += n
+
+    def consume(result, read):
+        nonlocal done, n_errors, fraction
+        writer.write(result)
+        done += result['n']
+        n_errors += result['n_errors']
+        fraction = read
+        if progress:
+            progress(done, n_errors, fraction)
+
+    try:
+        if processes == 1:
+            for task, read in tasks():
+                consume(process_chunk(task), read)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                pending = deque()
+                for task, read in tasks():
+                    pending.append((pool.submit(process_chunk, task), read))
+                    if len(pending) >= processes*CHUNKS_PER_PROCESS:
+                        future, read = pending.popleft()
+                        consume(future.result(), read)
+                while pending:
+                    future, read = pending.popleft()
+                    consume(future.result(), read)
+    finally:
+        writer.close()
+    if progress:
+        progress(done, n_errors, fraction, final=True)
+    return {'rows': done, 'errors': n_errors, 'seconds': time.perf_counter() - start}
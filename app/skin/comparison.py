@@ -0,0 +1,123 @@
+import numpy as np
+from .batch import SKIN_COMPONENTS, coerce_value, validate_row
+from .completions import COMPLETIONS, RATE_FIELDS, calc_skin, calc_rate
+from .skin import p_ss_atma, r_grid
+
+# Число точек профилей давления по умолчанию и предельное
+PROFILE_POINTS = 100
+MAX_PROFILE_POINTS = 5000
+
+SPACINGS = ('log', 'linear', 'adaptive')
+
+
+def compare_completions(well: dict, types: tuple = None, n_points: int = PROFILE_POINTS, r_max: float = None,
+                        spacing: str = 'log') -> dict:
+    """
+    Сравнение типов заканчивания скважины по одному набору параметров
+
+    Для каждого типа, для которого набор содержит все необходимые параметры, рассчитываются составляющие
+    скин-фактора (векторизованные классы скважин); дебиты и профили давления всех типов - одним вызовом
+    на общей сетке расстояний (для spacing='adaptive' сетка строится по среднему профилю).
+
+    Parameters
+    ----------
+    :param well: параметры скважины - объединение параметров всех сравниваемых типов (type не учитывается);
+    :param types: сравниваемые типы заканчивания (по умолчанию - все);
+    :param n_points: число точек профилей давления;
+    :param r_max: внешний радиус профилей, м, больше rw (по умолчанию - радиус контура питания re);
+    :param spacing: способ построения сетки ('log', 'linear', 'adaptive'), см. r_grid;
+
+    :return: {"table": [{"rank", "type", "label", "S", "skin", "q", "q_ratio" (доля дебита лучшего)}]
+        по убыванию дебита, "r": сетка, м, "p": матрица профилей давления (строки - в порядке table), атм,
+        "skipped": [{"type", "error"}] - типы, для которых недостаточно параметров либо расчет не удался}
+
+    ----------
+    """
+    if not isinstance(well, dict):
+        raise ValueError('параметры скважины должны быть JSON-объектом')
+    types = tuple(COMPLETIONS) if types is None else tuple(int(type_) for type_ in types)
+    unknown = [type_ for type_ in types if type_ not in COMPLETIONS]
+    if unknown or not types:
+        raise ValueError(f'неизвестные типы заканчивания: {unknown}' if unknown else 'не заданы типы заканчивания')
+    n_points = int(n_points)
+    if not 2 <= n_points <= MAX_PROFILE_POINTS:
+        raise ValueError(f'число точек профиля должно быть от 2 до {MAX_PROFILE_POINTS}')
+    if spacing not in SPACINGS:
+        raise ValueError(f'неизвестный способ построения сетки: {spacing}')
+
+    rows, skipped = [], []
+    for type_ in dict.fromkeys(types):
+        try:
+            _, values = validate_row({**well, 'type': type_})
+        except ValueError as e:
+            skipped.append({'type': type_, 'error': str(e)})
+            continue
+        with np.errstate(all='ignore'):
+            skin = calc_skin(type_, {name: np.array([value]) for name, value in values.items()})
+        if not np.isfinite(skin['S'][0]):
+            skipped.append({'type': type_, 'error': 'расчет не дал конечного результата, проверьте параметры'})
+            continue
+        rows.append((type_, values, {name: float(value[0]) for name, value in skin.items()}))
+    if not rows:
+        return {'table': [], 'r': np.empty(0), 'p': np.empty((0, n_points)), 'skipped': skipped}
+
+    # параметры дебита и профиля общие для всех типов (проверены validate_row)
+    common = {field: rows[0][1][field] for field in RATE_FIELDS}
+    if r_max is None:
+        if not common['re'] > common['rw']:
+            raise ValueError('радиус контура питания re должен быть больше радиуса скважины rw')
+    elif not r_max > common['rw']:
+        raise ValueError(f'внешний радиус профилей r_max должен быть больше радиуса скважины rw = {common["rw"]:g} м')
+    S = np.array([skin['S'] for _, _, skin in rows])
+    with np.errstate(all='ignore'):
+        q = calc_rate(common, S)
+    order = np.argsort(-np.where(np.isfinite(q), q, -np.inf), kind='stable')
+    S, q = S[order], q[order]
+    rows = [rows[i] for i in order]
+
+    def profiles(r):
+        return p_ss_atma(common['Pres'], q[:, None], common['mu'], common['B'], common['k'], common['h'],
+                         common['re'], S[:, None], r)
+
+    with np.errstate(all='ignore'):
+        r = r_grid(common['rw'], common['re'] if r_max is None else r_max, n_points, spacing,
+                   lambda r: profiles(r).mean(axis=0))
+        p = profiles(r)
+    table = []
+    for rank, ((type_, _, skin), rate) in enumerate(zip(rows, q), 1):
+        table.append({
+            'rank': rank,
+            'type': type_,
+            'label': COMPLETIONS[type_][3],
+            'S': skin['S'],
+            'skin': {name: skin[name] for name in SKIN_COMPONENTS if name in skin},
+            'q': float(rate),
+            'q_ratio': float(rate/q[0]) if q[0] else None,
+        })
+    return {'table': table, 'r': r, 'p': p, 'skipped': skipped}
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор запроса сравнения типов заканчивания
+
+    :param body: {"well": {параметры скважины}, "types": [10, 20, ...], "n_points": 100, "r_max": null,
+        "spacing": "log"} либо параметры скважины на верхнем уровне (как в plot0);
+
+    :return: словарь аргументов функции compare_completions
+    """
+    if not isinstance(body, dict):
+        raise ValueError('тело запроса должно быть JSON-объектом')
+    options = ('types', 'n_points', 'r_max', 'spacing')
+    well = body['well'] if 'well' in body else {name: value for name, value in body.items() if name not in options}
+    types = body.get('types')
+    if types is not None and not isinstance(types, list):
+        raise ValueError('types должен быть JSON-массивом типов заканчивания')
+    n_points = coerce_value(body.get('n_points'))
+    return {
+        'well': well,
+        'types': types,
+        'n_points': PROFILE_POINTS if n_points is None else n_points,
+        'r_max': coerce_value(body.get('r_max')),
+        'spacing': body.get('spacing') or 'log',
+    }
@@ -0,0 +1,93 @@
+import numpy as np
+from .skin import q_well
+from .kernel import KT_PHI
+from .vector_wells import VectorUncasedVW, VectorPerfVW, VectorUnanchDW, VectorPerfDW
+
+uncased_vertical_well = VectorUncasedVW()
+perf_vertical_well = VectorPerfVW()
+unanchored_directional_well = VectorUnanchDW()
+perforated_directional_well = VectorPerfDW()
+
+# Параметры, необходимые для расчета дебита скважины любого типа заканчивания
+RATE_FIELDS = ('k', 'h', 'Pres', 'Pwf', 'mu', 'B', 're', 'rw')
+
+# Необязательные параметры и их значения по умолчанию
+DEFAULTS = {'y': 1}
+
+# Параметры, допускающие только положительные значения
+POSITIVE_FIELDS = ('k', 'h', 'mu', 'B', 're', 'rw', 'kd', 'rd', 'kv', 'Lp', 'rp', 'ns', 'kcz', 'rcz', 'hw', 'Lwpc', 'y')
+
+# Тип заканчивания -> (расчетный класс, метод, параметры скин-фактора, подпись результата)
+COMPLETIONS = {
+    10: (uncased_vertical_well, 'perfect_s',
+         ('k', 'kd', 'rw', 'rd'),
+         'Производительность совершенной по степени вскрытия вертикальной скважины'),
+    11: (uncased_vertical_well, 'unperfect_s',
+         ('model', 'h', 'hw', 'rw', 'zw', 'k', 'kv', 'kd', 'rd', 'y'),
+         'Производительность несовершенной по степени вскрытия вертикальной скважины'),
+    20: (perf_vertical_well, 'full_perf_s',
+         ('k', 'kd', 'rw', 'rd', 'phi', 'Lp', 'rp', 'ns', 'kv', 'kcz', 'rcz'),
+         'Производительность полностью перфорированной вертикальной скважины'),
+    21: (perf_vertical_well, 'part_perf_s',
+         ('k', 'kd', 'rw', 'rd', 'phi', 'Lp', 'rp', 'ns', 'kv', 'kcz', 'rcz', 'h', 'hw', 'model', 'zw', 'y'),
+         'Производительность частично перфорированной вертикальной скважины'),
+    30: (unanchored_directional_well, 'perfect_s',
+         ('k', 'kd', 'rw', 'rd', 'model', 'teta', 'kv', 'h', 'hw', 'zw'),
+         'Производительность совершенной по степени вскрытия необсаженной наклонно-направленной скважины'),
+    31: (unanchored_directional_well, 'unperfect_s',
+         ('k', 'kd', 'rw', 'rd', 'h', 'Lwpc', 'teta', 'kv', 'hw', 'zw'),
+         'Производительность несовершенной по степени вскрытия наклонно-направленной скважины'),
+    40: (perforated_directional_well, 'full_perf_s',
+         ('k', 'kd', 'rw', 'rd', 'teta', 'phi', 'Lp', 'rp', 'ns', 'kv', 'kcz', 'rcz', 'model', 'h', 'hw', 'zw'),
+         'Производительность полностью перфорированной наклонно-направленной скважины'),
+    41: (perforated_directional_well, 'part_perf_s',
+         ('k', 'kd', 'rw', 'rd', 'teta', 'phi', 'Lp', 'rp', 'ns', 'kv', 'kcz', 'rcz', 'h', 'hw', 'zw'),
+         'Производительность частично перфорированной наклонно-направленной скважины'),
+}
+
+
+def required_fields(type_: int) -> tuple:
+    """
+    Список параметров, необходимых для расчета скин-фактора и дебита скважины заданного типа
+
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    """
+    fields = COMPLETIONS[type_][2] + RATE_FIELDS
+    return tuple(dict.fromkeys(field for field in fields if field not in DEFAULTS))
+
+
+def calc_skin(type_: int, cols: dict) -> dict:
+    """
+    Расчет составляющих скин-фактора для массива скважин одного типа заканчивания
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    :param cols: словарь столбцов с параметрами скважин (как в запросе plot0);
+        проницаемость в латеральном направлении kh принимается равной k, если не задана;
+
+    :return: словарь массивов составляющих скин-фактора и суммарного скин-фактора S
+
+    ----------
+    """
+    well, method, fields, _ = COMPLETIONS[type_]
+    args = {**DEFAULTS, **cols}
+    args.setdefault('kh', args['k'])
+    return well.calc(method, args)
+
+
+def calc_rate(cols: dict, S) -> np.ndarray:
+    """
+    Расчет дебита скважин по столбцам параметров и рассчитанному скин-фактору
+
+    :param cols: словарь столбцов с параметрами k, h, Pres, Pwf, mu, B, re, rw;
+    :param S: скин-фактор (массив);
+    """
+    return q_well(*(np.asarray(cols[field], dtype=float) for field in RATE_FIELDS), S)
+
+
+def check_phi(phi) -> bool:
+    """
+    Проверка, что фазировка перфорационных зарядов есть в таблице Karakas-Tariq
+    """
+    return bool(np.isin(phi, KT_PHI).all())
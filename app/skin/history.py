@@ -0,0 +1,376 @@
+import os
+from math import factorial
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+from .converter import td_from_t
+from .batch import coerce_value, validate_row
+from .completions import COMPLETIONS, calc_skin
+from .inverse import SOLVE_FIELDS
+from .transient import EULER, check_positive, current_rate, exp1_log_deviation, rate_changes, rate_history
+
+# Подбираемые параметры: проницаемость, суммарный скин-фактор, начальное пластовое давление,
+# параметры зоны загрязнения (вместо S - скин-фактор рассчитывается по типу заканчивания)
+FIT_FIELDS = ('k', 'S', 'Pres', 'kd', 'rd')
+
+# Параметры, подбираемые по логарифму (положительные, меняются на порядки)
+LOG_FIELDS = ('k', 'kd', 'rd')
+
+# Допустимый интервал проницаемости пласта, мД
+K_BOUNDS = (1e-4, 1e5)
+
+# Пары (замер, изменение дебита) с x = rd^2/(4*td) <= X_CUT суммируются по степенному ряду
+# E1(x) + ln(x) + EULER = x - x^2/4 + x^3/18 - ... из FAR_SERIES_TERMS членов (погрешность ~x^5/600)
+X_CUT = 1e-2
+FAR_SERIES_TERMS = 4
+
+# Разбиение пар пересчитывается, когда проницаемость опускается ниже k_part;
+# новое k_part - в K_PART_MARGIN раз ниже текущей проницаемости
+K_PART_MARGIN = 10.0
+
+# Число элементов матрицы пар, обрабатываемых за один шаг при подготовке
+PAIR_BLOCK = 1 << 22
+
+# Критерии сходимости Левенберга-Марквардта: относительное изменение суммы квадратов невязок
+# и шаг по параметрам; начальный коэффициент регуляризации и предельное число итераций
+FTOL = 1e-12
+XTOL = 1e-9
+LAMBDA0 = 1e-3
+MAX_ITER = 100
+
+# Относительный шаг численного дифференцирования скин-фактора по параметрам
+SKIN_STEP = 1e-6
+
+# Предельное число скважин в одном запросе
+MAX_WELLS = 1000
+
+
+def prepare_pairs(t_hr, dq, t_obs, td_per_hr_mD: float, k_part: float) -> dict:
+    """
+    Не зависящие от проницаемости суммы по парам (замер i, изменение дебита j)
+
+    При pD = 1/2*(ln(4*td) - EULER + D(x)), x = 1/(4*td), td = td_per_hr_mD*k*(t_i - t_j), сумма
+    суперпозиции раскладывается на L_i = sum dq_j*ln(t_i - t_j), слагаемое, пропорциональное текущему
+    дебиту, и поправку D. Для удаленных пар (x <= X_CUT при любой k >= k_part) поправка - ряд
+    по степеням 1/k с моментами M_m,i = sum dq_j*(t_i - t_j)^-m; для ближних пар поправка
+    рассчитывается точно на каждой итерации.
+
+    :return: {"L", "moments" (FAR_SERIES_TERMS x n_obs), "near_rows", "near_cols", "near_tau", "k_part"}
+    """
+    tau_cut = 0.25/(td_per_hr_mD*k_part*X_CUT)
+    n_obs, n_steps = len(t_obs), len(t_hr)
+    L = np.zeros(n_obs)
+    moments = np.zeros((FAR_SERIES_TERMS, n_obs))
+    near_rows, near_cols = [], []
+    block = max(PAIR_BLOCK//max(n_steps, 1), 1)
+    for start in range(0, n_obs, block):
+        tau = t_obs[start:start + block, None] - t_hr[None, :]
+        pos = tau > 0
+        L[start:start + block] = np.log(np.where(pos, tau, 1.0)) @ dq
+        far = tau >= tau_cut
+        inv = np.where(far, 1/np.where(far, tau, 1.0), 0.0)
+        power = inv
+        for m in range(FAR_SERIES_TERMS):
+            moments[m, start:start + block] = power @ dq
+            power = power*inv
+        rows, cols = np.nonzero(pos & ~far)
+        near_rows.append(rows + start)
+        near_cols.append(cols)
+    near_rows, near_cols = np.concatenate(near_rows), np.concatenate(near_cols)
+    return {'L': L, 'moments': moments, 'near_rows': near_rows, 'near_cols': near_cols,
+            'near_tau': t_obs[near_rows] - t_hr[near_cols], 'k_part': k_part}
+
+
+def pd_sum(problem: dict, k: float) -> tuple:
+    """
+    Безразмерная сумма суперпозиции в моменты замеров и ее производная по ln(k)
+
+    :return: (F - массив sum dq_j*pD_ij без скин-фактора, dF/dln(k))
+    """
+    pairs = problem['pairs']
+    if k < pairs['k_part']:
+        pairs = problem['pairs'] = prepare_pairs(problem['t_hr'], problem['dq'], problem['t_obs'],
+                                                 problem['td_per_hr_mD'], k/K_PART_MARGIN)
+    Q = problem['Q']
+    n_obs = len(Q)
+    scale = 0.25/(problem['td_per_hr_mD']*k)
+    # ближние пары - точно
+    x = scale/pairs['near_tau']
+    dq = problem['dq'][pairs['near_cols']]
+    D = np.zeros(n_obs)
+    dD = np.zeros(n_obs)
+    D += np.bincount(pairs['near_rows'], dq*exp1_log_deviation(x), n_obs)
+    dD += np.bincount(pairs['near_rows'], dq*np.expm1(-x), n_obs)
+    # удаленные пары - ряд -sum (-x)^n/(n*n!) по моментам
+    for m in range(1, FAR_SERIES_TERMS + 1):
+        term = -(-scale)**m/(m*factorial(m))*pairs['moments'][m - 1]
+        D += term
+        dD -= m*term
+    F = 0.5*(pairs['L'] - Q*(np.log(scale) + EULER) + D)
+    return F, 0.5*(Q + dD)
+
+
+def skin_derivatives(type_: int, values: dict, params: dict, names: tuple) -> tuple:
+    """
+    Суммарный скин-фактор по типу заканчивания и его производные по логарифмам параметров names
+    (центральные разности; все точки рассчитываются одним векторизованным вызовом calc_skin)
+    """
+    n = len(names)
+    cols = {name: np.full(1 + 2*n, float(value)) for name, value in {**values, **params}.items()}
+    for i, name in enumerate(names):
+        cols[name][1 + 2*i] *= np.exp(SKIN_STEP)
+        cols[name][2 + 2*i] *= np.exp(-SKIN_STEP)
+    with np.errstate(all='ignore'):
+        S = calc_skin(type_, cols)['S']
+    return float(S[0]), (S[1::2] - S[2::2])/(2*SKIN_STEP)
+
+
+def t_quantile(p: float, dof: int) -> float:
+    """
+    Квантиль распределения Стьюдента (разложение Корниша-Фишера по квантилю нормального распределения)
+    """
+    z = NormalDist().inv_cdf(p)
+    if dof <= 0:
+        return float('nan')
+    v = float(dof)
+    return (z + (z**3 + z)/(4*v) + (5*z**5 + 16*z**3 + 3*z)/(96*v**2)
+            + (3*z**7 + 19*z**5 + 17*z**3 - 15*z)/(384*v**3)
+            + (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z)/(92160*v**4))
+
+
+def history_match(type_: int, values: dict, t_hr, q, t_obs, p_obs, fit=('k', 'S'), initial: dict = None,
+                  phi: float = 0.2, ct: float = 1e-5, confidence: float = 0.95, max_iter: int = MAX_ITER) -> dict:
+    """
+    Подбор проницаемости и скин-фактора по истории давления и дебита (адаптация модели
+    линейного источника со скин-фактором методом Левенберга-Марквардта)
+
+    Невязки и матрица Якоби рассчитываются векторизованно по всем замерам: не зависящие от
+    проницаемости суммы по парам (замер, изменение дебита) готовятся один раз (prepare_pairs),
+    итерация сводится к нескольким операциям над массивами длины числа замеров.
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    :param values: словарь параметров скважины (после validate_row), начальные приближения k, Pres;
+    :param t_hr: моменты изменения дебита, ч;
+    :param q: дебит, м3/сут;
+    :param t_obs: моменты замеров давления, ч;
+    :param p_obs: замеренное забойное давление, атм;
+    :param fit: подбираемые параметры из FIT_FIELDS; без S скин-фактор рассчитывается по типу
+        заканчивания (kd или rd - подбор параметра зоны загрязнения);
+    :param initial: начальные приближения подбираемых параметров;
+    :param phi: пористость, доли единиц;
+    :param ct: общая сжимаемость, 1/атм;
+    :param confidence: доверительная вероятность интервалов;
+    :param max_iter: предельное число итераций;
+
+    :return: {"fitted": {параметр: значение}, "ci": {параметр: [нижняя, верхняя граница]},
+        "se": {параметр: стандартная ошибка}, "S", "residuals", "p_fit", "t", "rmse",
+        "iterations", "converged"}
+
+    ----------
+    """
+    fit = tuple(fit)
+    unknown = [name for name in fit if name not in FIT_FIELDS]
+    if unknown or not fit or len(set(fit)) != len(fit):
+        raise ValueError(f'подбираемые параметры - неповторяющиеся из {", ".join(FIT_FIELDS)}')
+    if 'S' in fit and ({'kd', 'rd'} & set(fit)):
+        raise ValueError('скин-фактор S подбирается либо напрямую, либо через kd/rd')
+    if {'kd', 'rd'} <= set(fit):
+        raise ValueError('kd и rd не разделимы по истории давления: подбирается только один из них')
+    for name in {'kd', 'rd'} & set(fit):
+        if name not in COMPLETIONS[type_][2]:
+            raise ValueError(f'параметр {name} не входит в расчет скин-фактора скважины типа {type_}')
+    check_positive(phi=phi, ct=ct)
+    t_hr, q, t_obs = rate_history(t_hr, q, t_obs)
+    p_obs = np.asarray(p_obs, dtype=float)
+    if p_obs.shape != t_obs.shape:
+        raise ValueError('моменты замеров и давления должны быть массивами одной длины')
+    if len(t_obs) <= len(fit):
+        raise ValueError('число замеров должно превышать число подбираемых параметров')
+    if not np.isfinite(p_obs).all():
+        raise ValueError('замеры давления должны быть конечными числами')
+
+    start = {**values, **{name: float(value) for name, value in (initial or {}).items() if name in FIT_FIELDS}}
+    if 'S' not in start:
+        start['S'] = skin_derivatives(type_, values, {}, ())[0]
+    lo = {'k': K_BOUNDS[0], 'kd': SOLVE_FIELDS['kd'][0], 'rd': values['rw']*(1 + 1e-9), 'S': -np.inf, 'Pres': -np.inf}
+    hi = {'k': K_BOUNDS[1], 'kd': SOLVE_FIELDS['kd'][1], 'rd': SOLVE_FIELDS['rd'][1], 'S': np.inf, 'Pres': np.inf}
+    log = np.array([name in LOG_FIELDS for name in fit])
+    to_internal = lambda d: np.array([np.log(d[name]) if name in LOG_FIELDS else d[name] for name in fit])
+    lower, upper = to_internal(lo), to_internal(hi)
+    theta = to_internal(start)
+    if not np.isfinite(theta).all() or (theta < lower).any() or (theta > upper).any():
+        raise ValueError('начальные приближения вне допустимой области')
+
+    problem = {'t_hr': t_hr, 't_obs': t_obs, 'dq': rate_changes(q), 'Q': current_rate(t_hr, q, t_obs),
+               'td_per_hr_mD': td_from_t(1, 1, phi, values['mu'], ct, values['rw'])}
+    problem['pairs'] = prepare_pairs(t_hr, problem['dq'], t_obs, problem['td_per_hr_mD'],
+                                     np.exp(theta[fit.index('k')])/K_PART_MARGIN if 'k' in fit else start['k'])
+    skin_names = tuple(name for name in fit if name in ('k', 'kd', 'rd')) if 'S' not in fit else ()
+    index = {name: i for i, name in enumerate(fit)}
+
+    def model(theta):
+        params = {name: np.exp(x) if name in LOG_FIELDS else x for name, x in zip(fit, theta)}
+        cur = {**start, **params}
+        k, Pres = cur['k'], cur['Pres']
+        if 'S' in fit:
+            S, dS = cur['S'], ()
+        else:
+            S, dS = skin_derivatives(type_, values, {name: cur[name] for name in ('k', 'kd', 'rd') if name in cur},
+                                     skin_names)
+        C = 18.41*values['mu']*values['B']/(k*values['h'])
+        F, dF = pd_sum(problem, k)
+        p = Pres - C*(F + S*problem['Q'])
+        J = np.empty((len(p), len(fit)))
+        if 'k' in index:
+            J[:, index['k']] = C*(F + S*problem['Q']) - C*dF
+        if 'S' in index:
+            J[:, index['S']] = -C*problem['Q']
+        if 'Pres' in index:
+            J[:, index['Pres']] = 1.0
+        for name, d in zip(skin_names, dS):
+            if name == 'k':
+                J[:, index['k']] -= C*problem['Q']*d
+            else:
+                J[:, index[name]] = -C*problem['Q']*d
+        return p, J, S
+
+    p, J, S = model(theta)
+    r = p - p_obs
+    cost = r @ r
+    lam = LAMBDA0
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        A = J.T @ J
+        g = J.T @ r
+        diag = np.maximum(np.diag(A), 1e-12*max(np.diag(A).max(), 1e-300))
+        while True:
+            try:
+                step = -np.linalg.solve(A + lam*np.diag(diag), g)
+            except np.linalg.LinAlgError:
+                step = np.full(len(fit), np.nan)
+            trial = np.clip(theta + step, lower, upper)
+            if np.isfinite(trial).all():
+                p_new, J_new, S_new = model(trial)
+                r_new = p_new - p_obs
+                cost_new = r_new @ r_new
+                if np.isfinite(cost_new) and cost_new <= cost:
+                    break
+            lam *= 10
+            if lam > 1e16:
+                break
+        if lam > 1e16:
+            # шаг, уменьшающий невязку, не найден: минимум достигнут с точностью вычислений
+            converged = True
+            break
+        small_step = (np.abs(trial - theta) <= XTOL*(1 + np.abs(theta))).all()
+        small_change = cost - cost_new <= FTOL*max(cost, 1e-300)
+        theta, p, J, S, r, cost = trial, p_new, J_new, S_new, r_new, cost_new
+        lam = max(lam/10, 1e-12)
+        if small_step or small_change:
+            converged = True
+            break
+
+    n, m = len(r), len(fit)
+    s2 = cost/(n - m)
+    try:
+        cov = s2*np.linalg.inv(J.T @ J)
+    except np.linalg.LinAlgError:
+        cov = np.full((m, m), np.nan)
+    se_internal = np.sqrt(np.maximum(np.diag(cov), 0))
+    t = t_quantile(0.5 + confidence/2, n - m)
+    values_fit = np.where(log, np.exp(theta), theta)
+    ci_lo = np.where(log, np.exp(theta - t*se_internal), theta - t*se_internal)
+    ci_hi = np.where(log, np.exp(theta + t*se_internal), theta + t*se_internal)
+    se = np.where(log, values_fit*se_internal, se_internal)
+    return {
+        'fitted': {name: float(x) for name, x in zip(fit, values_fit)},
+        'ci': {name: [float(a), float(b)] for name, a, b in zip(fit, ci_lo, ci_hi)},
+        'se': {name: float(x) for name, x in zip(fit, se)},
+        'S': float(S),
+        't': t_obs,
+        'p_fit': p,
+        'residuals': r,
+        'rmse': float(np.sqrt(cost/n)),
+        'iterations': iterations,
+        'converged': converged,
+    }
+
+
+def _fit_one(args) -> dict:
+    try:
+        return history_match(**args)
+    except (ValueError, TypeError, np.linalg.LinAlgError) as e:
+        return {'error': str(e)}
+
+
+def fit_many(problems: list, processes: int = 1) -> list:
+    """
+    Подбор параметров для нескольких скважин; при processes > 1 скважины распределяются по процессам
+
+    :param problems: список словарей аргументов history_match;
+    :param processes: число процессов (1 - расчет в текущем процессе);
+
+    :return: список результатов в порядке скважин (при ошибке - {"error": текст})
+    """
+    if processes > 1 and len(problems) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(problems))) as pool:
+            return list(pool.map(_fit_one, problems))
+    return [_fit_one(args) for args in problems]
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор и проверка описания одной скважины для подбора параметров
+
+    :param body: {"well": {параметры скважины как в plot0}, "t": [ч], "q": [м3/сут], "t_obs": [ч],
+        "p_obs": [атм], "fit": ["k", "S"], "initial": {...}, "phi": 0.2, "ct": 1e-5, "confidence": 0.95};
+
+    :return: словарь аргументов функции history_match
+    """
+    if not isinstance(body, dict):
+        raise ValueError('описание скважины должно быть JSON-объектом')
+    type_, values = validate_row(body.get('well'))
+    for name in ('t', 'q', 't_obs', 'p_obs'):
+        if not isinstance(body.get(name), list):
+            raise ValueError(f'{name} должен быть JSON-массивом чисел')
+    fit = body.get('fit', ['k', 'S'])
+    if not isinstance(fit, list):
+        raise ValueError('fit должен быть JSON-массивом имен параметров')
+    initial = body.get('initial') or {}
+    if not isinstance(initial, dict):
+        raise ValueError('initial должен быть JSON-объектом')
+    args = {'type_': type_, 'values': values, 't_hr': body['t'], 'q': body['q'], 't_obs': body['t_obs'],
+            'p_obs': body['p_obs'], 'fit': tuple(fit), 'initial': {name: coerce_value(value) for name, value in initial.items()}}
+    for name in ('phi', 'ct', 'confidence'):
+        value = coerce_value(body.get(name))
+        if value is not None:
+            args[name] = value
+    if 'confidence' in args and not 0 < args['confidence'] < 1:
+        raise ValueError('доверительная вероятность должна быть в интервале (0, 1)')
+    return args
+
+
+def request_problems(body: dict) -> tuple:
+    """
+    Разбор запроса подбора: одна скважина (поля request_args) или {"wells": [...], "processes": n}
+
+    :return: (список словарей аргументов history_match либо текстов ошибок, число процессов)
+    """
+    if not isinstance(body, dict):
+        raise ValueError('тело запроса должно быть JSON-объектом')
+    if 'wells' not in body:
+        return [request_args(body)], 1
+    wells = body['wells']
+    if not isinstance(wells, list) or not 1 <= len(wells) <= MAX_WELLS:
+        raise ValueError(f'wells должен быть JSON-массивом из 1..{MAX_WELLS} скважин')
+    problems = []
+    for well in wells:
+        try:
+            problems.append(request_args(well))
+        except (ValueError, TypeError, AttributeError) as e:
+            problems.append(str(e))
+    processes = min(max(int(body.get('processes', 1)), 1), os.cpu_count() or 1)
+    return problems, processes
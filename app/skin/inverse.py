@@ -0,0 +1,202 @@
+import numpy as np
+from .batch import validate_row
+from .completions import COMPLETIONS, calc_skin
+
+# Параметры, определяемые обратным расчетом, и интервалы поиска корня по умолчанию
+SOLVE_FIELDS = {
+    'kd': (1e-4, 1e5),
+    'rd': (None, 100.0),
+    'Lp': (1e-3, 10.0),
+    'ns': (0.1, 300.0),
+}
+
+# Относительная точность корня и предельное число итераций
+XTOL = 1e-10
+MAX_ITER = 100
+
+# Число узлов предварительного просмотра интервала поиска (отделение корня)
+SCAN_POINTS = 33
+
+
+def skin_from_rate(k, h, Pres, Pwf, mu, B, re, rw, q) -> np.ndarray:
+    """
+    Суммарный скин-фактор по замеренному дебиту (обращение q_well в замкнутом виде)
+
+    Parameters
+    ----------
+    :param k: проницаемость пласта, мД
+    :param h: толщина пласта, м
+    :param Pres: среднее пластовое давление, атм
+    :param Pwf: забойное давление, атм
+    :param mu: вякость нефти, сПз
+    :param B: объемный коэффициент, м3/м3
+    :param re: радиус контура, м
+    :param rw: радиус скважины, м
+    :param q: замеренный дебит, м3/сут
+
+    :return S: скин-фактор
+
+    ----------
+    """
+    k, h, Pres, Pwf, mu, B, re, rw, q = (np.asarray(x, dtype=float) for x in (k, h, Pres, Pwf, mu, B, re, rw, q))
+    return k*h*(Pres - Pwf)/(18.4*mu*B*q) - np.log1p(re/rw) + 0.75
+
+
+def bracketed_root(f, lo, hi, xtol: float = XTOL, max_iter: int = MAX_ITER, log: bool = True) -> tuple:
+    """
+    Векторизованный поиск корней f(x) = 0 на интервалах [lo, hi] методом Иллинойс (модифицированная
+    регула фальси) с переходом к делению пополам, если шаг выходит из интервала
+
+    Все корни уточняются одновременно: на каждой итерации f вызывается один раз для всего массива.
+
+    Parameters
+    ----------
+    :param f: функция массива x -> массив невязок той же формы;
+    :param lo: нижние границы интервалов (массив);
+    :param hi: верхние границы интервалов (массив);
+    :param xtol: относительная точность корня;
+    :param max_iter: предельное число итераций;
+    :param log: поиск по логарифму x (для положительных параметров, меняющихся на порядки);
+
+    :return: (массив корней, nan - нет смены знака на интервале; массив признаков сходимости)
+
+    ----------
+    """
+    to_x = np.exp if log else (lambda u: u)
+    a = np.log(lo) if log else np.asarray(lo, dtype=float).copy()
+    b = np.log(hi) if log else np.asarray(hi, dtype=float).copy()
+    fa, fb = f(to_x(a)), f(to_x(b))
+    bracketed = np.isfinite(fa) & np.isfinite(fb) & (np.sign(fa) != np.sign(fb))
+    done = ~bracketed | (fb == 0)
+    for _ in range(max_iter):
+        if done.all():
+            break
+        with np.errstate(all='ignore'):
+            u = (a*fb - b*fa)/(fb - fa)
+        outside = ~np.isfinite(u) | (u <= np.minimum(a, b)) | (u >= np.maximum(a, b))
+        u = np.where(outside, (a + b)/2, u)
+        fu = f(to_x(u))
+        fu = np.where(done, fb, fu)
+        u = np.where(done, b, u)
+        flip = np.sign(fu) != np.sign(fb)
+        a, fa = np.where(flip, b, a), np.where(flip, fb, fa/2)
+        b, fb = u, fu
+        width = np.abs(b - a) if log else np.abs(b - a)/np.maximum(np.abs(b), 1e-300)
+        done |= (fb == 0) | (width <= xtol)
+    x = np.where(bracketed, to_x(b), np.nan)
+    return x, done & bracketed
+
+
+def solve_group(type_: int, rows: list, target: str, q, bracket: tuple = None) -> dict:
+    """
+    Обратный расчет для группы скважин одного типа заканчивания
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания;
+    :param rows: список словарей параметров (после validate_row; значение target не используется);
+    :param target: определяемый параметр (kd, rd, Lp, ns) либо 'S' - только суммарный скин-фактор;
+    :param q: массив замеренных дебитов, м3/сут;
+    :param bracket: интервал поиска (минимум, максимум), по умолчанию SOLVE_FIELDS;
+
+    :return: словарь массивов {"S": скин-фактор по дебиту, target: найденное значение, "converged": ...,
+        "n_roots": число найденных корней на интервале поиска}
+
+    ----------
+    """
+    fields = {field for row in rows for field in row}
+    cols = {field: np.array([row[field] for row in rows], dtype=float) for field in fields}
+    S = skin_from_rate(*(cols[name] for name in ('k', 'h', 'Pres', 'Pwf', 'mu', 'B', 're', 'rw')), q)
+    if target == 'S':
+        return {'S': S, 'converged': np.isfinite(S)}
+    lo, hi = bracket or SOLVE_FIELDS[target]
+    # зона загрязнения не может быть меньше радиуса скважины
+    lo = cols['rw']*(1 + 1e-9) if lo is None else np.full(len(rows), float(lo))
+    hi = np.full(len(rows), float(hi))
+
+    def residual(x):
+        with np.errstate(all='ignore'):
+            return calc_skin(type_, {**cols, target: x})['S'] - S
+
+    lo, hi, n_roots = scan_bracket(residual, lo, hi)
+    value, converged = bracketed_root(residual, lo, hi)
+    return {'S': S, target: value, 'converged': converged, 'n_roots': n_roots}
+
+
+def scan_bracket(f, lo, hi, n: int = SCAN_POINTS) -> tuple:
+    """
+    Отделение корня: просмотр интервала [lo, hi] по логарифмической сетке из n узлов и выбор
+    первого подынтервала со сменой знака f (вне области определения формул f не конечна).
+    Скин-фактор может немонотонно зависеть от параметра (например, от Lp), тогда корней несколько
+    и выбирается наименьший.
+
+    Все скважины просматриваются одним вызовом f для массива формы (n, len(lo)).
+
+    :return: (нижние, верхние границы подынтервалов, число смен знака на сетке);
+        если смены знака нет - исходный интервал
+    """
+    grid = np.exp(np.linspace(np.log(lo), np.log(hi), n))
+    values = f(grid)
+    change = np.isfinite(values[:-1]) & np.isfinite(values[1:]) & (np.sign(values[:-1]) != np.sign(values[1:]))
+    found = change.any(axis=0)
+    first = np.argmax(change, axis=0)
+    cols = np.arange(grid.shape[1])
+    return np.where(found, grid[first, cols], lo), np.where(found, grid[first + 1, cols], hi), change.sum(axis=0)
+
+
+def solve_inverse(wells: list, target: str = 'S', bracket: tuple = None) -> list:
+    """
+    Обратный расчет: суммарный скин-фактор по замеренному дебиту и забойному давлению и значение
+    выбранного параметра заканчивания, при котором формулы типа заканчивания дают этот скин-фактор
+
+    Скважины группируются по типу заканчивания, каждая группа решается векторизованно.
+
+    Parameters
+    ----------
+    :param wells: список словарей параметров скважин (как в plot0) с замеренным дебитом q, м3/сут;
+        определяемый параметр может отсутствовать;
+    :param target: 'S' - только скин-фактор; kd, rd, Lp, ns - параметр заканчивания;
+    :param bracket: интервал поиска параметра (минимум, максимум);
+
+    :return: список результатов в порядке скважин: {"index", "type", "S", target, "n_roots"}
+        (n_roots > 1 - решение неоднозначно, приведен наименьший корень), либо {"index", "error"}
+
+    ----------
+    """
+    if target != 'S' and target not in SOLVE_FIELDS:
+        raise ValueError(f'неизвестный определяемый параметр: {target}; допустимы S, {", ".join(SOLVE_FIELDS)}')
+    if bracket is not None:
+        bracket = tuple(float(x) for x in bracket)
+        if len(bracket) != 2 or not 0 < bracket[0] < bracket[1]:
+            raise ValueError('интервал поиска должен быть парой положительных чисел [минимум, максимум]')
+    results = [None]*len(wells)
+    groups = {}
+    for i, row in enumerate(wells):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError('скважина должна быть JSON-объектом')
+            q = float(row.get('q'))
+            if not q > 0:
+                raise ValueError('замеренный дебит q должен быть положительным')
+            # значение определяемого параметра не используется, подставляется только для проверки строки
+            type_, values = validate_row({**row, target: 1} if target != 'S' else row)
+            if target != 'S' and target not in COMPLETIONS[type_][2]:
+                raise ValueError(f'параметр {target} не входит в расчет скин-фактора скважины типа {type_}')
+        except (TypeError, ValueError) as e:
+            results[i] = {'index': i, 'error': str(e) if isinstance(e, ValueError) else 'не задан замеренный дебит q'}
+            continue
+        index, rows, rates = groups.setdefault(type_, ([], [], []))
+        index.append(i)
+        rows.append(values)
+        rates.append(q)
+    for type_, (index, rows, rates) in groups.items():
+        solved = solve_group(type_, rows, target, np.array(rates), bracket)
+        for j, i in enumerate(index):
+            if not solved['converged'][j]:
+                results[i] = {'index': i, 'type': type_, 'S': float(solved['S'][j]),
+                              'error': 'решение не найдено: нет корня на интервале поиска либо нет сходимости'}
+                continue
+            results[i] = {'index': i, 'type': type_, **{name: float(solved[name][j]) for name in ('S', target)}}
+            if target != 'S':
+                results[i]['n_roots'] = int(solved['n_roots'][j])
+    return results
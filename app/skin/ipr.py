@@ -0,0 +1,149 @@
+import numpy as np
+from .batch import coerce_value, validate_row
+from .completions import COMPLETIONS, RATE_FIELDS, calc_skin, calc_rate, check_phi
+
+# Число точек кривой притока по умолчанию и предельные размеры запроса
+IPR_POINTS = 101
+MAX_IPR_POINTS = 10_001
+MAX_CURVES = 1000
+MAX_CURVE_POINTS = 2_000_000
+
+
+def validate_scenarios(scenarios) -> list:
+    """
+    Проверка сценариев скин-фактора
+
+    :param scenarios: список {"label": подпись, "S": суммарный скин-фактор} либо
+        {"label": подпись, параметр заканчивания: значение, ...}; пустой сценарий - текущее заканчивание;
+
+    :return: список словарей {"label", "S" (или None), "params": {параметр: значение}}
+    """
+    if scenarios is None:
+        return [{'label': 'base', 'S': None, 'params': {}}]
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError('scenarios должен быть непустым JSON-массивом сценариев')
+    checked = []
+    for j, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ValueError(f'сценарий {j}: ожидается JSON-объект')
+        params = {}
+        for name, value in scenario.items():
+            if name == 'label':
+                continue
+            try:
+                value = coerce_value(value)
+            except (TypeError, ValueError):
+                value = None
+            if value is None or not np.isfinite(value):
+                raise ValueError(f'сценарий {j}: параметр {name} должен быть конечным числом')
+            params[name] = value
+        S = params.pop('S', None)
+        if S is not None and params:
+            raise ValueError(f'сценарий {j}: задается либо суммарный скин-фактор S, либо параметры заканчивания')
+        checked.append({'label': str(scenario.get('label', j)), 'S': S, 'params': params})
+    return checked
+
+
+def ipr(wells: list, scenarios: list = None, n_points: int = IPR_POINTS) -> dict:
+    """
+    Кривые притока (дебит в зависимости от забойного давления от Pres до 0) для нескольких
+    заканчиваний и сценариев скин-фактора
+
+    Скин-фактор рассчитывается одним векторизованным вызовом на тип заканчивания для всех пар
+    (скважина, сценарий), дебит - одним вызовом для матрицы кривых x точек.
+
+    Parameters
+    ----------
+    :param wells: список словарей параметров скважин (как в plot0; Pwf необязателен -
+        при наличии возвращается дебит в рабочей точке q_op);
+    :param scenarios: сценарии скин-фактора (см. validate_scenarios), общие для всех скважин;
+    :param n_points: число точек кривой;
+
+    :return: {"Pwf": матрица кривых x точек, атм, "q": матрица дебитов, м3/сут, "curves": [{"well",
+        "type", "scenario", "label", "S", "q_max", "q_op"}], "errors": [{"index", "error"}]}
+
+    ----------
+    """
+    n_points = int(n_points)
+    if not 2 <= n_points <= MAX_IPR_POINTS:
+        raise ValueError(f'число точек кривой должно быть от 2 до {MAX_IPR_POINTS}')
+    scenarios = validate_scenarios(scenarios)
+    if len(wells)*len(scenarios) > MAX_CURVES:
+        raise ValueError(f'слишком много кривых: не более {MAX_CURVES} (скважины x сценарии)')
+    if len(wells)*len(scenarios)*n_points > MAX_CURVE_POINTS:
+        raise ValueError(f'слишком много точек: не более {MAX_CURVE_POINTS} (кривые x точки)')
+
+    curves, rows, errors = [], [], []
+    for i, well in enumerate(wells):
+        try:
+            # забойное давление задает только рабочую точку и может отсутствовать
+            operating = isinstance(well, dict) and well.get('Pwf') not in (None, '')
+            type_, values = validate_row(well if operating or not isinstance(well, dict) else {**well, 'Pwf': 0})
+            if not operating:
+                values['Pwf'] = np.nan
+            if not values['Pres'] > 0:
+                raise ValueError('пластовое давление Pres должно быть положительным')
+            fields = COMPLETIONS[type_][2]
+            for j, scenario in enumerate(scenarios):
+                unknown = [name for name in scenario['params'] if name not in fields]
+                if unknown:
+                    raise ValueError(f'сценарий {j}: параметры {", ".join(unknown)} не входят в расчет '
+                                     f'скин-фактора скважины типа {type_}')
+                if 'phi' in scenario['params'] and not check_phi(scenario['params']['phi']):
+                    raise ValueError(f'сценарий {j}: неизвестная фазировка перфорационных зарядов')
+        except (TypeError, ValueError) as e:
+            errors.append({'index': i, 'error': str(e)})
+            continue
+        for j, scenario in enumerate(scenarios):
+            curves.append({'well': i, 'type': type_, 'scenario': j, 'label': scenario['label']})
+            rows.append(({**values, **scenario['params']}, scenario['S']))
+
+    S = np.empty(len(rows))
+    for type_ in {curve['type'] for curve in curves}:
+        index = [n for n, curve in enumerate(curves) if curve['type'] == type_ and rows[n][1] is None]
+        if index:
+            fields = {field for n in index for field in rows[n][0]}
+            cols = {field: np.array([rows[n][0][field] for n in index]) for field in fields}
+            with np.errstate(all='ignore'):
+                S[index] = calc_skin(type_, cols)['S']
+    for n, (_, fixed) in enumerate(rows):
+        if fixed is not None:
+            S[n] = fixed
+
+    cols = {field: np.array([row[field] for row, _ in rows], dtype=float)[:, None] for field in RATE_FIELDS}
+    Pwf_op = cols['Pwf'][:, 0]
+    # доля депрессии от 0 (Pwf = Pres) до 1 (Pwf = 0)
+    Pwf = cols['Pres']*(1 - np.linspace(0, 1, n_points))
+    with np.errstate(all='ignore'):
+        q = calc_rate({**cols, 'Pwf': Pwf}, S[:, None])
+        q_op = calc_rate({**cols, 'Pwf': Pwf_op[:, None]}, S[:, None])[:, 0]
+    for n, curve in enumerate(curves):
+        curve.update({'S': float(S[n]), 'q_max': float(q[n, -1]),
+                      'q_op': float(q_op[n]) if np.isfinite(q_op[n]) else None})
+    return {'Pwf': Pwf, 'q': q, 'curves': curves, 'errors': errors}
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор запроса кривых притока
+
+    :param body: {"wells": [{параметры скважины}, ...] либо "well": {...}, "scenarios": [...],
+        "skins": [S1, S2, ...] (сокращение сценариев {"S": ...}), "n_points": 101};
+
+    :return: словарь аргументов функции ipr
+    """
+    if not isinstance(body, dict):
+        raise ValueError('тело запроса должно быть JSON-объектом')
+    wells = body.get('wells', [body['well']] if 'well' in body else None)
+    if not isinstance(wells, list) or not wells:
+        raise ValueError('ожидается скважина well либо непустой JSON-массив скважин wells')
+    scenarios = body.get('scenarios')
+    skins = body.get('skins')
+    if skins is not None:
+        if scenarios is not None:
+            raise ValueError('задаются либо scenarios, либо skins')
+        if not isinstance(skins, list) or not skins:
+            raise ValueError('skins должен быть непустым JSON-массивом чисел')
+        scenarios = [{'label': f'S={S}', 'S': S} for S in skins]
+    n_points = coerce_value(body.get('n_points'))
+    return {'wells': wells, 'scenarios': scenarios, 'n_points': IPR_POINTS if n_points is None else n_points}
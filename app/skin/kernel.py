@@ -0,0 +1,56 @@
+from types import MappingProxyType
+import numpy as np
+
+# Таблица коэффициентов Karakas-Tariq: фазировка, градусы -> (a, a1, a2, b1, b2, c1, c2).
+# Строится один раз при импорте и не изменяется, поэтому объекты Skin и VectorSkin
+# не хранят состояния и могут использоваться из разных потоков одновременно.
+KT_TABLE = MappingProxyType({
+    0: (0.250, -2.091, 0.0453, 5.1313, 1.8672, 1.6/10**1, 2.675),
+    360: (0.250, -2.091, 0.0453, 5.1313, 1.8672, 1.6/10**1, 2.675),
+    180: (0.500, -2.025, 0.0943, 3.0373, 1.8115, 2.6/10**2, 4.532),
+    120: (0.648, -2.018, 0.0634, 1.6136, 1.7770, 6.6/10**3, 5.320),
+    90: (0.726, -1.905, 0.1038, 1.5674, 1.6935, 1.9/10**3, 6.155),
+    60: (0.813, -1.898, 0.1023, 1.3654, 1.6490, 3.0/10**4, 7.509),
+    45: (0.860, -1.788, 0.2398, 1.1915, 1.6392, 4.6/10**5, 8.791),
+})
+
+# Та же таблица в виде массивов для векторизованного расчета (фазировки по возрастанию)
+KT_PHI = np.array(sorted(KT_TABLE), dtype=float)
+KT_COEFF = np.array([KT_TABLE[phi] for phi in sorted(KT_TABLE)])
+KT_PHI.flags.writeable = False
+KT_COEFF.flags.writeable = False
+
+
+def kt_coeff(phi: float) -> tuple:
+    """
+    Функция определения числовых коэффициентов, зависящих от фазировки перфорационных зарядов
+
+    Parameters
+    ----------
+    :param phi: фазировка перфорационных зарядов, градусы;
+
+    :return: (a, a1, a2, b1, b2, c1, c2)
+
+    ----------
+    """
+    return KT_TABLE[phi]
+
+
+def kt_coeff_arr(phi) -> np.ndarray:
+    """
+    Функция определения числовых коэффициентов для массива фазировок
+
+    Parameters
+    ----------
+    :param phi: фазировка перфорационных зарядов, градусы (скаляр или массив);
+
+    :return: массив формы phi.shape + (7,) с коэффициентами [a, a1, a2, b1, b2, c1, c2]
+
+    ----------
+    """
+    phi = np.asarray(phi, dtype=float)
+    idx = np.clip(np.searchsorted(KT_PHI, phi), 0, len(KT_PHI) - 1)
+    unknown = KT_PHI[idx] != phi
+    if unknown.any():
+        raise ValueError(f'Неизвестная фазировка перфорационных зарядов: {np.unique(phi[unknown]).tolist()}')
+    return KT_COEFF[idx]
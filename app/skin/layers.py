@@ -0,0 +1,126 @@
+import numpy as np
+from .batch import SKIN_COMPONENTS, calc_columns, coerce_value
+from .completions import COMPLETIONS, RATE_FIELDS
+
+# Предельное число пластов скважины и пластов всех скважин одного расчета
+MAX_LAYERS = 500
+MAX_LAYER_ROWS = 1_000_000
+
+# Параметры расчета; остальные поля скважины и пласта (подписи и т.п.) не учитываются
+PARAMS = frozenset(('type',) + RATE_FIELDS + sum((completion[2] for completion in COMPLETIONS.values()), ()))
+
+
+def numeric_params(params: dict) -> dict:
+    """
+    Параметры расчета, приведенные к float (nan - значение не задано)
+    """
+    values = {}
+    for name, value in params.items():
+        if name not in PARAMS:
+            continue
+        try:
+            value = coerce_value(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'параметр {name} должен быть числом: {value!r}')
+        values[name] = np.nan if value is None else value
+    return values
+
+
+def layer_columns(wells: list) -> tuple:
+    """
+    Столбцы параметров пластов всех скважин: параметры скважины, общие для пластов, дополняются
+    параметрами пласта (пласт может переопределить любой параметр, в том числе тип заканчивания)
+
+    :return: (словарь столбцов float (nan - значение не задано), номера скважин, номера пластов,
+        словарь ошибок разбора {номер скважины: сообщение})
+    """
+    rows, well_index, layer_index, errors = [], [], [], {}
+    for i, well in enumerate(wells):
+        try:
+            if not isinstance(well, dict):
+                raise ValueError('скважина должна быть JSON-объектом')
+            layers = well.get('layers')
+            if not isinstance(layers, list) or not layers:
+                raise ValueError('ожидается непустой JSON-массив пластов layers')
+            if len(layers) > MAX_LAYERS:
+                raise ValueError(f'слишком много пластов: не более {MAX_LAYERS}')
+            common = numeric_params(well)
+            well_rows = []
+            for j, layer in enumerate(layers):
+                if not isinstance(layer, dict):
+                    raise ValueError(f'пласт {j}: ожидается JSON-объект')
+                try:
+                    well_rows.append({**common, **numeric_params(layer)})
+                except ValueError as e:
+                    raise ValueError(f'пласт {j}: {e}')
+        except ValueError as e:
+            errors[i] = str(e)
+            continue
+        rows += well_rows
+        well_index += [i]*len(well_rows)
+        layer_index += range(len(well_rows))
+    if len(rows) > MAX_LAYER_ROWS:
+        raise ValueError(f'слишком много пластов: не более {MAX_LAYER_ROWS} по всем скважинам')
+    names = {name for row in rows for name in row} | {'type'}
+    cols = {name: np.array([row.get(name, np.nan) for row in rows], dtype=float) for name in names}
+    return cols, np.array(well_index, dtype=np.int64), np.array(layer_index, dtype=np.int64), errors
+
+
+def commingled(wells: list) -> dict:
+    """
+    Расчет скважин, эксплуатирующих несколько пластов совместно (без перетоков между пластами)
+
+    Скин-фактор каждого пласта рассчитывается по его типу заканчивания, дебит - по его проницаемости,
+    мощности, пластовому давлению и скин-фактору при общем забойном давлении Pwf. Пласты всех скважин
+    рассчитываются вместе, одним векторизованным вызовом на тип заканчивания (calc_columns).
+
+    Parameters
+    ----------
+    :param wells: список скважин {общие параметры (как в plot0), "layers": [{параметры пласта}, ...]};
+
+    :return: {"layers": столбцы well, layer, type, S, q, fraction (доля пласта в дебите скважины)
+        и составляющих скин-фактора, "wells": столбцы index, q (суммарный дебит), kh (сумма k*h),
+        n_layers, "errors": [{"index", "error"}]} - скважины с ошибкой в любом пласте не рассчитываются
+
+    ----------
+    """
+    cols, well_index, layer_index, errors = layer_columns(wells)
+    columns, layer_errors = calc_columns(cols)
+    for row, message in sorted(layer_errors.items(), reverse=True):
+        errors[int(well_index[row])] = f'пласт {layer_index[row]}: {message}'
+    n = len(wells)
+    failed = np.zeros(n, dtype=bool)
+    failed[list(errors)] = True
+    ok = ~failed[well_index]
+    q = np.where(ok, columns['q'], np.nan)
+    q_total = np.bincount(well_index[ok], q[ok], minlength=n).astype(float)
+    layer_kh = cols['k']*cols['h'] if 'k' in cols and 'h' in cols else np.full(well_index.size, np.nan)
+    kh = np.bincount(well_index[ok], layer_kh[ok], minlength=n).astype(float)
+    q_total[failed] = kh[failed] = np.nan
+    with np.errstate(all='ignore'):
+        fraction = q/q_total[well_index]
+    layers = {'well': well_index, 'layer': layer_index, 'type': columns['type'],
+              'S': np.where(ok, columns['S'], np.nan), 'q': q, 'fraction': fraction}
+    for name in SKIN_COMPONENTS:
+        layers[name] = np.where(ok, columns[name], np.nan)
+    return {
+        'layers': layers,
+        'wells': {'index': np.arange(n), 'q': q_total, 'kh': kh, 'n_layers': np.bincount(well_index, minlength=n)},
+        'errors': [{'index': i, 'error': errors[i]} for i in sorted(errors)],
+    }
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор запроса расчета многопластовых скважин
+
+    :param body: {"wells": [{параметры скважины, "layers": [...]}, ...]} либо {"well": {...}};
+
+    :return: словарь аргументов функции commingled
+    """
+    if not isinstance(body, dict):
+        raise ValueError('тело запроса должно быть JSON-объектом')
+    wells = body.get('wells', [body['well']] if 'well' in body else None)
+    if not isinstance(wells, list) or not wells:
+        raise ValueError('ожидается скважина well либо непустой JSON-массив скважин wells')
+    return {'wells': wells}
@@ -0,0 +1,275 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .batch import validate_row
+from .completions import COMPLETIONS, DEFAULTS, POSITIVE_FIELDS, calc_skin, calc_rate, required_fields
+
+# Вид распределения -> обязательные параметры
+DISTRIBUTIONS = {
+    'uniform': ('low', 'high'),
+    'normal': ('mean', 'std'),
+    'lognormal': ('mu', 'sigma'),
+    'triangular': ('left', 'mode', 'right'),
+}
+
+# Число узких интервалов гистограммы, по которым оцениваются процентили
+FINE_BINS = 4096
+
+# Предельный объем выборки одного расчета
+MAX_SAMPLES = 10_000_000
+
+
+def positive(field: str) -> bool:
+    """
+    Параметр допускает только положительные значения
+    """
+    return field in POSITIVE_FIELDS or field == 'kv_kh'
+
+
+def validate_distributions(type_: int, dists: dict) -> dict:
+    """
+    Проверка описаний распределений параметров
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания;
+    :param dists: словарь {параметр: {"dist": вид, параметры распределения}};
+        параметр kv_kh задает анизотропию, kv = k*kv_kh;
+
+    :return: словарь распределений с параметрами, приведенными к float
+
+    ----------
+    """
+    fields = set(required_fields(type_)) | set(COMPLETIONS[type_][2]) | {'kv_kh'}
+    checked = {}
+    for field, spec in dists.items():
+        if field not in fields or field in ('model', 'phi'):
+            raise ValueError(f'параметр {field} не может быть случайным для данного типа скважины')
+        if not isinstance(spec, dict) or spec.get('dist') not in DISTRIBUTIONS:
+            raise ValueError(f'{field}: вид распределения должен быть одним из {", ".join(DISTRIBUTIONS)}')
+        try:
+            checked[field] = {'dist': spec['dist'], **{arg: float(spec[arg]) for arg in DISTRIBUTIONS[spec['dist']]}}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'{field}: для распределения {spec["dist"]} нужны числовые параметры {", ".join(DISTRIBUTIONS[spec["dist"]])}')
+        spec = checked[field]
+        if spec['dist'] == 'uniform' and not spec['low'] < spec['high']:
+            raise ValueError(f'{field}: должно быть low < high')
+        if spec['dist'] in ('normal', 'lognormal') and not spec.get('std', spec.get('sigma')) >= 0:
+            raise ValueError(f'{field}: стандартное отклонение должно быть неотрицательным')
+        if spec['dist'] == 'triangular' and not (spec['left'] <= spec['mode'] <= spec['right'] and spec['left'] < spec['right']):
+            raise ValueError(f'{field}: должно быть left <= mode <= right, left < right')
+        if positive(field) and not spec.get('high', spec.get('right', np.inf)) > 0:
+            raise ValueError(f'{field}: параметр принимает только положительные значения, а распределение их не содержит')
+    return checked
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор и проверка запроса на расчет методом Монте-Карло
+
+    :param body: {"well": {параметры скважины}, "distributions": {...}, "n_samples", "seed", "bins", "processes"};
+
+    :return: словарь аргументов функции monte_carlo
+    """
+    type_, values = validate_row(body.get('well'))
+    n_samples = int(body.get('n_samples', 100_000))
+    if not 1 <= n_samples <= MAX_SAMPLES:
+        raise ValueError(f'объем выборки должен быть от 1 до {MAX_SAMPLES}')
+    return {
+        'type_': type_,
+        'values': values,
+        'dists': validate_distributions(type_, body.get('distributions') or {}),
+        'n_samples': n_samples,
+        'seed': int(body.get('seed', 0)),
+        'bins': min(max(int(body.get('bins', 50)), 1), 500),
+        'processes': min(max(int(body.get('processes', 1)), 1), os.cpu_count() or 1),
+    }
+
+
+def draw(rng: np.random.Generator, spec: dict, size: int) -> np.ndarray:
+    """
+    Генерация выборки заданного распределения
+    """
+    if spec['dist'] == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], size)
+    if spec['dist'] == 'normal':
+        return rng.normal(spec['mean'], spec['std'], size)
+    if spec['dist'] == 'lognormal':
+        return rng.lognormal(spec['mu'], spec['sigma'], size)
+    return rng.triangular(spec['left'], spec['mode'], spec['right'], size)
+
+
+def eval_chunk(type_: int, values: dict, dists: dict, seed, size: int) -> tuple:
+    """
+    Расчет одной порции выборки
+
+    Реализации, в которых положительный по смыслу параметр (k, h, kd, ...) получился
+    неположительным (например, из хвоста нормального распределения), не рассчитываются.
+
+    :return: (словарь массивов: суммарный скин-фактор S, его составляющие и дебит q;
+        число отброшенных реализаций)
+    """
+    rng = np.random.default_rng(seed)
+    cols = {field: np.full(size, float(value)) for field, value in {**DEFAULTS, **values}.items()}
+    valid = np.ones(size, dtype=bool)
+    for field, spec in dists.items():
+        cols[field] = draw(rng, spec, size)
+        if positive(field):
+            valid &= cols[field] > 0
+    n_invalid = int(size - valid.sum())
+    if n_invalid:
+        cols = {field: col[valid] for field, col in cols.items()}
+    if 'kv_kh' in cols:
+        cols['kv'] = cols['k']*cols.pop('kv_kh')
+    with np.errstate(all='ignore'):
+        out = calc_skin(type_, cols)
+        out['q'] = calc_rate(cols, out['S'])
+    return out, n_invalid
+
+
+def accumulate(out: dict, bounds: dict, n_invalid: int = 0) -> dict:
+    """
+    Накопление статистик порции выборки на фиксированных интервалах гистограмм
+    """
+    stats = {}
+    for name, x in out.items():
+        lo, hi = bounds[name]
+        finite = x[np.isfinite(x)]
+        stats[name] = {
+            'counts': np.histogram(finite, FINE_BINS, (lo, hi))[0],
+            'under': int((finite < lo).sum()),
+            'over': int((finite > hi).sum()),
+            'nonfinite': int(x.size - finite.size),
+            'invalid': n_invalid,
+            'sum': float(finite.sum()),
+            'sumsq': float((finite**2).sum()),
+            'min': float(finite.min()) if finite.size else np.inf,
+            'max': float(finite.max()) if finite.size else -np.inf,
+        }
+    return stats
+
+
+def merge(total: dict, stats: dict) -> dict:
+    """
+    Объединение накопленных статистик двух порций
+    """
+    for name, s in stats.items():
+        t = total[name]
+        t['counts'] = t['counts'] + s['counts']
+        for key in ('under', 'over', 'nonfinite', 'invalid', 'sum', 'sumsq'):
+            t[key] += s[key]
+        t['min'], t['max'] = min(t['min'], s['min']), max(t['max'], s['max'])
+    return total
+
+
+def _run_chunk(args) -> dict:
+    type_, values, dists, seed, size, bounds = args
+    out, n_invalid = eval_chunk(type_, values, dists, seed, size)
+    return accumulate(out, bounds, n_invalid)
+
+
+def percentile(stats: dict, bounds: tuple, p: float) -> float:
+    """
+    Оценка процентиля по накопленной гистограмме (линейная интерполяция внутри интервала)
+    """
+    n = stats['under'] + stats['counts'].sum() + stats['over']
+    if n == 0:
+        return float('nan')
+    rank = p/100*n
+    if rank <= stats['under']:
+        return stats['min']
+    cum = stats['under'] + np.cumsum(stats['counts'])
+    i = int(np.searchsorted(cum, rank))
+    if i >= FINE_BINS:
+        return stats['max']
+    lo, hi = bounds
+    width = (hi - lo)/FINE_BINS
+    prev = cum[i - 1] if i else stats['under']
+    value = lo + width*(i + (rank - prev)/max(cum[i] - prev, 1))
+    return float(min(max(value, stats['min']), stats['max']))
+
+
+def monte_carlo(type_: int, values: dict, dists: dict, n_samples: int = 100_000, seed: int = 0,
+                chunk_size: int = 100_000, bins: int = 50, processes: int = 1, progress=None) -> dict:
+    """
+    Расчет неопределенности скин-фактора и дебита методом Монте-Карло
+
+    Выборка рассчитывается векторизованно порциями по chunk_size, так что потребление памяти
+    не зависит от n_samples. По первой порции фиксируются границы гистограмм, по которым затем
+    накапливаются все порции. Каждая порция имеет собственный генератор, порожденный от seed,
+    поэтому результат воспроизводим и не зависит от числа процессов.
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    :param values: словарь детерминированных параметров скважины (после validate_row);
+    :param dists: словарь распределений случайных параметров (см. validate_distributions);
+    :param n_samples: объем выборки;
+    :param seed: начальное значение генератора случайных чисел;
+    :param chunk_size: размер порции;
+    :param bins: число интервалов возвращаемых гистограмм;
+    :param processes: число процессов для расчета порций (1 - расчет в текущем процессе);
+    :param progress: функция, вызываемая с долей выполненной работы после каждой порции;
+
+    :return: словарь {величина: {P10, P50, P90, mean, std, min, max, n_nonfinite, n_invalid, hist, edges}}
+        для суммарного скин-фактора S, его составляющих и дебита q; P10/P50/P90 -
+        10-й, 50-й и 90-й процентили (вероятность непревышения); n_invalid - число реализаций
+        с неположительными значениями положительных параметров, исключенных из статистик
+
+    ----------
+    """
+    sizes = [chunk_size]*(n_samples//chunk_size) + ([n_samples % chunk_size] if n_samples % chunk_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    pilot, n_invalid = eval_chunk(type_, values, dists, seeds[0], sizes[0])
+    bounds = {}
+    for name, x in pilot.items():
+        finite = x[np.isfinite(x)]
+        lo, hi = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+        margin = 0.25*(hi - lo) or 0.5*abs(lo) or 1.0
+        bounds[name] = (float(lo - margin), float(hi + margin))
+    total = accumulate(pilot, bounds, n_invalid)
+    del pilot
+    done = sizes[0]
+    if progress:
+        progress(done/n_samples)
+
+    tasks = [(type_, values, dists, s, size, bounds) for s, size in zip(seeds[1:], sizes[1:])]
+    if processes > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for task, stats in zip(tasks, pool.map(_run_chunk, tasks)):
+                merge(total, stats)
+                done += task[4]
+                if progress:
+                    progress(done/n_samples)
+    else:
+        for task in tasks:
+            merge(total, _run_chunk(task))
+            done += task[4]
+            if progress:
+                progress(done/n_samples)
+
+    result = {}
+    for name, stats in total.items():
+        n = stats['under'] + int(stats['counts'].sum()) + stats['over']
+        mean = stats['sum']/n if n else float('nan')
+        lo, hi = bounds[name]
+        starts = np.linspace(0, FINE_BINS, bins, endpoint=False).astype(int)
+        counts = np.add.reduceat(stats['counts'], starts)
+        # крайние интервалы включают значения, вышедшие за границы, зафиксированные по первой порции
+        counts[0] += stats['under']
+        counts[-1] += stats['over']
+        result[name] = {
+            'P10': percentile(stats, bounds[name], 10),
+            'P50': percentile(stats, bounds[name], 50),
+            'P90': percentile(stats, bounds[name], 90),
+            'mean': mean,
+            'std': float(np.sqrt(max(stats['sumsq']/n - mean**2, 0))) if n else float('nan'),
+            'min': stats['min'],
+            'max': stats['max'],
+            'n_nonfinite': stats['nonfinite'],
+            'n_invalid': stats['invalid'],
+            'hist': counts.tolist(),
+            'edges': (lo + (hi - lo)/FINE_BINS*np.append(starts, FINE_BINS)).tolist(),
+        }
+    return result
@@ -0,0 +1,106 @@
+import numpy as np
+from .completions import DEFAULTS, calc_skin, calc_rate, check_phi
+from .sweep import axis_values, MAX_GRID_POINTS
+
+# Типы заканчивания перфорированных скважин
+PERFORATED_TYPES = (20, 21, 40, 41)
+
+# Фазировки таблицы Karakas-Tariq (360 совпадает с 0)
+PHASINGS = (0, 45, 60, 90, 120, 180)
+
+# Оптимизируемые параметры перфорации
+DESIGN_FIELDS = ('phi', 'Lp', 'ns', 'rp')
+
+
+def design_values(spec) -> np.ndarray:
+    """
+    Значения параметра перфорации для перебора: список, описание оси (см. axis_values) либо базовое значение
+    """
+    if isinstance(spec, dict):
+        return axis_values(spec)
+    return np.atleast_1d(np.asarray(spec, dtype=float))
+
+
+def pareto_front(loss: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """
+    Индексы вариантов, не доминируемых одновременно по целевой функции и стоимости (обе минимизируются)
+    """
+    if loss.size == 0:
+        return np.array([], dtype=int)
+    order = np.lexsort((loss, cost))
+    best = np.minimum.accumulate(loss[order])
+    improved = np.concatenate(([True], best[1:] < best[:-1]))
+    return order[improved]
+
+
+def optimize_perforation(type_: int, values: dict, design: dict = None, objective: str = 'q',
+                         cost: dict = None, max_cost: float = None, top: int = 10) -> dict:
+    """
+    Подбор параметров перфорации: перебор фазировки, длины и радиуса каналов, плотности перфорации
+
+    Все варианты сетки phi x Lp x ns x rp рассчитываются одним векторизованным вызовом.
+    Стоимость варианта: число отверстий ns*L, где L - длина интервала перфорации (hw для частично
+    перфорированных скважин, иначе h), умноженное на стоимость одного отверстия
+    shot + Lp*Lp_cost + rp*rp_cost.
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания перфорированной скважины (20, 21, 40, 41);
+    :param values: словарь параметров скважины (после validate_row);
+    :param design: словарь {параметр перфорации: значения}, по умолчанию фазировки - PHASINGS,
+        остальные параметры - базовые значения скважины;
+    :param objective: 'q' - максимизация дебита; 'S' - минимизация скин-фактора;
+    :param cost: коэффициенты стоимости {"shot": 1, "Lp_cost": 0, "rp_cost": 0};
+    :param max_cost: ограничение стоимости;
+    :param top: число лучших вариантов в ответе;
+
+    :return: словарь с лучшими вариантами, фронтом Парето (целевая функция - стоимость)
+        и числом рассмотренных вариантов
+
+    ----------
+    """
+    if type_ not in PERFORATED_TYPES:
+        raise ValueError('подбор перфорации возможен только для перфорированных скважин (20, 21, 40, 41)')
+    if objective not in ('q', 'S'):
+        raise ValueError("целевая функция должна быть 'q' или 'S'")
+    design = dict(design or {})
+    unknown = [field for field in design if field not in DESIGN_FIELDS]
+    if unknown:
+        raise ValueError(f'неизвестные параметры перфорации: {", ".join(unknown)}')
+    design.setdefault('phi', PHASINGS)
+    grids = [design_values(design.get(field, values[field])) for field in DESIGN_FIELDS]
+    if not check_phi(grids[0]):
+        raise ValueError('допустимы только фазировки из таблицы Karakas-Tariq')
+    size = int(np.prod([grid.size for grid in grids]))
+    if size > MAX_GRID_POINTS:
+        raise ValueError(f'слишком много вариантов: {size} (не более {MAX_GRID_POINTS})')
+
+    cols = {field: np.full(size, float(value)) for field, value in {**DEFAULTS, **values}.items()}
+    for field, column in zip(DESIGN_FIELDS, np.meshgrid(*grids, indexing='ij')):
+        cols[field] = column.ravel()
+    with np.errstate(all='ignore'):
+        S = calc_skin(type_, cols)['S']
+        q = calc_rate(cols, S)
+
+    cost = {key: float(value) for key, value in {'shot': 1.0, 'Lp_cost': 0.0, 'rp_cost': 0.0, **(cost or {})}.items()}
+    length = cols['hw'] if type_ in (21, 41) else cols['h']
+    total_cost = cols['ns']*length*(cost['shot'] + cols['Lp']*cost['Lp_cost'] + cols['rp']*cost['rp_cost'])
+
+    loss = -q if objective == 'q' else S
+    feasible = np.isfinite(loss)
+    if max_cost is not None:
+        feasible &= total_cost <= max_cost
+    index = np.flatnonzero(feasible)
+
+    def design_row(i):
+        return {**{field: float(cols[field][i]) for field in DESIGN_FIELDS},
+                'S': float(S[i]), 'q': float(q[i]), 'cost': float(total_cost[i])}
+
+    best = index[np.argsort(loss[index], kind='stable')[:top]]
+    front = index[pareto_front(loss[index], total_cost[index])]
+    return {
+        'n_designs': size,
+        'n_feasible': int(index.size),
+        'best': [design_row(i) for i in best],
+        'pareto': [design_row(i) for i in front],
+    }
@@ -0,0 +1,111 @@
+import numpy as np
+from .completions import COMPLETIONS, DEFAULTS, calc_skin, calc_rate, required_fields
+
+# Дискретные параметры, по которым производные не рассчитываются
+DISCRETE_FIELDS = ('model', 'phi')
+
+
+def continuous_fields(type_: int) -> tuple:
+    """
+    Список непрерывных параметров скважины заданного типа, по которым рассчитывается чувствительность
+    """
+    fields = required_fields(type_) + tuple(field for field in DEFAULTS if field in COMPLETIONS[type_][2])
+    return tuple(field for field in fields if field not in DISCRETE_FIELDS)
+
+
+def validate_ranges(type_: int, ranges: dict) -> dict:
+    """
+    Проверка диапазонов параметров для диаграммы "торнадо"
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания;
+    :param ranges: словарь {параметр: [минимум, максимум]};
+
+    :return: словарь {параметр: (минимум, максимум)} со значениями, приведенными к float
+
+    ----------
+    """
+    if not isinstance(ranges, dict):
+        raise ValueError('ranges должен быть JSON-объектом {параметр: [минимум, максимум]}')
+    fields = continuous_fields(type_)
+    unknown = [field for field in ranges if field not in fields]
+    if unknown:
+        raise ValueError(f'параметры не влияют на расчет данного типа скважины: {", ".join(unknown)}')
+    checked = {}
+    for field, bounds in ranges.items():
+        message = f'{field}: диапазон должен быть парой конечных чисел [минимум, максимум]'
+        if not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+            raise ValueError(message)
+        try:
+            low, high = float(bounds[0]), float(bounds[1])
+        except (TypeError, ValueError):
+            raise ValueError(message)
+        if not np.isfinite([low, high]).all():
+            raise ValueError(message)
+        if not low < high:
+            raise ValueError(f'{field}: должно быть минимум < максимум')
+        checked[field] = (low, high)
+    return checked
+
+
+def sensitivity(type_: int, values: dict, ranges: dict = None, rel_step: float = 6e-6) -> dict:
+    """
+    Анализ чувствительности скин-фактора и дебита к входным параметрам
+
+    Производные рассчитываются центральными разностями: базовый вариант, все возмущенные варианты
+    и крайние точки диапазонов для диаграммы "торнадо" собираются в один массив и рассчитываются
+    одним векторизованным вызовом.
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    :param values: словарь параметров базового варианта (после validate_row);
+    :param ranges: словарь {параметр: [минимум, максимум]} для диаграммы "торнадо" (см. validate_ranges);
+    :param rel_step: относительный шаг дифференцирования;
+
+    :return: словарь с базовым скин-фактором и дебитом, производными dS/dx, dq/dx,
+        эластичностью дебита (dq/dx * x/q) и столбцами диаграммы "торнадо"
+
+    ----------
+    """
+    ranges = validate_ranges(type_, ranges or {})
+    fields = continuous_fields(type_)
+    values = {**DEFAULTS, **values}
+    n, n_tornado = len(fields), len(ranges)
+    size = 1 + 2*n + 2*n_tornado
+    cols = {field: np.full(size, float(value)) for field, value in values.items()}
+    steps = np.empty(n)
+    for i, field in enumerate(fields):
+        x = cols[field][0]
+        steps[i] = rel_step*abs(x) if x != 0 else rel_step
+        cols[field][1 + i] = x + steps[i]
+        cols[field][1 + n + i] = x - steps[i]
+    for j, (field, (low, high)) in enumerate(ranges.items()):
+        cols[field][1 + 2*n + j] = low
+        cols[field][1 + 2*n + n_tornado + j] = high
+
+    with np.errstate(all='ignore'):
+        S = calc_skin(type_, cols)['S']
+        q = calc_rate(cols, S)
+
+    dS = (S[1:1 + n] - S[1 + n:1 + 2*n])/(2*steps)
+    dq = (q[1:1 + n] - q[1 + n:1 + 2*n])/(2*steps)
+    base = np.array([values[field] for field in fields])
+    tornado = []
+    for j, (field, (low, high)) in enumerate(ranges.items()):
+        lo, hi = 1 + 2*n + j, 1 + 2*n + n_tornado + j
+        tornado.append({
+            'param': field, 'low': float(low), 'high': float(high),
+            'S_low': float(S[lo]), 'S_high': float(S[hi]),
+            'q_low': float(q[lo]), 'q_high': float(q[hi]),
+        })
+    tornado.sort(key=lambda bar: -abs(bar['q_high'] - bar['q_low']))
+    return {
+        'S': float(S[0]),
+        'q': float(q[0]),
+        'dS': dict(zip(fields, dS.tolist())),
+        'dq': dict(zip(fields, dq.tolist())),
+        'elasticity_q': dict(zip(fields, (dq*base/q[0]).tolist())),
+        'tornado': tornado,
+    }
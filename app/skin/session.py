@@ -0,0 +1,180 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from .completions import COMPLETIONS, DEFAULTS, POSITIVE_FIELDS, RATE_FIELDS
+from .skin import q_well
+from .vector_skin import VectorSkin
+
+skin = VectorSkin()
+
+
+def _Sh(phi, rw, Lp):
+    return skin.calc_Sh(rw, skin.coeff(phi)[..., 0], Lp)
+
+
+def _Sv(phi, rp, ns, Lp, kh, kv):
+    coeff = skin.coeff(phi)
+    return skin.calc_Sv([coeff[..., 1], coeff[..., 2], coeff[..., 3], coeff[..., 4]], rp, ns, Lp, kh, kv)
+
+
+def _Swb(phi, rw, Lp):
+    coeff = skin.coeff(phi)
+    return skin.calc_Swb([coeff[..., 5], coeff[..., 6]], rw, Lp)
+
+
+def _perf(Sd, Sh, Sv, Swb, Scz, k, kd):
+    return Sd + k/kd*(Sh + Sv + Swb) + Scz
+
+
+# Граф составляющих скин-фактора: имя -> (зависимости, функция)
+GRAPH = {
+    'Sd': (('k', 'kd', 'rw', 'rd'), skin.calc_Sd),
+    'Sh': (('phi', 'rw', 'Lp'), _Sh),
+    'Sv': (('phi', 'rp', 'ns', 'Lp', 'kh', 'kv'), _Sv),
+    'Swb': (('phi', 'rw', 'Lp'), _Swb),
+    'Scz': (('ns', 'Lp', 'k', 'kcz', 'kd', 'rcz', 'rp'), skin.calc_Scz),
+    'Spp': (('model', 'h', 'hw', 'rw', 'zw', 'kh', 'kv'), skin.calc_Spp),
+    'Steta': (('model', 'teta', 'kh', 'kv', 'h', 'hw', 'rw', 'zw'), skin.calc_Steta),
+    'Sopp': (('teta', 'kh', 'kv', 'h', 'hw', 'rw', 'zw'), skin.calc_Sopp),
+}
+
+# Суммарный скин-фактор по типам заканчивания: тип -> (зависимости, функция)
+TOTALS = {
+    10: (('Sd',), lambda Sd: Sd),
+    11: (('Sd', 'Spp', 'y', 'h', 'hw'), lambda Sd, Spp, y, h, hw: 1/y*h/hw*Sd + Spp),
+    20: (('Sd', 'Sh', 'Sv', 'Swb', 'Scz', 'k', 'kd'), _perf),
+    21: (('Sd', 'Sh', 'Sv', 'Swb', 'Scz', 'k', 'kd', 'Spp', 'h', 'hw', 'y'),
+         lambda Sd, Sh, Sv, Swb, Scz, k, kd, Spp, h, hw, y: h/hw/y*_perf(Sd, Sh, Sv, Swb, Scz, k, kd) + Spp),
+    30: (('Sd', 'Steta', 'teta'), lambda Sd, Steta, teta: np.cos(teta)*Sd + Steta),
+    31: (('Sd', 'Sopp', 'h', 'Lwpc'), lambda Sd, Sopp, h, Lwpc: h/Lwpc*Sd + Sopp),
+    40: (('Sd', 'Sh', 'Sv', 'Swb', 'Scz', 'k', 'kd', 'Steta', 'teta'),
+         lambda Sd, Sh, Sv, Swb, Scz, k, kd, Steta, teta: np.cos(teta)*_perf(Sd, Sh, Sv, Swb, Scz, k, kd) + Steta),
+    41: (('Sd', 'Sh', 'Sv', 'Swb', 'Scz', 'k', 'kd', 'Sopp', 'teta'),
+         lambda Sd, Sh, Sv, Swb, Scz, k, kd, Sopp, teta: np.cos(teta)*_perf(Sd, Sh, Sv, Swb, Scz, k, kd) + Sopp),
+}
+
+
+def value_key(value):
+    """
+    Хешируемый ключ значения параметра (скаляра или массива)
+    """
+    arr = np.asarray(value, dtype=float)
+    if arr.ndim == 0:
+        return float(arr)
+    return arr.shape, hashlib.blake2b(np.ascontiguousarray(arr).tobytes(), digest_size=16).digest()
+
+
+class SkinSession:
+    """
+    Сессия расчета скважины с инкрементальным пересчетом
+
+    Составляющие скин-фактора образуют граф зависимостей от входных параметров, результат
+    каждой составляющей кешируется по значениям ее зависимостей. При изменении параметра
+    пересчитываются только зависящие от него составляющие, суммарный скин-фактор и дебит.
+    Параметр может быть задан массивом - тогда расчет выполняется как сканирование, а
+    составляющие, не зависящие от него, берутся из кеша.
+
+    update - изменение параметров и пересчет
+
+    result - текущий результат расчета
+    """
+    def __init__(self, type_: int, values: dict, cache_size: int = 32) -> None:
+        self.type_ = type_
+        self.cache_size = cache_size
+        self.inputs, self.keys = {}, {}
+        self.cache = {name: OrderedDict() for name in list(GRAPH) + ['S', 'q']}
+        self.explicit_kh = False
+        self.recomputed = []
+        self.lock = threading.Lock()
+        self._set({**DEFAULTS, **values})
+
+    def update(self, **changes) -> dict:
+        """
+        Метод изменения параметров скважины и пересчета результата
+
+        :param changes: новые значения параметров (скаляры или массивы);
+
+        При ошибке параметры сессии остаются прежними.
+        """
+        self._check(changes)
+        inputs, keys, explicit_kh = dict(self.inputs), dict(self.keys), self.explicit_kh
+        try:
+            self._set(changes)
+            return self.result()
+        except ValueError:
+            self.inputs, self.keys, self.explicit_kh = inputs, keys, explicit_kh
+            raise
+
+    def _check(self, changes: dict) -> None:
+        fields = set(RATE_FIELDS) | set(COMPLETIONS[self.type_][2]) | set(DEFAULTS) | {'kh'}
+        shapes = {name: np.shape(value) for name, value in self.inputs.items()}
+        for name, value in changes.items():
+            if name not in fields:
+                raise ValueError(f'параметр {name} не входит в расчет скважины типа {self.type_}')
+            if (name in POSITIVE_FIELDS or name == 'kh') and not np.all(np.asarray(value, dtype=float) > 0):
+                raise ValueError(f'параметр {name} должен быть положительным')
+            shapes[name] = np.shape(value)
+        if not (self.explicit_kh or 'kh' in changes):
+            shapes['kh'] = shapes['k']
+        try:
+            np.broadcast_shapes(*shapes.values())
+        except ValueError:
+            scans = ', '.join(f'{name} ({shape[0]})' for name, shape in shapes.items() if shape)
+            raise ValueError(f'размеры массивов параметров не согласованы: {scans}')
+
+    def _set(self, changes: dict) -> None:
+        if 'kh' in changes:
+            self.explicit_kh = True
+        for name, value in changes.items():
+            self.inputs[name] = np.asarray(value, dtype=float) if np.ndim(value) else float(value)
+            self.keys[name] = value_key(value)
+        if not self.explicit_kh:
+            self.inputs['kh'], self.keys['kh'] = self.inputs['k'], self.keys['k']
+
+    def result(self) -> dict:
+        """
+        Метод расчета текущего результата
+
+        :return: словарь с суммарным скин-фактором S, составляющими skin, дебитом q
+            и списком пересчитанных составляющих recomputed
+
+        ----------
+        """
+        self.recomputed, seen = [], {}
+        deps, func = TOTALS[self.type_]
+        S = self._node('S', deps, func, seen)
+        q = self._node('q', ('S',) + RATE_FIELDS,
+                       lambda S, k, h, Pres, Pwf, mu, B, re, rw: q_well(k, h, Pres, Pwf, mu, B, re, rw, S), seen)
+        components = {name: seen[name][1] for name in GRAPH if name in seen}
+        if 'Sh' in components:
+            components['Sp'] = components['Sh'] + components['Sv'] + components['Swb']
+        return {'S': S, 'skin': components, 'q': q, 'recomputed': list(self.recomputed)}
+
+    def _get(self, name: str, seen: dict):
+        if name in seen:
+            return seen[name]
+        if name in GRAPH:
+            deps, func = GRAPH[name]
+            self._node(name, deps, func, seen)
+            return seen[name]
+        if name not in self.inputs:
+            raise ValueError(f'не задан параметр {name}')
+        return self.keys[name], self.inputs[name]
+
+    def _node(self, name: str, deps: tuple, func, seen: dict):
+        args = [self._get(dep, seen) for dep in deps]
+        key = tuple(arg[0] for arg in args)
+        cache = self.cache[name]
+        if key in cache:
+            cache.move_to_end(key)
+            value = cache[key]
+        else:
+            with np.errstate(all='ignore'):
+                value = func(*(arg[1] for arg in args))
+            cache[key] = value
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+            self.recomputed.append(name)
+        seen[name] = ((name, key), value)
+        return value
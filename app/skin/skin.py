@@ -1,5 +1,6 @@
 import math as m
 import numpy as np
+from .kernel import KT_TABLE, kt_coeff
 
 def p_ss_atma(p_res_atma = 250,
               q_liq_sm3day = 50,
@@ -45,8 +46,75 @@ def q_well(k: float, h: float, Pres: float, Pwf: float, mu: float, B: float, re:
 
     ----------
     """
-    return k*h*(Pres-Pwf)/(18.4*mu*B*(m.log1p(re/rw)+S-0.75))
+    return k*h*(Pres-Pwf)/(18.4*mu*B*(np.log1p(re/rw)+S-0.75))
+
+def r_grid(rw: float, r_max: float, n: int = 100, spacing: str = 'log', func = None):
+    """
+    Функция построения сетки расстояний от скважины для расчета профиля давления
+
+    Parameters
+    ----------
+    :param rw: радиус скважины, м
+    :param r_max: внешний радиус сетки, м
+    :param n: число точек
+    :param spacing: 'linear' - равномерная сетка; 'log' - логарифмическая сетка;
+        'adaptive' - сетка, сгущающаяся там, где велика кривизна профиля func(r)
+    :param func: векторизованная функция профиля давления от r (для spacing='adaptive')
+
+    :return r: массив расстояний, м
+
+    ----------
+    """
+    if spacing == 'linear':
+        return np.linspace(rw, r_max, n)
+    if spacing == 'log':
+        return np.geomspace(rw, r_max, n)
+    if spacing == 'adaptive':
+        # сетка распределяется равномерно по интегралу от sqrt|p''|, что выравнивает
+        # погрешность кусочно-линейной интерполяции профиля между соседними точками
+        r_fine = np.geomspace(rw, r_max, 16*n)
+        p_fine = func(r_fine)
+        d2p = np.gradient(np.gradient(p_fine, r_fine), r_fine)
+        density = np.sqrt(np.abs(d2p))
+        density += 1e-3*density.max() + 1e-12
+        cum = np.concatenate(([0], np.cumsum(0.5*(density[1:] + density[:-1])*np.diff(r_fine))))
+        r = np.interp(np.linspace(0, cum[-1], n), cum, r_fine)
+        r[0], r[-1] = rw, r_max
+        return r
+    raise ValueError(f'Неизвестный способ построения сетки: {spacing}')
+
+def p_profile(p_res_atma: float, q_liq_sm3day: float, mu_cP: float, B_m3m3: float, k_mD: float, h_m: float,
+              r_e: float, S: float, rw: float, n: int = 100, r_max: float = None, spacing: str = 'log'):
+    """
+    Функция расчета профиля давления в пласте для стационарного решения одним векторным вызовом p_ss_atma
+
+    Parameters
+    ----------
+    :param p_res_atma: пластовое давление, давление на контуре питания, атм
+    :param q_liq_sm3day: дебит жидкости на поверхности в стандартных условиях, м3/сут
+    :param mu_cP: вязкость нефти (в пластовых условиях), сПз
+    :param B_m3m3: объемный коэффициент нефти, м3/м3
+    :param k_mD: проницаемость пласта, мД
+    :param h_m: мощность пласта, м
+    :param r_e: радиус контрура питания, м
+    :param S: скин фактора (расчетный)
+    :param rw: радиус скважины, м
+    :param n: число точек профиля
+    :param r_max: внешний радиус профиля, м (по умолчанию - радиус контура питания r_e)
+    :param spacing: способ построения сетки ('log', 'linear', 'adaptive'), см. r_grid
+
+    :return r, p: массивы расстояний, м, и давлений, атм
+
+    ----------
+    """
+    def func(r):
+        return p_ss_atma(p_res_atma, q_liq_sm3day, mu_cP, B_m3m3, k_mD, h_m, r_e, S, r)
+
+    r = r_grid(rw, r_e if r_max is None else r_max, n, spacing, func)
+    return r, func(r)
 class Skin:
+    table = KT_TABLE
+
     def calc_Sd(self, k: float, kd: float, rw: float, rd: float) -> float:
         """
         Метод расчета механического скин-фактора
@@ -116,42 +184,30 @@ class Skin:
 
         ----------
         """
-        self.set_coeff(phi)
-        Sp = self.calc_Sh(rw, self.a, Lp) + self.calc_Sv(
-            [self.a1, self.a2, self.b1, self.b2],
+        a, a1, a2, b1, b2, c1, c2 = self.set_coeff(phi)
+        Sp = self.calc_Sh(rw, a, Lp) + self.calc_Sv(
+            [a1, a2, b1, b2],
             rp, ns, Lp, kh, kv
         ) + self.calc_Swb(
-            [self.c1, self.c2],
+            [c1, c2],
             rw, Lp
         )
         return Sp
 
-    def set_coeff(self, phi: int) -> None:
+    def set_coeff(self, phi: int) -> tuple:
         """
         Метод определения числовых коэффициентов, зависящих от фазировки перфорационных зарядов
+        (по неизменяемой таблице KT_TABLE, состояние объекта не изменяется)
 
         Parameters
         ----------
         :param phi: фазировка перфорационных зарядов, градусы;
 
+        :return: (a, a1, a2, b1, b2, c1, c2)
+
         ----------
         """
-        self.table = {
-            0: [0.250, -2.091, 0.0453, 5.1313, 1.8672, 1.6/10**1, 2.675],
-            360: [0.250, -2.091, 0.0453, 5.1313, 1.8672, 1.6/10**1, 2.675],
-            180: [0.500, -2.025, 0.0943, 3.0373, 1.8115, 2.6/10**2, 4.532],
-            120: [0.648, -2.018, 0.0634, 1.6136, 1.7770, 6.6/10**3, 5.320],
-            90: [0.726, -1.905, 0.1038, 1.5674, 1.6935, 1.9/10**3, 6.155],
-            60: [0.813, -1.898, 0.1023, 1.3654, 1.6490, 3.0/10**4, 7.509],
-            45: [0.860, -1.788, 0.2398, 1.1915, 1.6392, 4.6/10**5, 8.791],
-        }
-        self.a = self.table[phi][0]
-        self.a1 = self.table[phi][1]
-        self.a2 = self.table[phi][2]
-        self.b1 = self.table[phi][3]
-        self.b2 = self.table[phi][4]
-        self.c1 = self.table[phi][5]
-        self.c2 = self.table[phi][6]
+        return kt_coeff(phi)
 
     def calc_Sh(self, rw: float, a: float, Lp: float) -> float:
         """
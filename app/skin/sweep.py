@@ -0,0 +1,127 @@
+import math
+import numpy as np
+from .batch import validate_row
+from .completions import COMPLETIONS, DEFAULTS, calc_skin, calc_rate, check_phi, required_fields
+
+# Предельное число узлов сетки одного расчета
+MAX_GRID_POINTS = 4_000_000
+
+
+def axis_size(spec: dict) -> int:
+    """
+    Число значений вдоль оси сетки; проверяется до построения массива значений
+
+    :param spec: описание оси, см. axis_values;
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('ось сетки должна быть JSON-объектом')
+    name = spec.get('param')
+    if 'values' in spec:
+        if not isinstance(spec['values'], list) or not spec['values']:
+            raise ValueError(f'ось {name}: values должен быть непустым списком чисел')
+        return len(spec['values'])
+    for key in ('start', 'stop', 'num'):
+        if key not in spec:
+            raise ValueError(f'ось {name}: не задан параметр {key} (либо список значений values)')
+    try:
+        num = int(spec['num'])
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'ось {name}: число узлов num должно быть целым числом')
+    if not 1 <= num <= MAX_GRID_POINTS:
+        raise ValueError(f'ось {name}: число узлов num должно быть от 1 до {MAX_GRID_POINTS}')
+    return num
+
+
+def axis_values(spec: dict) -> np.ndarray:
+    """
+    Значения параметра вдоль оси сетки
+
+    :param spec: {"param": имя, "values": [...]} либо {"param": имя, "start", "stop", "num", "log": false};
+    """
+    num = axis_size(spec)
+    name = spec.get('param')
+    try:
+        if 'values' in spec:
+            values = np.asarray(spec['values'], dtype=float)
+        else:
+            start, stop = float(spec['start']), float(spec['stop'])
+    except (TypeError, ValueError):
+        raise ValueError(f'ось {name}: значения оси должны быть числами')
+    if 'values' in spec:
+        if values.ndim != 1:
+            raise ValueError(f'ось {name}: values должен быть непустым списком чисел')
+        return values
+    if spec.get('log'):
+        if not start*stop > 0:
+            raise ValueError(f'ось {name}: для логарифмической оси start и stop должны быть ненулевыми и одного знака')
+        return np.geomspace(start, stop, num)
+    return np.linspace(start, stop, num)
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор запроса на расчет сетки
+
+    :param body: {"well": {параметры скважины}, "axes": [описания осей]};
+
+    :return: словарь аргументов функции sweep
+    """
+    type_, values = validate_row(body.get('well'))
+    return {'type_': type_, 'values': values, 'axes': body.get('axes') or []}
+
+
+def grid_size(axes: list) -> int:
+    """
+    Число узлов сетки
+    """
+    return math.prod(axis_size(spec) for spec in axes)
+
+
+def sweep(type_: int, values: dict, axes: list, chunk_size: int = 50_000):
+    """
+    Расчет скин-фактора и дебита на сетке по одному или двум параметрам
+
+    Генератор: сетка рассчитывается векторизованно порциями по chunk_size узлов,
+    так что даже сетка 1000x1000 не хранится в памяти целиком.
+
+    Parameters
+    ----------
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    :param values: словарь фиксированных параметров скважины (после validate_row);
+    :param axes: список из одной или двух осей, см. axis_values;
+    :param chunk_size: число узлов сетки в одной порции;
+
+    :return: генератор словарей столбцов {параметр оси: [...], "S": [...], "q": [...]} по порциям
+
+    ----------
+    """
+    if not isinstance(axes, list) or not 1 <= len(axes) <= 2:
+        raise ValueError('сетка задается одной или двумя осями')
+    # размер сетки проверяется до построения значений осей
+    shape = tuple(axis_size(spec) for spec in axes)
+    size = math.prod(shape)
+    if size > MAX_GRID_POINTS:
+        raise ValueError(f'сетка слишком велика: {size} узлов (не более {MAX_GRID_POINTS})')
+    fields = set(required_fields(type_)) | set(COMPLETIONS[type_][2])
+    names = [spec.get('param') for spec in axes]
+    for name in names:
+        if name not in fields:
+            raise ValueError(f'параметр {name} не влияет на расчет данного типа скважины')
+    if len(set(names)) != len(names):
+        raise ValueError('оси сетки должны задавать разные параметры')
+    grids = [axis_values(spec) for spec in axes]
+    if 'phi' in names and not check_phi(grids[names.index('phi')]):
+        raise ValueError('ось phi: допустимы только фазировки из таблицы Karakas-Tariq')
+    return _sweep(type_, {**DEFAULTS, **values}, names, grids, shape, size, chunk_size)
+
+
+def _sweep(type_, values, names, grids, shape, size, chunk_size):
+    for start in range(0, size, chunk_size):
+        flat = np.arange(start, min(start + chunk_size, size))
+        cols = {field: np.full(flat.size, float(value)) for field, value in values.items()}
+        for name, grid, index in zip(names, grids, np.unravel_index(flat, shape)):
+            cols[name] = grid[index]
+        with np.errstate(all='ignore'):
+            S = calc_skin(type_, cols)['S']
+            q = calc_rate(cols, S)
+        yield {**{name: cols[name] for name in names}, 'S': S, 'q': q}
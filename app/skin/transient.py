@@ -0,0 +1,372 @@
+import math as m
+import numpy as np
+from .converter import td_from_t
+from .batch import coerce_value, validate_row
+from .completions import calc_skin
+
+EULER = 0.5772156649015329
+
+# Число членов ряда E1 при x <= 1 и глубина цепной дроби при x > 1 (точность ~1e-15)
+EXP1_SERIES_TERMS = 30
+EXP1_FRACTION_DEPTH = 80
+
+# Допустимая погрешность безразмерного давления при замене E1 логарифмом в рекурсивной схеме
+LOG_APPROX_TOL = 1e-7
+
+# Шаг и пределы квадратуры представления ln(t) суммой экспонент в рекурсивной схеме
+EXP_SUM_STEP = 0.25
+EXP_SUM_U_MAX = 4.0
+EXP_SUM_EPS = 1e-12
+
+
+def exp1(x) -> np.ndarray:
+    """
+    Интегральная показательная функция E1(x) = -Ei(-x) для массива положительных аргументов
+
+    При x <= 1 - степенной ряд, при x > 1 - цепная дробь, вычисляемая с конца.
+
+    Parameters
+    ----------
+    :param x: аргумент (скаляр или массив), x > 0;
+
+    :return: массив E1(x)
+
+    ----------
+    """
+    x = np.asarray(x, dtype=float)
+    res = np.empty_like(x)
+    small = x <= 1
+    xs = x[small]
+    term = -xs
+    total = term.copy()
+    for k in range(2, EXP1_SERIES_TERMS + 1):
+        term = -term*xs/k
+        total += term/k
+    res[small] = -EULER - np.log(xs) - total
+    xl = x[~small]
+    frac = np.zeros_like(xl)
+    for k in range(EXP1_FRACTION_DEPTH, 0, -1):
+        frac = k*k/(xl + 2*k + 1 - frac)
+    with np.errstate(under='ignore'):
+        res[~small] = np.exp(-xl)/(xl + 1 - frac)
+    return res
+
+
+def exp1_log_deviation(x) -> np.ndarray:
+    """
+    Отклонение E1 от логарифмической асимптоты: E1(x) + ln(x) + EULER (без потери точности при малых x)
+
+    При малых x отклонение равно x - x^2/4 + ..., т.е. замена E1 логарифмом дает погрешность ~x.
+    """
+    x = np.asarray(x, dtype=float)
+    res = np.empty_like(x)
+    small = x <= 1
+    xs = x[small]
+    term = -xs
+    total = term.copy()
+    for k in range(2, EXP1_SERIES_TERMS + 1):
+        term = -term*xs/k
+        total += term/k
+    res[small] = -total
+    res[~small] = exp1(x[~small]) + np.log(x[~small]) + EULER
+    return res
+
+
+def pd_line_source(td, rd=1.0) -> np.ndarray:
+    """
+    Безразмерное давление линейного источника в бесконечном пласте: pD = 1/2*E1(rD^2/(4*tD))
+
+    Parameters
+    ----------
+    :param td: безразмерное время (по радиусу скважины); при td <= 0 давление равно 0;
+    :param rd: безразмерное расстояние от скважины r/rw;
+
+    ----------
+    """
+    td, rd = np.broadcast_arrays(np.asarray(td, dtype=float), np.asarray(rd, dtype=float))
+    res = np.zeros(td.shape)
+    pos = td > 0
+    res[pos] = 0.5*exp1(rd[pos]**2/(4*td[pos]))
+    return res
+
+
+def rate_changes(q) -> np.ndarray:
+    """
+    Приращения дебита ступенчатой истории: q[0], q[1] - q[0], ...
+    """
+    q = np.asarray(q, dtype=float)
+    return np.diff(q, prepend=0)
+
+
+def superpose_direct(td_steps, dq, td_eval, rd=1.0) -> np.ndarray:
+    """
+    Прямое суммирование принципа суперпозиции, O(N*M) по памяти и времени (эталон для проверки)
+
+    Parameters
+    ----------
+    :param td_steps: безразмерные моменты изменения дебита (по возрастанию);
+    :param dq: приращения дебита в эти моменты;
+    :param td_eval: безразмерные моменты расчета давления;
+    :param rd: безразмерное расстояние от скважины;
+
+    :return: сумма dq_j*pD(td - td_j) по изменениям, произошедшим до момента расчета
+
+    ----------
+    """
+    tau = np.asarray(td_eval, dtype=float)[:, None] - np.asarray(td_steps, dtype=float)[None, :]
+    return pd_line_source(tau, rd) @ np.asarray(dq, dtype=float)
+
+
+def superpose_uniform(dtd: float, dq, rd=1.0) -> np.ndarray:
+    """
+    Суперпозиция на равномерной сетке времени сверткой через БПФ, O(N log N)
+
+    Дебит меняется в моменты k*dtd, давление рассчитывается в моменты (k + 1)*dtd, k = 0..N-1.
+
+    Parameters
+    ----------
+    :param dtd: безразмерный шаг сетки времени;
+    :param dq: приращения дебита в узлах сетки;
+    :param rd: безразмерное расстояние от скважины;
+
+    ----------
+    """
+    dq = np.asarray(dq, dtype=float)
+    n = len(dq)
+    response = pd_line_source(dtd*np.arange(1, n + 1), rd)
+    size = 1 << (2*n - 1).bit_length()
+    return np.fft.irfft(np.fft.rfft(dq, size)*np.fft.rfft(response, size), size)[:n]
+
+
+def exp_sum_nodes(ratio: float) -> tuple:
+    """
+    Узлы и веса представления ln(t) = sum w*(exp(-s) - exp(-s*t)) при 1 <= t <= ratio
+
+    Формула Фруллани ln(t) = int (exp(-e^u) - exp(-e^u*t)) du, вычисленная по методу трапеций.
+    """
+    u_min = m.log(EXP_SUM_EPS/ratio)
+    u = np.arange(u_min, EXP_SUM_U_MAX + EXP_SUM_STEP, EXP_SUM_STEP)
+    return np.exp(u), np.full(u.size, EXP_SUM_STEP)
+
+
+def near_pairs(t_steps, t_eval, window) -> tuple:
+    """
+    Пары (момент расчета i, изменение дебита j), для которых 0 < t_eval[i] - t_steps[j] <= window
+
+    :return: (массив индексов i, массив индексов j)
+    """
+    start = np.searchsorted(t_steps, t_eval - window, side='left')
+    end = np.searchsorted(t_steps, t_eval, side='left')
+    counts = end - start
+    total = counts.sum()
+    rows = np.repeat(np.arange(len(t_eval)), counts)
+    cols = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+    return rows, cols
+
+
+def superpose_recursive(td_steps, dq, td_eval, rd=1.0, block: int = 1024) -> np.ndarray:
+    """
+    Суперпозиция для произвольной (неравномерной) истории дебита с рекуррентным обновлением, O((N + M)*K)
+
+    Вклад давних изменений дебита (E1 ~ логарифм с погрешностью менее LOG_APPROX_TOL) вычисляется
+    через представление ln(t) суммой K экспонент, каждая из которых обновляется рекуррентно от
+    одного момента расчета к следующему. Вклад недавних изменений вычисляется точно по E1.
+
+    Parameters
+    ----------
+    :param td_steps: безразмерные моменты изменения дебита (по возрастанию);
+    :param dq: приращения дебита в эти моменты;
+    :param td_eval: безразмерные моменты расчета давления (по возрастанию);
+    :param rd: безразмерное расстояние от скважины;
+    :param block: число моментов расчета, обрабатываемых за один проход (ограничивает память);
+
+    ----------
+    """
+    td_steps = np.asarray(td_steps, dtype=float)
+    dq = np.asarray(dq, dtype=float)
+    td_eval = np.asarray(td_eval, dtype=float)
+    res = np.zeros(len(td_eval))
+    if not len(td_steps) or not len(td_eval):
+        return res
+    c = rd*rd/4
+    # при tau > tau_near: |1/2*E1(c/tau) - 1/2*(ln(tau/c) - EULER)| < c/(2*tau) < LOG_APPROX_TOL
+    tau_near = c/(2*LOG_APPROX_TOL)
+    s, w = exp_sum_nodes(max((td_eval[-1] - td_steps[0])/tau_near, 1.0))
+    s = s/tau_near
+
+    # Шаги j < far_end[i] - давние для момента i, остальные до момента i - недавние
+    far_end = np.searchsorted(td_steps, td_eval - tau_near, side='left')
+
+    # Давние изменения: состояние sum dq_j*exp(-s*(t - td_j)) обновляется от момента к моменту,
+    # ln(tau/tau_near) = sum w*(exp(-s*tau_near) - exp(-s*tau))
+    q_far = np.concatenate(([0], np.cumsum(dq)))[far_end]
+    state = np.zeros(s.size)
+    t_prev, j = td_eval[0], 0
+    for start in range(0, len(td_eval), block):
+        t = td_eval[start:start + block]
+        end = far_end[start:start + block]
+        # приращение состояния за счет шагов, ставших давними в момент i (каждый шаг - ровно в одном)
+        new = np.arange(j, end[-1])
+        owner = np.searchsorted(end, new, side='right')
+        incr = np.zeros((len(t), s.size))
+        np.add.at(incr, owner, dq[new, None]*np.exp(-np.outer(t[owner] - td_steps[new], s)))
+        decay = np.exp(-np.outer(np.diff(t, prepend=t_prev), s))
+        log_sum = np.empty(len(t))
+        for i in range(len(t)):
+            state = decay[i]*state + incr[i]
+            log_sum[i] = w @ state
+        res[start:start + block] = 0.5*(
+            q_far[start:start + block]*(w @ np.exp(-s*tau_near) + m.log(tau_near/c) - EULER) - log_sum)
+        t_prev, j = t[-1], end[-1]
+
+    # Недавние изменения: точное E1 по всем парам (момент расчета, шаг) в окне tau_near
+    rows, cols = near_pairs(td_steps, td_eval, tau_near)
+    res += np.bincount(rows, pd_line_source(td_eval[rows] - td_steps[cols], rd)*dq[cols], len(td_eval))
+    return res
+
+
+def pwf_history(t_hr, q, Pres: float, k: float, h: float, mu: float, B: float, S: float = 0,
+                phi: float = 0.2, ct: float = 1e-5, rw: float = 0.1, t_eval=None, r=None, method: str = 'auto') -> dict:
+    """
+    Расчет давления при переменном дебите (испытание, КВД, КПД) по решению линейного источника со скин-фактором
+
+    Дебит кусочно-постоянный: q[i] действует с момента t_hr[i] до t_hr[i+1]. Давление рассчитывается
+    по принципу суперпозиции в бесконечном пласте.
+
+    Parameters
+    ----------
+    :param t_hr: моменты изменения дебита, ч (по возрастанию, первый - начало работы скважины);
+    :param q: дебит, м3/сут (нулевой дебит - остановка, для КВД);
+    :param Pres: начальное пластовое давление, атм;
+    :param k: проницаемость пласта, мД;
+    :param h: толщина пласта, м;
+    :param mu: вязкость нефти, сПз;
+    :param B: объемный коэффициент, м3/м3;
+    :param S: скин-фактор (учитывается только на забое, r = rw);
+    :param phi: пористость, доли единиц;
+    :param ct: общая сжимаемость, 1/атм;
+    :param rw: радиус скважины, м;
+    :param t_eval: моменты расчета давления, ч (по умолчанию - t_hr[1:] и конец последнего шага
+        длительностью, равной предыдущему);
+    :param r: расстояние от скважины, м (по умолчанию - забой);
+    :param method: 'uniform' - свертка БПФ (равномерная сетка, t_eval по умолчанию), 'recursive' -
+        рекуррентная схема, 'direct' - прямое суммирование, 'auto' - выбор по виду сетки;
+
+    :return: словарь массивов {"t": моменты расчета, ч, "p": давление, атм, "dp": депрессия, атм}
+
+    ----------
+    """
+    check_positive(k=k, h=h, mu=mu, B=B, phi=phi, ct=ct, rw=rw, **({} if r is None else {'r': r}))
+    t_hr, q, t_eval = rate_history(t_hr, q, t_eval)
+    rd = 1.0 if r is None else r/rw
+    pd = superpose_history(t_hr, q, t_eval, td_from_t(1, k, phi, mu, ct, rw), rd, method)
+    if r is None:
+        # скин-фактор - дополнительное сопротивление на забое, пропорциональное текущему дебиту
+        pd = pd + S*current_rate(t_hr, q, t_eval)
+    dp = 18.41*mu*B/(k*h)*pd
+    return {'t': t_eval, 'p': Pres - dp, 'dp': dp}
+
+
+def check_positive(**params) -> None:
+    """
+    Проверка того, что параметры пласта и скважины - положительные конечные числа
+    """
+    for name, value in params.items():
+        if not (np.isfinite(value) and value > 0):
+            raise ValueError(f'параметр {name} должен быть положительным числом')
+
+
+def rate_history(t_hr, q, t_eval=None) -> tuple:
+    """
+    Проверка истории дебита и моментов расчета давления
+
+    :return: (t_hr, q, t_eval) - массивы; t_eval по умолчанию - t_hr[1:] и конец последнего шага
+        длительностью, равной предыдущему
+    """
+    t_hr = np.asarray(t_hr, dtype=float)
+    q = np.asarray(q, dtype=float)
+    if t_hr.ndim != 1 or t_hr.shape != q.shape or t_hr.size == 0:
+        raise ValueError('моменты времени и дебиты должны быть одномерными массивами одной длины')
+    if not (np.isfinite(t_hr).all() and np.isfinite(q).all()):
+        raise ValueError('моменты времени и дебиты должны быть конечными числами')
+    steps = np.diff(t_hr)
+    if (steps <= 0).any():
+        raise ValueError('моменты изменения дебита должны возрастать')
+    if t_eval is None:
+        t_eval = np.append(t_hr[1:], t_hr[-1] + (steps[-1] if steps.size else 1.0))
+    t_eval = np.asarray(t_eval, dtype=float)
+    if t_eval.ndim != 1 or not np.isfinite(t_eval).all() or (np.diff(t_eval) < 0).any():
+        raise ValueError('моменты расчета давления должны быть неубывающим одномерным массивом')
+    if t_eval.size and t_eval[0] < t_hr[0]:
+        raise ValueError('моменты расчета давления не могут предшествовать началу работы скважины t[0]')
+    return t_hr, q, t_eval
+
+
+def current_rate(t_hr, q, t_eval) -> np.ndarray:
+    """
+    Дебит, действующий в моменты t_eval (0 до начала работы скважины)
+    """
+    current = np.searchsorted(t_hr, t_eval, side='left') - 1
+    return np.where(current >= 0, q[np.clip(current, 0, None)], 0)
+
+
+def superpose_history(t_hr, q, t_eval, td_per_hr: float, rd=1.0, method: str = 'auto') -> np.ndarray:
+    """
+    Безразмерная сумма суперпозиции sum dq_j*pD(td(t - t_j)) для проверенной истории дебита
+
+    Parameters
+    ----------
+    :param t_hr: моменты изменения дебита, ч;
+    :param q: дебит, м3/сут;
+    :param t_eval: моменты расчета давления, ч;
+    :param td_per_hr: безразмерное время, соответствующее 1 ч (td_from_t(1, ...));
+    :param rd: безразмерное расстояние от скважины;
+    :param method: метод суперпозиции (см. pwf_history);
+
+    ----------
+    """
+    steps = np.diff(t_hr)
+    uniform = (np.array_equal(t_eval[:-1], t_hr[1:]) and len(t_eval) == len(t_hr)
+               and (steps.size == 0 or np.allclose(np.append(steps, t_eval[-1] - t_hr[-1]), steps[0], rtol=1e-9, atol=0)))
+    if method == 'auto':
+        method = 'uniform' if uniform else 'recursive'
+    if method == 'uniform' and not uniform:
+        raise ValueError('свертка применима только для равномерной сетки времени и моментов расчета по умолчанию')
+    if method not in ('uniform', 'recursive', 'direct'):
+        raise ValueError(f'неизвестный метод суперпозиции: {method}')
+    dq = rate_changes(q)
+    td_steps = td_per_hr*(t_hr - t_hr[0])
+    td_eval = td_per_hr*(t_eval - t_hr[0])
+    if method == 'uniform':
+        return superpose_uniform(td_eval[0] - td_steps[0], dq, rd)
+    if method == 'recursive':
+        return superpose_recursive(td_steps, dq, td_eval, rd)
+    return superpose_direct(td_steps, dq, td_eval, rd)
+
+
+def request_args(body: dict) -> dict:
+    """
+    Разбор и проверка тела запроса расчета давления при переменном дебите
+
+    Тело запроса: {"well": {параметры скважины как в plot0}, "t": [...], "q": [...], "t_eval": [...],
+    "phi": 0.2, "ct": 1e-5, "r": null, "method": "auto"}; скин-фактор рассчитывается по типу заканчивания,
+    Pres - начальное пластовое давление.
+
+    :return: словарь аргументов функции pwf_history
+    """
+    if not isinstance(body, dict):
+        raise ValueError('тело запроса должно быть JSON-объектом')
+    type_, values = validate_row(body.get('well'))
+    S = float(calc_skin(type_, {name: np.array([value]) for name, value in values.items()})['S'][0])
+    args = {name: values[name] for name in ('Pres', 'k', 'h', 'mu', 'B', 'rw')}
+    for name in ('phi', 'ct', 'r'):
+        value = coerce_value(body.get(name))
+        if value is not None:
+            args[name] = value
+    for name in ('t', 'q', 't_eval'):
+        if body.get(name) is not None and not isinstance(body[name], list):
+            raise ValueError(f'{name} должен быть JSON-массивом чисел')
+    if body.get('t') is None or body.get('q') is None:
+        raise ValueError('не заданы история дебита t и q')
+    return {'t_hr': body['t'], 'q': body['q'], 't_eval': body.get('t_eval'), 'S': S,
+            'method': body.get('method', 'auto'), **args}
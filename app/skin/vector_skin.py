@@ -0,0 +1,280 @@
+import numpy as np
+from .kernel import kt_coeff_arr
+
+
+def as_columns(data) -> dict:
+    """
+    Приведение входных данных к словарю столбцов
+
+    :param data: словарь столбцов (массивов или скаляров) либо структурированный массив numpy;
+    """
+    if isinstance(data, np.ndarray) and data.dtype.names:
+        return {name: data[name] for name in data.dtype.names}
+    return dict(data)
+
+
+def broadcast(*args) -> list:
+    """
+    Приведение аргументов к массивам float одинаковой формы
+    """
+    return np.broadcast_arrays(*(np.asarray(arg, dtype=float) for arg in args))
+
+
+class VectorSkin:
+    """
+    Векторизованный аналог класса Skin: каждый параметр может быть массивом numpy,
+    в том числе номер корреляции model и фазировка phi (построчно).
+    Результаты совпадают с расчетом по скалярным методам Skin.
+    """
+    def calc_Sd(self, k, kd, rw, rd) -> np.ndarray:
+        """
+        Метод расчета механического скин-фактора
+
+        Parameters
+        ----------
+        :param k: начальная проницаемость, мД;
+        :param kd: измененная проницаемость, мД;
+        :param rw: радиус скважины, м;
+        :param rd: радиус  зоны  с  проницаемостью,  измененной  по  сравнению  с проницаемостью пласта, м;
+
+        ----------
+        """
+        return (np.asarray(k, dtype=float)/kd - 1)*np.log1p(np.asarray(rd, dtype=float)/rw)
+
+    def calc_Spp(self, model, h, hw, rw, zw, kh, kv) -> np.ndarray:
+        """
+        Метод расчета скин-фактора за счет частичного вскрытия
+
+        Parameters
+        ----------
+        :param model: 0 - Корреляция Papatzacos; 1 - Корреляция Vrbik;
+        :param h: мощность пласта, м;
+        :param hw: мощность вскрытого интервала, открытого для притока (0<=hw<=h), м;
+        :param rw: радиус скважины, м;
+        :param zw: расстояние от подошвы пласта до центра интервала, открытого для притока (hw/2<=zw<=h-hw/2), м;
+        :param kh: проницаемость пласта в латеральном направлении, мД;
+        :param kv: проницаемость пласта в вертикальном направлении, мД;
+
+        ----------
+        """
+        model, h, hw, rw, zw, kh, kv = broadcast(model, h, hw, rw, zw, kh, kv)
+        Spp = np.empty(h.shape)
+        papatzacos = model == 0
+        vrbik = ~papatzacos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if papatzacos.any():
+                Spp[papatzacos] = self._Spp_papatzacos(*(arg[papatzacos] for arg in (h, hw, rw, zw, kh, kv)))
+            if vrbik.any():
+                Spp[vrbik] = self._Spp_vrbik(*(arg[vrbik] for arg in (h, hw, rw, zw, kh, kv)))
+        return Spp
+
+    def _Spp_papatzacos(self, h, hw, rw, zw, kh, kv) -> np.ndarray:
+        hwh = hw/h
+        hd = h/rw*(kh/kv)**0.5
+        ls = ((hwh)/(2+hwh))*(((zw+hw/4)*(h/zw+hw/4))/((zw-hw/4)*(h-zw-hw/4)))**0.5
+        return (1/hwh-1)*np.log1p(3.14*hd/2) + np.log1p(ls)/hwh
+
+    def _Spp_vrbik(self, h, hw, rw, zw, kh, kv) -> np.ndarray:
+        hwh = hw/h
+        hd = h/rw*(kh/kv)**0.5
+        f_0 = self.Vrbik_func(0, hd)
+        f_1 = self.Vrbik_func(hwh, hd)
+        f_2 = self.Vrbik_func(2*zw/h, hd)
+        f_3 = self.Vrbik_func((2*zw+hw)/h, hd)
+        f_4 = self.Vrbik_func((2*zw-hw)/h, hd)
+        return (1/hwh-1)*(1.2704+np.log1p(hd))-(1/hwh)**2*(f_0-f_1+f_2-0.5*f_3-0.5*f_4)
+
+    def Vrbik_func(self, y, hd) -> np.ndarray:
+        y, hd = broadcast(y, hd)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            edge = 2*np.log1p(2) + 1/(3.14*hd)*np.log1p(0.1053/hd**2)
+            inner = y*np.log1p(y) + (2-y)*np.log1p(2-y)+1/(3.14*hd)*np.log1p(np.sin(3.14*y/2)**2+0.1053/hd**2)
+        return np.where((y == 2) | (y == 0), edge, inner)
+
+    def coeff(self, phi) -> np.ndarray:
+        """
+        Метод определения числовых коэффициентов, зависящих от фазировки перфорационных зарядов
+
+        Parameters
+        ----------
+        :param phi: фазировка перфорационных зарядов, градусы (скаляр или массив);
+
+        :return: массив формы phi.shape + (7,) с коэффициентами [a, a1, a2, b1, b2, c1, c2]
+
+        ----------
+        """
+        return kt_coeff_arr(phi)
+
+    def calc_Sp(self, phi, rw, Lp, rp, ns, kh, kv) -> np.ndarray:
+        """
+        Метод расчета скин-фактора за счет перфорации по корреляции Karakas-Tariq
+
+        Parameters
+        ----------
+        :param phi: фазировка перфорационных зарядов, градусы;
+        :param rw: радиус скважины, м;
+        :param Lp: длина перфорационных каналов, м;
+        :param rp: радиус перфорационных каналов, м;
+        :param ns: плотность перфорационных отверстий, отв/м;
+        :param kh: проницаемость пласта в латеральном направлении, мД;
+        :param kv: проницаемость пласта в вертикальном направлении, мД;
+
+        ----------
+        """
+        a, a1, a2, b1, b2, c1, c2 = np.moveaxis(self.coeff(phi), -1, 0)
+        return self.calc_Sh(rw, a, Lp) + self.calc_Sv(
+            [a1, a2, b1, b2], rp, ns, Lp, kh, kv
+        ) + self.calc_Swb([c1, c2], rw, Lp)
+
+    def calc_Sh(self, rw, a, Lp) -> np.ndarray:
+        """
+        Метод расчета скин-фактора за счет схождения потока к перфорационным каналам в горизонатльной плоскости
+
+        Parameters
+        ----------
+        :param rw: радиус скважины, м;
+        :param a: набор численных коэффициентов, зависящих от фазировки перфорационных каналов;
+        :param Lp: длина перфорационных каналов, м;
+
+        ----------
+        """
+        rw, a, Lp = broadcast(rw, a, Lp)
+        # rwe - эффективный радиус скважины с учетом длины перфорационных каналов, м
+        rwe = np.where(a == 0, Lp/4, a*(rw+Lp))
+        return np.log1p(rw/rwe)
+
+    def calc_Sv(self, coef_list: list, rp, ns, Lp, kh, kv) -> np.ndarray:
+        """
+        Метод расчета скин-фактора за счет схождения потока к перфорационным каналам в вертикальной плоскости
+
+        Parameters
+        ----------
+        :param coef_list = [a1, a2, b1, b2]: набор числовых констант, зависящие от фазировки перфорационных зарядов;
+        :param rp: радиус перфорационных каналов, м;
+        :param ns: плотность перфорационных отверстий, отв/м;
+        :param Lp: длина перфорационных каналов, м;
+        :param kh: проницаемость пласта в латеральном направлении, мД;
+        :param kv: проницаемость пласта в вертикальном направлении, мД;
+
+        ----------
+        """
+        dzp = 1/np.asarray(ns, dtype=float) # расстояние между перфорационными отверстиями, м
+        rpd = rp/(2*dzp)*(1+(np.asarray(kv, dtype=float)/kh)**0.5)
+        a = coef_list[0]*np.log1p(rpd) + coef_list[1]
+        b = coef_list[2]*rpd + coef_list[3]
+        zpd = dzp/Lp*(np.asarray(kh, dtype=float)/kv)**0.5
+        return 10**a*zpd**(b-1)*rpd**b
+
+    def calc_Swb(self, coef_list: list, rw, Lp) -> np.ndarray:
+        """
+        Метод расчета скин-фактора за счет самого ствола скважины
+
+        Parameters
+        ----------
+        :param coef_list = [с1, с2]: набор числовых констант, зависящие от фазировки перфорационных зарядов;
+        :param rw: радиус скважины, м;
+        :param Lp: длина перфорационных каналов, м;
+
+        ----------
+        """
+        rwd = np.asarray(rw, dtype=float)/(np.asarray(rw, dtype=float)+Lp)
+        return coef_list[0]*np.exp(coef_list[1]*rwd)
+
+    def calc_Scz(self, ns, Lp, k, kcz, kd, rcz, rp) -> np.ndarray:
+        """
+        Метод расчет скин-фактора за счет зоны разрушения овркуг перфорационных каналов
+
+        Parameters
+        ----------
+        :param ns: плотность перфорационных отверстий, отв/м;
+        :param Lp: длина перфорационных каналов, м;
+        :param k: начальная проницаемость, мД;
+        :param kcz: проницаемость зоны разрушения породы вокруг перфорационных каналов, мД;
+        :param kd: измененная проницаемость, мД;
+        :param rcz: радиус зоны разрушения породы вокруг перфорационных каналов, м;
+        :param rp: радиус перфорационных каналов, м;
+
+        ----------
+        """
+        dzp = 1/np.asarray(ns, dtype=float) # расстояние между перфорационными отверстиями, м
+        k = np.asarray(k, dtype=float)
+        return dzp/Lp*(k/kcz-k/kd)*np.log1p(np.asarray(rcz, dtype=float)/rp)
+
+    def calc_Steta(self, model, teta, kh, kv, h, hw, rw, zw) -> np.ndarray:
+        """
+        Метод расчета геометрического скин-фактора за счет отклонения скважины от вертикали, определяемый
+        по корреляциям Cinco-Ley или Ozkan-Raghavan для скважины, полностью вскрывающей продуктивный пласт
+
+        Parameters
+        ----------
+        :param model: 0 - Корреляция Cinco-Ley; 1 - Корреляция Ozkan-Raghavan;
+        :param teta: угол отклонения ствола скважины отв вертикали, градусы;
+        :param kh: проницаемость пласта в латеральном направлении, мД;
+        :param kv: проницаемость пласта в вертикальном направлении, мД;
+        :param h: мощность пласта, м;
+        :param hw: мощность вскрытого интервала, открытого для притока (0<=hw<=h), м;
+        :param rw: радиус скважины, м;
+        :param zw: расстояние от подошвы пласта до центра интервала, открытого для притока (hw/2<=zw<=h-hw/2), м;
+
+        ----------
+        """
+        model, teta, kh, kv, h, hw, rw, zw = broadcast(model, teta, kh, kv, h, hw, rw, zw)
+        Steta = np.empty(teta.shape)
+        cinco_ley = model == 0
+        ozkan = ~cinco_ley
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if cinco_ley.any():
+                Steta[cinco_ley] = self._Steta_cinco_ley(*(arg[cinco_ley] for arg in (teta, kh, kv, hw, rw)))
+            if ozkan.any():
+                Steta[ozkan] = self.calc_Sopp(*(arg[ozkan] for arg in (teta, kh, kv, h, hw, rw, zw)))
+        return Steta
+
+    def _Steta_cinco_ley(self, teta, kh, kv, hw, rw) -> np.ndarray:
+        teta_ = np.arctan((kv/kh)*np.tan(teta))
+        hd = hw/rw*(kh/kv)**0.5
+        return -(teta_/41)**2.06 - (teta_/56)**1.865*np.log1p(hd/100)
+
+    def g_func(self, x, y, a, b) -> np.ndarray:
+        return 0.25*((x-b)*np.log1p((x-b)**2 + y**2) - (x-a)*np.log1p((x-a)**2 + y**2) - y/2*(np.arctan((x-a)/y) - np.arctan((x-b)/y)))
+
+    def calc_Sopp(self, teta, kh, kv, h, hw, rw, zw) -> np.ndarray:
+        """
+        Метод расчета геометрического скин-фактора за счет отклонения скважины от вертикали и за счет частичного вскрытия
+        по корреляции Ozkan-Raghavan
+
+        Parameters
+        ----------
+        :param teta: угол отклонения ствола скважины отв вертикали, градусы;
+        :param kh: проницаемость пласта в латеральном направлении, мД;
+        :param kv: проницаемость пласта в вертикальном направлении, мД;
+        :param h: мощность пласта, м;
+        :param hw: мощность вскрытого интервала, открытого для притока (0<=hw<=h), м;
+        :param rw: радиус скважины, м;
+        :param zw: расстояние от подошвы пласта до центра интервала, открытого для притока (hw/2<=zw<=h-hw/2), м;
+
+        ----------
+        """
+        teta, kh, kv, h, hw, rw, zw = broadcast(teta, kh, kv, h, hw, rw, zw)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # тригонометрические функции вычисляются один раз: для teta_ = arctan(t) (cos > 0)
+            # sin и cos выражаются через t, для y = arccos(x) - через x
+            sin_t, cos_t = np.sin(teta), np.cos(teta)
+            tan_ = (kv/kh)*(sin_t/cos_t)
+            cos_ = 1/np.sqrt(1 + tan_**2)
+            sin_ = tan_*cos_
+            hd = hw/rw*(kh/kv)**0.5
+            hwd = hw/rw*(kh/kv*cos_t**2 + sin_t**2)**0.5
+            zwd = zw/rw*(kh/kv)**0.5
+            rd = (1 + 0.09*hwd**2*sin_)**0.5
+            cos_y = (0.3*hwd*sin_**2)/rd
+            cos_y = np.where(np.abs(cos_y) <= 1, cos_y, np.nan)
+            sin_y = np.sqrt(1 - cos_y**2)
+            zd = np.where(zw >= h/2, zwd + 0.3*hwd*cos_, zwd - 0.3*hwd*cos_)
+            e = (zd-zwd)*cos_**2
+            yi = (3.14*rd*sin_y)/(hd*sin_)
+            exp_yi = np.exp(-yi)
+            c = 2*np.cos(3.14)*exp_yi
+            F = -hd/(2*hwd)*(np.log1p(1 - c*((zd + zwd + e)/hd) + exp_yi**2) +
+                np.log1p(1 - c*((zd - zwd - e)/hd) + exp_yi**2))
+            Sopp = 1 + 2/(hwd*sin_t)*self.g_func(rd*cos_y, rd*sin_y, -hwd/2*sin_t, hwd/2*sin_t) + F
+        return Sopp
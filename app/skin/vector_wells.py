@@ -0,0 +1,139 @@
+import inspect
+import numpy as np
+from .vector_skin import VectorSkin, as_columns
+
+
+class VectorWell:
+    """
+    Базовый класс векторизованных расчетов скважин
+
+    calc - расчет выбранным методом по словарю столбцов или структурированному массиву
+    """
+    def __init__(self) -> None:
+        self.skin = VectorSkin()
+
+    def calc(self, method: str, data) -> dict:
+        """
+        Метод расчета по словарю столбцов или структурированному массиву
+
+        Parameters
+        ----------
+        :param method: название метода расчета (perfect_s, unperfect_s, full_perf_s, part_perf_s);
+        :param data: словарь столбцов или структурированный массив numpy с параметрами скважин;
+
+        :return: словарь массивов составляющих скин-фактора и суммарного скин-фактора S
+
+        ----------
+        """
+        cols = as_columns(data)
+        func = getattr(self, method)
+        return func(**{name: cols[name] for name in inspect.signature(func).parameters if name in cols})
+
+
+class VectorUncasedVW(VectorWell):
+    """
+    Векторизованный расчет необсаженной вертикальной скважины (аналог UncasedVW)
+
+    perfect_s - метод расчета скин-фактора совершенной скважины по степени вскрытия
+
+    unperfect_s - метод расчета скин-фактора несовершенной скважины по степени вскрытия
+    """
+    def perfect_s(self, k, kd, rw, rd) -> dict:
+        """
+        Метод расчета скин-фактора совершенной скважины по степени вскрытия (параметры как в UncasedVW.perfect_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        return {'Sd': Sd, 'S': Sd}
+
+    def unperfect_s(self, model, h, hw, rw, zw, kh, kv, k, kd, rd, y=1) -> dict:
+        """
+        Метод расчета скин-фактора несовершенной скважины по степени вскрытия (параметры как в UncasedVW.unperfect_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Spp = self.skin.calc_Spp(model, h, hw, rw, zw, kh, kv)
+        return {'Sd': Sd, 'Spp': Spp, 'S': 1/np.asarray(y, dtype=float)*h/hw*Sd + Spp}
+
+
+class VectorPerfVW(VectorWell):
+    """
+    Векторизованный расчет перфорированной вертикальной скважины (аналог PerfVW)
+
+    full_perf_s - метод расчета полностью перфорированной скважины
+
+    part_perf_s - метод расчета частично перфорированной скважины
+    """
+    def full_perf_s(self, k, kd, rw, rd, phi, Lp, rp, ns, kh, kv, kcz, rcz) -> dict:
+        """
+        Метод расчета полностью перфорированной скважины (параметры как в PerfVW.full_perf_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Sp = self.skin.calc_Sp(phi, rw, Lp, rp, ns, kh, kv)
+        Scz = self.skin.calc_Scz(ns, Lp, k, kcz, kd, rcz, rp)
+        return {'Sd': Sd, 'Sp': Sp, 'Scz': Scz, 'S': Sd + np.asarray(k, dtype=float)/kd*Sp + Scz}
+
+    def part_perf_s(self, k, kd, rw, rd, phi, Lp, rp, ns, kh, kv, kcz, rcz, h, hw, model, zw, y=1) -> dict:
+        """
+        Метод расчета частично перфорированной скважины (параметры как в PerfVW.part_perf_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Sp = self.skin.calc_Sp(phi, rw, Lp, rp, ns, kh, kv)
+        Scz = self.skin.calc_Scz(ns, Lp, k, kcz, kd, rcz, rp)
+        Spp = self.skin.calc_Spp(model, h, hw, rw, zw, kh, kv)
+        St = np.asarray(h, dtype=float)/hw/y*(Sd + np.asarray(k, dtype=float)/kd*Sp + Scz) + Spp
+        return {'Sd': Sd, 'Sp': Sp, 'Scz': Scz, 'Spp': Spp, 'S': St}
+
+
+class VectorUnanchDW(VectorWell):
+    """
+    Векторизованный расчет необсаженной наклонно-направленной скважины (аналог UnanchDW)
+
+    perfect_s - метод расчета скин-фактора совершенной скважины по степени вскрытия
+
+    unperfect_s - метод расчета скин-фактора несовершенной скважины по степени вскрытия
+    """
+    def perfect_s(self, k, kd, rw, rd, model, teta, kh, kv, h, hw, zw) -> dict:
+        """
+        Метод расчета скин-фактора совершенной скважины по степени вскрытия (параметры как в UnanchDW.perfect_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Steta = self.skin.calc_Steta(model, teta, kh, kv, h, hw, rw, zw)
+        return {'Sd': Sd, 'Steta': Steta, 'S': np.cos(teta)*Sd + Steta}
+
+    def unperfect_s(self, k, kd, rw, rd, h, Lwpc, teta, kh, kv, hw, zw) -> dict:
+        """
+        Метод расчета скин-фактора несовершенной скважины по степени вскрытия (параметры как в UnanchDW.unperfect_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Sopp = self.skin.calc_Sopp(teta, kh, kv, h, hw, rw, zw)
+        return {'Sd': Sd, 'Sopp': Sopp, 'S': np.asarray(h, dtype=float)/Lwpc*Sd + Sopp}
+
+
+class VectorPerfDW(VectorWell):
+    """
+    Векторизованный расчет перфорированной наклонно-направленной скважины (аналог PerfDW)
+
+    full_perf_s - метод расчета полностью перфорированной скважины
+
+    part_perf_s - метод расчета частично перфорированной скважины
+    """
+    def full_perf_s(self, k, kd, rw, rd, teta, phi, Lp, rp, ns, kh, kv, kcz, rcz, model, h, hw, zw) -> dict:
+        """
+        Метод расчета полностью перфорированной скважины (параметры как в PerfDW.full_perf_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Sp = self.skin.calc_Sp(phi, rw, Lp, rp, ns, kh, kv)
+        Scz = self.skin.calc_Scz(ns, Lp, k, kcz, kd, rcz, rp)
+        Steta = self.skin.calc_Steta(model, teta, kh, kv, h, hw, rw, zw)
+        St = np.cos(teta)*(Sd + np.asarray(k, dtype=float)/kd*Sp + Scz) + Steta
+        return {'Sd': Sd, 'Sp': Sp, 'Scz': Scz, 'Steta': Steta, 'S': St}
+
+    def part_perf_s(self, k, kd, rw, rd, teta, phi, Lp, rp, ns, kh, kv, kcz, rcz, h, hw, zw) -> dict:
+        """
+        Метод расчета частично перфорированной скважины (параметры как в PerfDW.part_perf_s)
+        """
+        Sd = self.skin.calc_Sd(k, kd, rw, rd)
+        Sp = self.skin.calc_Sp(phi, rw, Lp, rp, ns, kh, kv)
+        Scz = self.skin.calc_Scz(ns, Lp, k, kcz, kd, rcz, rp)
+        Sopp = self.skin.calc_Sopp(teta, kh, kv, h, hw, rw, zw)
+        St = np.cos(teta)*(Sd + np.asarray(k, dtype=float)/kd*Sp + Scz) + Sopp
+        return {'Sd': Sd, 'Sp': Sp, 'Scz': Scz, 'Sopp': Sopp, 'S': St}
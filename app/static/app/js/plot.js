@@ -170,12 +170,13 @@ function plot0() {
         "teta": document.getElementById('teta').value,
         "Lwpc": document.getElementById('Lwpc').value,
     };
-    var url = window.location.origin + "/api/plot0" + '?data0=' + JSON.stringify(data);
+    var url = window.location.origin + "/api/plot0?format=base64";
     var req = new XMLHttpRequest();
     req.open('POST', url, true);
     req.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+    req.setRequestHeader('Content-Type', 'application/json');
     req.responseType = 'json';
-    req.send();
+    req.send(JSON.stringify(data));
 
     req.onload = function () {
         var data = req.response;
@@ -183,7 +184,7 @@ function plot0() {
         plot = document.getElementById('plot');
         var layout = {
             yaxis1: { title: 'P, атм', tickcolor: '#A6A8AB', tickwidth: 2 },
-            xaxis1: { title: 'R, м', tickcolor: '#A6A8AB', tickwidth: 2 },
+            xaxis1: { title: 'R, м', type: 'log', tickcolor: '#A6A8AB', tickwidth: 2 },
             showlegend: true,
             legend: { "orientation": "h", 'y': -0.2 },
             width: 600,
@@ -191,8 +192,8 @@ function plot0() {
         };
 
         var trace1 = {
-            x: data['r_arr'],
-            y: data['p_arr'],
+            x: decode_array(data['r_arr']),
+            y: decode_array(data['p_arr']),
             mode: 'lines',
             line: {
                 color: '#60B1DC',
@@ -206,4 +207,10 @@ function plot0() {
 
         Plotly.newPlot(plot, data, layout, { responsive: true });
     }
-}
\ No newline at end of file
+}
+
+function decode_array(arr) {
+    // Массив из ответа ?format=base64: {"dtype": "<f8" | "<f4", "shape": [...], "data": base64}
+    var bytes = Uint8Array.from(atob(arr['data']), c => c.charCodeAt(0));
+    return arr['dtype'] == '<f4' ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+}
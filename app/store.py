@@ -0,0 +1,312 @@
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from app.metrics import registry
+from app.models import Scenario
+from app.skin.batch import calc_batch, validate_row
+
+logger = logging.getLogger(__name__)
+
+# Версия расчетных формул: входит в ключ, изменение делает недействительными сохраненные результаты
+STORE_VERSION = 1
+
+# Число значащих цифр чисел в каноническом представлении входных данных
+KEY_DIGITS = 12
+
+# Размер порции ключей при поиске и записей при массовой вставке
+LOOKUP_CHUNK = 500
+BULK_SIZE = 500
+
+# Интервал записи в базу накопленных в памяти попаданий и времени последнего обращения, с
+# (попадание не пишет в базу: запросы не выстраиваются в очередь за блокировкой записи SQLite)
+TOUCH_INTERVAL = 60
+
+# Проверка предельного числа записей - после каждых EVICT_EVERY вставок
+EVICT_EVERY = 1000
+
+# Задержка отложенной записи результатов, с: запись выполняется в фоновом потоке массовой вставкой
+# не позднее SAVE_INTERVAL после первого накопленного результата либо сразу по накоплении BULK_SIZE
+SAVE_INTERVAL = 5
+
+_writes = 0
+_writes_lock = threading.Lock()
+
+# Попадания, еще не записанные в базу: {pk: число}, записи с устаревшим временем обращения, время записи
+_hits = Counter()
+_used = set()
+_flushed = time.monotonic()
+_hits_lock = threading.Lock()
+
+# Результаты, ожидающие отложенной записи: {ключ: объект Scenario}, таймер записи
+_pending = {}
+_save_timer = None
+_pending_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return getattr(settings, 'SKIN_STORE', True)
+
+
+def canonical(value):
+    """
+    Каноническое представление входных данных: числа приводятся к float с KEY_DIGITS значащими
+    цифрами (1, 1.0 и "1" дают один ключ), пустые значения отбрасываются, ключи сортируются при записи
+    """
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items() if item not in ('', None)}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.number)):
+        value = float(value)
+        if not math.isfinite(value):
+            return repr(value)
+        return float(f'{value:.{KEY_DIGITS}g}') + 0.0
+    return value
+
+
+def scenario_key(kind: str, inputs: dict) -> str:
+    """
+    Ключ записи: SHA-256 канонического представления вида расчета и входных данных
+    """
+    text = json.dumps({'v': STORE_VERSION, 'kind': kind, 'inputs': canonical(inputs)},
+                      sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def to_bytes(arr) -> bytes:
+    return np.ascontiguousarray(arr, dtype='<f8').tobytes()
+
+
+def from_bytes(data) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype='<f8')
+
+
+def touch(records) -> None:
+    """
+    Учет обращения к записям в памяти: счетчик попаданий и время последнего обращения
+    записываются в базу не чаще раза в TOUCH_INTERVAL (flush_hits)
+    """
+    now = timezone.now()
+    with _hits_lock:
+        _hits.update(record.pk for record in records)
+        _used.update(record.pk for record in records if (now - record.used).total_seconds() >= TOUCH_INTERVAL)
+        due = time.monotonic() - _flushed >= TOUCH_INTERVAL
+    if due:
+        flush_hits()
+
+
+def flush_hits() -> None:
+    """
+    Запись накопленных попаданий (одно обновление на каждое различное число попаданий)
+    и времени последнего обращения
+    """
+    global _hits, _used, _flushed
+    with _hits_lock:
+        hits, used, _hits, _used, _flushed = _hits, _used, Counter(), set(), time.monotonic()
+    groups = {}
+    for pk, n in hits.items():
+        groups.setdefault(n, []).append(pk)
+    try:
+        for n, pks in groups.items():
+            for start in range(0, len(pks), LOOKUP_CHUNK):
+                Scenario.objects.filter(pk__in=pks[start:start + LOOKUP_CHUNK]).update(hits=F('hits') + n)
+        used = sorted(used)
+        for start in range(0, len(used), LOOKUP_CHUNK):
+            Scenario.objects.filter(pk__in=used[start:start + LOOKUP_CHUNK]).update(used=timezone.now())
+    except DatabaseError as e:
+        logger.warning('хранилище сценариев недоступно: %s', e)
+
+
+def lookup(key: str):
+    """
+    Поиск записи по ключу
+
+    :return: запись Scenario либо None (нет записи, хранилище отключено или недоступно)
+    """
+    if not enabled():
+        return None
+    try:
+        record = Scenario.objects.filter(key=key).first()
+        if record is not None:
+            touch([record])
+    except DatabaseError as e:
+        logger.warning('хранилище сценариев недоступно: %s', e)
+        return None
+    registry.count('skin_store_total', (('result', 'miss' if record is None else 'hit'),))
+    return record
+
+
+def lookup_many(keys: list) -> dict:
+    """
+    Поиск записей по списку ключей порциями по LOOKUP_CHUNK
+
+    :return: словарь {ключ: запись Scenario} для найденных ключей
+    """
+    if not enabled():
+        return {}
+    found = {}
+    try:
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            records = list(Scenario.objects.filter(key__in=keys[start:start + LOOKUP_CHUNK]))
+            if records:
+                touch(records)
+            found.update((record.key, record) for record in records)
+    except DatabaseError as e:
+        logger.warning('хранилище сценариев недоступно: %s', e)
+        return {}
+    registry.count('skin_store_total', (('result', 'hit'),), len(found))
+    registry.count('skin_store_total', (('result', 'miss'),), len(keys) - len(found))
+    return found
+
+
+def save_many(records: list) -> None:
+    """
+    Запись результатов массовой вставкой (существующие ключи пропускаются) с последующим
+    удалением устаревших записей после каждых EVICT_EVERY вставок
+
+    :param records: список несохраненных объектов Scenario;
+    """
+    global _writes
+    if not enabled() or not records:
+        return
+    now = timezone.now()
+    for record in records:
+        record.used = now
+    try:
+        Scenario.objects.bulk_create(records, batch_size=BULK_SIZE, ignore_conflicts=True)
+        with _writes_lock:
+            _writes += len(records)
+            due = _writes >= EVICT_EVERY
+            if due:
+                _writes = 0
+        if due:
+            evict()
+    except DatabaseError as e:
+        logger.warning('хранилище сценариев недоступно: %s', e)
+
+
+def save_later(records: list) -> None:
+    """
+    Отложенная запись результатов: запрос не ждет записи в базу (и блокировки записи SQLite),
+    накопленные записи сохраняются одной массовой вставкой в фоновом потоке (flush_pending)
+
+    :param records: список несохраненных объектов Scenario;
+    """
+    global _save_timer
+    if not enabled() or not records:
+        return
+    with _pending_lock:
+        _pending.update((record.key, record) for record in records)
+        full = len(_pending) >= BULK_SIZE
+        if _save_timer is None or full:
+            if _save_timer is not None:
+                _save_timer.cancel()
+            _save_timer = threading.Timer(0 if full else SAVE_INTERVAL, _save_pending)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+
+def flush_pending() -> None:
+    """
+    Запись результатов, накопленных save_later
+    """
+    global _pending, _save_timer
+    with _pending_lock:
+        records, _pending = list(_pending.values()), {}
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+    save_many(records)
+
+
+def _save_pending() -> None:
+    try:
+        flush_pending()
+    finally:
+        close_old_connections()
+
+
+def evict(now=None) -> int:
+    """
+    Удаление записей, к которым не обращались дольше SKIN_STORE_RETENTION_DAYS, и самых давних
+    сверх SKIN_STORE_MAX_ROWS
+
+    :return: число удаленных записей
+    """
+    flush_hits()
+    now = now or timezone.now()
+    retention = getattr(settings, 'SKIN_STORE_RETENTION_DAYS', 30)
+    max_rows = getattr(settings, 'SKIN_STORE_MAX_ROWS', 100_000)
+    deleted, _ = Scenario.objects.filter(used__lt=now - timedelta(days=retention)).delete()
+    excess = Scenario.objects.count() - max_rows
+    if excess > 0:
+        # граница по времени обращения: все записи не новее excess-й по давности
+        border = Scenario.objects.order_by('used', 'pk').values_list('used', 'pk')[excess - 1]
+        removed, _ = Scenario.objects.filter(used__lt=border[0]).delete()
+        extra, _ = Scenario.objects.filter(used=border[0], pk__lte=border[1]).delete()
+        deleted += removed + extra
+    return deleted
+
+
+def plot0_record(key: str, type_: int, inputs: dict, S: float, skin: dict, q: float, r_arr, p_arr) -> Scenario:
+    """
+    Запись результата расчета plot0 по рассчитанным в запросе скин-фактору и его составляющим
+    """
+    return Scenario(key=key, kind='plot0', type=type_, inputs=canonical(inputs), S=float(S),
+                    skin=skin, q=float(q), r_arr=to_bytes(r_arr), p_arr=to_bytes(p_arr))
+
+
+def calc_batch_stored(rows: list, progress=None) -> list:
+    """
+    Пакетный расчет (calc_batch) с использованием хранилища: найденные по ключу скважины не
+    рассчитываются, результаты остальных записываются массовой вставкой
+
+    :return: список результатов в формате calc_batch
+    """
+    if not enabled():
+        return calc_batch(rows, progress)
+    keys = [None]*len(rows)
+    for i, row in enumerate(rows):
+        if isinstance(row, Exception):
+            continue
+        try:
+            type_, values = validate_row(row)
+        except ValueError:
+            continue
+        keys[i] = scenario_key('rate', {'type': type_, **values})
+    found = lookup_many(sorted({key for key in keys if key is not None}))
+    results = [None]*len(rows)
+    missing = []
+    for i, key in enumerate(keys):
+        record = found.get(key)
+        if record is None:
+            missing.append(i)
+            continue
+        results[i] = {'index': i, 'type': record.type, 'S': record.S, 'skin': record.skin, 'q': record.q}
+    computed = calc_batch([rows[i] for i in missing], progress)
+    new = {}
+    for i, res in zip(missing, computed):
+        res['index'] = i
+        results[i] = res
+        if 'error' not in res and keys[i] not in new:
+            new[keys[i]] = Scenario(key=keys[i], kind='rate', type=res['type'],
+                                    inputs=canonical(validate_row(rows[i])[1]), S=res['S'], skin=res['skin'], q=res['q'])
+    save_many(list(new.values()))
+    return results
@@ -0,0 +1,1011 @@
+import base64
+import csv
+import inspect
+import io
+import json
+import threading
+from datetime import timedelta
+import numpy as np
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from app.skin.uncased_vertical_well import UncasedVW
+from app.skin.perforated_vertical_well import PerfVW
+from app.skin.unanchored_directional_well import UnanchDW
+from app.skin.perforated_directional_well import PerfDW
+from app.skin.vector_wells import VectorUncasedVW, VectorPerfVW, VectorUnanchDW, VectorPerfDW
+from app.skin.batch import batch_columns, calc_batch, calc_columns, validate_row
+from app.skin.completions import RATE_FIELDS, calc_rate, calc_skin
+from app.skin.monte_carlo import monte_carlo, request_args as mc_request_args, validate_distributions
+from app.skin.sweep import grid_size, sweep
+from app.skin.optimizer import optimize_perforation, pareto_front
+from app.skin.session import SkinSession
+from app.skin.skin import Skin, p_profile, p_ss_atma, q_well, r_grid
+from app.skin.kernel import KT_COEFF, KT_TABLE, kt_coeff, kt_coeff_arr
+from app.jobs import ORPHAN_TIMEOUT, RUNNERS, check_sweep, queue
+from app.models import Job, Scenario
+from app.skin.converter import td_from_t
+from app.skin.transient import exp1, pwf_history
+from app.skin.inverse import skin_from_rate, solve_inverse
+from app.skin.history import history_match
+from app.skin.ipr import ipr
+from app import store
+from app.cache import CACHE_ALIAS
+from app.skin.bulk import parse_chunk
+from app.skin.layers import commingled
+from app.skin.comparison import compare_completions
+from app.encoding import npy_bytes
+from app.views import COMPARE_TABLE_COLUMNS, IPR_CURVE_COLUMNS
+
+WELL_10 = {'type': 10, 'k': 50, 'h': 10, 'Pres': 250, 'Pwf': 100, 'mu': 1, 'B': 1.2, 're': 500, 'rw': 0.1,
+           'kd': 10, 'rd': 0.5}
+WELL_11 = {**WELL_10, 'type': 11, 'hw': 5, 'zw': 5, 'kv': 5, 'model': 0}
+WELL_20 = {**WELL_10, 'type': 20, 'phi': 90, 'Lp': 0.3, 'rp': 0.01, 'ns': 20, 'kv': 5, 'kcz': 5, 'rcz': 0.02}
+
+
+def post(client, path: str, body, **extra):
+    return client.post(path, json.dumps(body), content_type='application/json', **extra)
+
+
+def random_wells(n: int, seed: int = 0) -> dict:
+    """
+    Столбцы параметров n скважин из физически допустимых диапазонов (hw/2 <= zw <= h-hw/2, kd < k и т.д.)
+    """
+    rng = np.random.default_rng(seed)
+    h = rng.uniform(5, 30, n)
+    hw = h*rng.uniform(0.2, 0.9, n)
+    k = rng.uniform(5, 200, n)
+    return {
+        'k': k, 'kh': k, 'h': h, 'hw': hw, 'kd': k*rng.uniform(0.1, 0.9, n), 'kv': k*rng.uniform(0.05, 1, n),
+        'rw': rng.uniform(0.07, 0.12, n), 'rd': rng.uniform(0.2, 1, n), 'zw': hw/2 + rng.uniform(0.05, 0.95, n)*(h - hw),
+        'model': rng.integers(0, 2, n), 'y': rng.uniform(0.5, 1, n), 'phi': rng.choice([0, 45, 60, 90, 120, 180, 360], n),
+        'Lp': rng.uniform(0.1, 0.5, n), 'rp': rng.uniform(0.005, 0.01, n), 'ns': rng.uniform(5, 40, n),
+        'kcz': k*rng.uniform(0.05, 0.3, n), 'rcz': rng.uniform(0.01, 0.03, n), 'teta': rng.uniform(0.1, 1.2, n),
+        'Lwpc': hw*rng.uniform(1.05, 2, n),
+    }
+
+
+class VectorSkinTest(TestCase):
+    """
+    Векторизованный расчет скин-фактора совпадает с поэлементным расчетом исходных классов скважин
+    """
+    wells = (
+        (UncasedVW(), VectorUncasedVW(), ('perfect_s', 'unperfect_s')),
+        (PerfVW(), VectorPerfVW(), ('full_perf_s', 'part_perf_s')),
+        (UnanchDW(), VectorUnanchDW(), ('perfect_s', 'unperfect_s')),
+        (PerfDW(), VectorPerfDW(), ('full_perf_s', 'part_perf_s')),
+    )
+
+    def test_matches_scalar(self):
+        cols = random_wells(50)
+        for scalar, vector, methods in self.wells:
+            for method in methods:
+                with self.subTest(well=type(scalar).__name__, method=method):
+                    S = vector.calc(method, cols)['S']
+                    func = getattr(scalar, method)
+                    names = inspect.signature(func).parameters
+                    for i in range(len(S)):
+                        expected = func(**{name: cols[name][i].item() for name in names if name in cols})
+                        self.assertAlmostEqual(S[i], expected, delta=1e-9*max(1, abs(expected)))
+
+    def test_structured_array(self):
+        cols = random_wells(5)
+        arr = np.empty(5, dtype=[(name, float) for name in cols])
+        for name, column in cols.items():
+            arr[name] = column
+        for scalar, vector, methods in self.wells:
+            np.testing.assert_array_equal(vector.calc(methods[0], arr)['S'], vector.calc(methods[0], cols)['S'])
+
+
+class BatchTest(TestCase):
+    """
+    Пакетный расчет: строки с ошибками не прерывают расчет остальных
+    """
+    def test_json(self):
+        rows = [WELL_10, {**WELL_10, 'type': 99}, WELL_20, {key: value for key, value in WELL_11.items() if key != 'hw'}]
+        response = post(self.client, '/api/batch', rows)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['n_ok'], data['n_errors']), (2, 2))
+        results = data['results']
+        self.assertEqual([res['index'] for res in results], [0, 1, 2, 3])
+        self.assertIn('99', results[1]['error'])
+        self.assertIn('hw', results[3]['error'])
+        for res, well in ((results[0], WELL_10), (results[2], WELL_20)):
+            type_, values = validate_row(well)
+            S = calc_skin(type_, {name: np.array([value]) for name, value in values.items()})['S'][0]
+            self.assertAlmostEqual(res['S'], S, places=12)
+            self.assertAlmostEqual(res['q'], q_well(*(values[name] for name in RATE_FIELDS), S), places=9)
+
+    def test_ndjson(self):
+        body = '\n'.join([json.dumps(WELL_10), '{"type": 10,', '', json.dumps(WELL_20)])
+        response = self.client.post('/api/batch', body, content_type='application/x-ndjson')
+        results = response.json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertNotIn('error', results[0])
+        self.assertIn('JSON', results[1]['error'])
+        self.assertNotIn('error', results[2])
+
+    def test_not_array(self):
+        self.assertEqual(self.client.post('/api/batch', '[1, 2', content_type='application/json').status_code, 400)
+
+
+class ProfileTest(TestCase):
+    """
+    Профиль давления одним векторным вызовом совпадает с поточечным расчетом
+    """
+    args = (250, 80, 1, 1.2, 50, 10, 500, 2, 0.1)
+
+    def test_matches_pointwise(self):
+        for spacing in ('log', 'linear', 'adaptive'):
+            with self.subTest(spacing=spacing):
+                r, p = p_profile(*self.args, n=50, spacing=spacing)
+                self.assertEqual(r.shape, (50,))
+                self.assertAlmostEqual(r[0], 0.1)
+                self.assertAlmostEqual(r[-1], 500)
+                self.assertTrue((np.diff(r) > 0).all())
+                expected = [p_ss_atma(250, 80, 1, 1.2, 50, 10, 500, 2, x) for x in r.tolist()]
+                np.testing.assert_allclose(p, expected, rtol=1e-14)
+
+    def test_r_max(self):
+        r, _ = p_profile(*self.args, n=10, r_max=50)
+        self.assertAlmostEqual(r[-1], 50)
+
+    def test_unknown_spacing(self):
+        with self.assertRaises(ValueError):
+            r_grid(0.1, 500, 10, 'cubic')
+
+
+class SensitivityTest(TestCase):
+    """
+    Производные скин-фактора и дебита, диаграмма "торнадо"
+    """
+    def test_derivatives(self):
+        type_, values = validate_row(WELL_10)
+        # Sd = (k/kd - 1)*ln(1 + rd/rw)
+        k, kd, rd, rw = (values[name] for name in ('k', 'kd', 'rd', 'rw'))
+        res = post(self.client, '/api/sensitivity', {'well': WELL_10}).json()
+        self.assertAlmostEqual(res['S'], (k/kd - 1)*np.log1p(rd/rw), places=12)
+        self.assertAlmostEqual(res['dS']['kd'], -k/kd**2*np.log1p(rd/rw), places=6)
+        self.assertAlmostEqual(res['dS']['k'], np.log1p(rd/rw)/kd, places=6)
+        # дебит пропорционален депрессии
+        self.assertAlmostEqual(res['elasticity_q']['Pwf'], -values['Pwf']/(values['Pres'] - values['Pwf']), places=6)
+
+    def test_tornado(self):
+        ranges = {'rd': [0.2, 1], 'kd': [5, 20], 'mu': [0.9, 1.1]}
+        res = post(self.client, '/api/sensitivity', {'well': WELL_10, 'ranges': ranges}).json()
+        swings = [abs(bar['q_high'] - bar['q_low']) for bar in res['tornado']]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        self.assertEqual({bar['param'] for bar in res['tornado']}, set(ranges))
+
+    def test_unknown_param(self):
+        response = post(self.client, '/api/sensitivity', {'well': WELL_10, 'ranges': {'Lp': [0.1, 0.5]}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Lp', response.json()['detail'])
+
+    def test_bad_range(self):
+        for bounds in ([5], [5, 10, 20], 5, [20, 5], [5, 5], [5, 'abc'], [5, None], [5, 'inf']):
+            with self.subTest(bounds=bounds):
+                response = post(self.client, '/api/sensitivity', {'well': WELL_10, 'ranges': {'mu': [1, 2], 'kd': bounds}})
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(response.json()['detail'].startswith('kd: '))
+        self.assertEqual(post(self.client, '/api/sensitivity', {'well': WELL_10, 'ranges': [1, 2]}).status_code, 400)
+
+
+class MonteCarloTest(TestCase):
+    """
+    Расчет неопределенности методом Монте-Карло
+    """
+    def setUp(self):
+        self.type_, self.values = validate_row(WELL_10)
+
+    def test_reproducible(self):
+        dists = validate_distributions(self.type_, {'kd': {'dist': 'uniform', 'low': 5, 'high': 20}})
+        first = monte_carlo(self.type_, self.values, dists, n_samples=5000, seed=1, chunk_size=1000)
+        second = monte_carlo(self.type_, self.values, dists, n_samples=5000, seed=1, chunk_size=1000)
+        self.assertEqual(first, second)
+        other = monte_carlo(self.type_, self.values, dists, n_samples=5000, seed=2, chunk_size=1000)
+        self.assertNotEqual(first['S']['mean'], other['S']['mean'])
+        # скин-фактор убывает с ростом kd: крайние значения - на границах диапазона
+        k, rd, rw = (self.values[name] for name in ('k', 'rd', 'rw'))
+        self.assertGreaterEqual(first['S']['min'], (k/20 - 1)*np.log1p(rd/rw))
+        self.assertLessEqual(first['S']['max'], (k/5 - 1)*np.log1p(rd/rw))
+        self.assertLess(first['S']['P10'], first['S']['P50'])
+        self.assertLess(first['S']['P50'], first['S']['P90'])
+        self.assertEqual(sum(first['S']['hist']), 5000)
+
+    def test_deterministic(self):
+        dists = validate_distributions(self.type_, {'kd': {'dist': 'normal', 'mean': self.values['kd'], 'std': 0}})
+        res = monte_carlo(self.type_, self.values, dists, n_samples=100)
+        S = calc_skin(self.type_, {name: np.array([value]) for name, value in self.values.items()})['S'][0]
+        self.assertAlmostEqual(res['S']['mean'], S, places=9)
+        self.assertAlmostEqual(res['S']['P50'], S, places=2)
+        self.assertAlmostEqual(res['S']['std'], 0, places=5)
+
+    def test_rejected(self):
+        for dists in ({'kd': {'dist': 'uniform', 'low': 5, 'high': 5}}, {'Lp': {'dist': 'uniform', 'low': 0, 'high': 1}},
+                      {'kd': {'dist': 'beta'}}, {'kd': {'dist': 'uniform', 'low': -5, 'high': 0}}):
+            with self.subTest(dists=dists):
+                response = post(self.client, '/api/monte_carlo', {'well': WELL_10, 'distributions': dists})
+                self.assertEqual(response.status_code, 400)
+
+    def test_non_positive(self):
+        # около трети реализаций нормального распределения kd неположительны
+        dists = validate_distributions(self.type_, {'kd': {'dist': 'normal', 'mean': 2, 'std': 5}})
+        res = monte_carlo(self.type_, self.values, dists, n_samples=10000, seed=3, chunk_size=3000)
+        self.assertTrue(2500 < res['S']['n_invalid'] < 4500)
+        self.assertEqual(res['S']['n_invalid'], res['q']['n_invalid'])
+        self.assertEqual(sum(res['S']['hist']) + res['S']['n_invalid'], 10000)
+        k, rd, rw = (self.values[name] for name in ('k', 'rd', 'rw'))
+        self.assertGreater(res['S']['min'], -np.log1p(rd/rw))
+        self.assertGreater(res['q']['min'], 0)
+
+
+class SweepTest(TestCase):
+    """
+    Расчет на сетке параметров по порциям совпадает с расчетом в отдельных узлах
+    """
+    axes = [{'param': 'kd', 'start': 1, 'stop': 100, 'num': 7, 'log': True}, {'param': 'rd', 'values': [0.2, 0.5, 1]}]
+
+    def test_matches_nodes(self):
+        type_, values = validate_row(WELL_10)
+        chunks = list(sweep(type_, values, self.axes, chunk_size=4))
+        self.assertEqual(len(chunks), 6)
+        result = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+        kd, rd = np.meshgrid(np.geomspace(1, 100, 7), [0.2, 0.5, 1], indexing='ij')
+        np.testing.assert_allclose(result['kd'], kd.ravel())
+        np.testing.assert_allclose(result['rd'], rd.ravel())
+        for n in (0, 10, 20):
+            cols = {name: np.array([value]) for name, value in {**values, 'kd': kd.flat[n], 'rd': rd.flat[n]}.items()}
+            S = calc_skin(type_, cols)['S']
+            self.assertAlmostEqual(result['S'][n], S[0], places=12)
+            self.assertAlmostEqual(result['q'][n], calc_rate(cols, S)[0], places=9)
+
+    def test_endpoint(self):
+        response = post(self.client, '/api/sweep', {'well': WELL_10, 'axes': self.axes})
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0]['axes'], ['kd', 'rd'])
+        self.assertEqual(sum(len(line['S']) for line in lines[1:]), 21)
+
+    def test_rejected(self):
+        large = [{'param': 'kd', 'start': 1, 'stop': 100, 'num': 3000}, {'param': 'rd', 'start': 0.2, 'stop': 1, 'num': 3000}]
+        for axes in (large,
+                     [{'param': 'Lp', 'values': [0.1, 0.2]}], [{'param': 'kd', 'values': []}]):
+            with self.subTest(axes=axes):
+                response = post(self.client, '/api/sweep', {'well': WELL_10, 'axes': axes})
+                self.assertEqual(response.status_code, 400)
+
+    def test_size_checked_first(self):
+        # размер оси проверяется до построения массива значений
+        for spec, detail in (({'param': 'kd', 'start': 1, 'stop': 100, 'num': 1e10}, 'num'),
+                             ({'param': 'kd', 'stop': 100, 'num': 10}, 'start'),
+                             ({'param': 'kd', 'start': 1, 'stop': 100, 'num': 'many'}, 'num'),
+                             ({'param': 'kd', 'start': 0, 'stop': 100, 'num': 10, 'log': True}, 'start')):
+            with self.subTest(spec=spec):
+                response = post(self.client, '/api/sweep', {'well': WELL_10, 'axes': [spec]})
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(response.json()['detail'].startswith('ось kd: '))
+                self.assertIn(detail, response.json()['detail'])
+        self.assertEqual(grid_size([{'param': 'kd', 'start': 1, 'stop': 2, 'num': 3000}, {'param': 'rd', 'values': [1, 2]}]), 6000)
+
+
+class OptimizerTest(TestCase):
+    """
+    Подбор перфорации: лучшие варианты и фронт Парето
+    """
+    design = {'phi': [60, 90, 180], 'Lp': {'start': 0.1, 'stop': 0.9, 'num': 5}, 'ns': [10, 20, 40]}
+
+    def test_best_and_pareto(self):
+        type_, values = validate_row(WELL_20)
+        res = optimize_perforation(type_, values, self.design, top=5)
+        self.assertEqual(res['n_designs'], 45)
+        self.assertEqual(res['n_feasible'], 45)
+        q = [row['q'] for row in res['best']]
+        self.assertEqual(q, sorted(q, reverse=True))
+        # лучший вариант - самые длинные каналы при наибольшей плотности перфорации
+        self.assertEqual((res['best'][0]['Lp'], res['best'][0]['ns']), (0.9, 40))
+        pareto = res['pareto']
+        costs = [row['cost'] for row in pareto]
+        self.assertEqual(costs, sorted(costs))
+        for a, b in zip(pareto, pareto[1:]):
+            self.assertGreater(b['q'], a['q'])
+        self.assertEqual(pareto[-1]['q'], q[0])
+
+    def test_max_cost(self):
+        type_, values = validate_row(WELL_20)
+        res = optimize_perforation(type_, values, self.design, max_cost=200)
+        # стоимость ns*h: 100, 200 и 400
+        self.assertEqual(res['n_feasible'], 30)
+        self.assertTrue(all(row['cost'] <= 200 for row in res['best'] + res['pareto']))
+
+    def test_pareto_front(self):
+        loss = np.array([3.0, 1.0, 2.0, 1.0, 0.5])
+        cost = np.array([1.0, 2.0, 2.0, 3.0, 4.0])
+        self.assertEqual(pareto_front(loss, cost).tolist(), [0, 1, 4])
+
+    def test_rejected(self):
+        for well, design in ((WELL_10, None), (WELL_20, {'kd': [1, 2]}), (WELL_20, {'phi': [75]})):
+            with self.subTest(design=design):
+                response = post(self.client, '/api/optimize', {'well': well, 'design': design})
+                self.assertEqual(response.status_code, 400)
+
+
+class SessionTest(TestCase):
+    """
+    Сессия инкрементального расчета: пересчитываются только зависящие от изменения составляющие
+    """
+    def fresh(self, well: dict) -> float:
+        type_, values = validate_row(well)
+        return calc_skin(type_, {name: np.array([value]) for name, value in values.items()})['S'][0]
+
+    def test_incremental(self):
+        type_, values = validate_row(WELL_20)
+        session = SkinSession(type_, values)
+        first = session.result()
+        self.assertAlmostEqual(first['S'], self.fresh(WELL_20), places=12)
+        res = session.update(kd=5)
+        self.assertEqual(sorted(res['recomputed']), ['S', 'Scz', 'Sd', 'q'])
+        self.assertAlmostEqual(res['S'], self.fresh({**WELL_20, 'kd': 5}), places=12)
+        res = session.update(kd=10)
+        # прежние значения берутся из кеша
+        self.assertEqual(res['recomputed'], [])
+        self.assertEqual(res['S'], first['S'])
+
+    def test_scan(self):
+        type_, values = validate_row(WELL_20)
+        session = SkinSession(type_, values)
+        session.result()
+        res = session.update(Lp=np.array([0.1, 0.3, 0.5]))
+        self.assertNotIn('Sd', res['recomputed'])
+        for Lp, S in zip((0.1, 0.3, 0.5), res['S']):
+            self.assertAlmostEqual(S, self.fresh({**WELL_20, 'Lp': Lp}), places=12)
+
+    def test_endpoints(self):
+        created = post(self.client, '/api/session', WELL_10).json()
+        path = f'/api/session/{created["session"]}'
+        self.assertAlmostEqual(created['S'], self.fresh(WELL_10), places=12)
+        res = post(self.client, path, {'kd': [5, 20]}).json()
+        self.assertEqual(len(res['S']), 2)
+        self.assertAlmostEqual(res['S'][1], self.fresh({**WELL_10, 'kd': 20}), places=12)
+        self.assertEqual(post(self.client, path, {'kd': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.delete(path).status_code, 200)
+        self.assertEqual(post(self.client, path, {'kd': 5}).status_code, 404)
+
+    def test_rejected_update_keeps_inputs(self):
+        created = post(self.client, '/api/session', WELL_20).json()
+        path = f'/api/session/{created["session"]}'
+        self.assertEqual(post(self.client, path, {'ns': [10, 20]}).status_code, 200)
+        for changes in ({'Lp': [0.1, 0.2, 0.3]}, {'kd': 0}, {'ns': [10, -1]}, {'Pwf': 100, 'unknown': 1}):
+            with self.subTest(changes=changes):
+                response = post(self.client, path, changes)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+        # отклоненные изменения не попадают в сессию
+        res = post(self.client, path, {'Lp': [0.1, 0.2]}).json()
+        for ns, Lp, S in zip((10, 20), (0.1, 0.2), res['S']):
+            self.assertAlmostEqual(S, self.fresh({**WELL_20, 'ns': ns, 'Lp': Lp}), places=12)
+
+
+class JobTest(TestCase):
+    """
+    Фоновые задачи: проверка данных при постановке в очередь, расчет с отметками прогресса
+    """
+    def test_rejected(self):
+        for body in ({'kind': 'plot0', 'payload': WELL_10}, {'kind': 'batch', 'payload': WELL_10},
+                     {'kind': 'sweep', 'payload': {'well': WELL_10, 'axes': [{'param': 'Lp', 'values': [0.1]}]}},
+                     {'kind': 'monte_carlo', 'payload': {'well': WELL_10, 'n_samples': 0}}):
+            with self.subTest(body=body):
+                self.assertEqual(post(self.client, '/api/jobs', body).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_runners(self):
+        fractions = []
+        res = RUNNERS['batch'][1]([WELL_10, WELL_20, {**WELL_10, 'type': 99}], fractions.append)
+        self.assertEqual((res['n_ok'], res['n_errors']), (2, 1))
+        self.assertEqual(res['results'], calc_batch([WELL_10, WELL_20, {**WELL_10, 'type': 99}]))
+        self.assertEqual(fractions[-1], 1)
+        payload = {'well': WELL_10, 'distributions': {'kd': {'dist': 'uniform', 'low': 5, 'high': 20}},
+                   'n_samples': 1000}
+        self.assertEqual(RUNNERS['monte_carlo'][1](payload, lambda fraction: None),
+                         monte_carlo(**mc_request_args(payload)))
+
+    def test_not_found(self):
+        self.assertEqual(self.client.get('/api/jobs/00000000-0000-0000-0000-000000000000').status_code, 404)
+
+
+class MetricsTest(TestCase):
+    """
+    Учет длительности запросов: заголовок Server-Timing и метрики в формате Prometheus
+    """
+    def test_server_timing(self):
+        response = post(self.client, '/api/batch', [WELL_10, WELL_20])
+        timings = dict(item.split(';dur=') for item in response['Server-Timing'].split(', '))
+        self.assertIn('total', timings)
+        self.assertTrue(all(float(duration) >= 0 for duration in timings.values()))
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+
+    def test_metrics(self):
+        post(self.client, '/api/sensitivity', {'well': WELL_10})
+        post(self.client, '/api/sensitivity', {'well': WELL_10, 'ranges': {'Lp': [0.1, 0.5]}})
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('skin_request_duration_seconds_bucket{endpoint="/api/sensitivity",type="",le="+Inf"}', text)
+        self.assertIn('skin_stage_duration_seconds_count{endpoint="/api/sensitivity",type="",stage="serialize"}', text)
+        self.assertIn('skin_requests_total{endpoint="/api/sensitivity",type="",status="200"}', text)
+        self.assertIn('skin_errors_total{endpoint="/api/sensitivity",type="",error="http_400"}', text)
+
+    @override_settings(SKIN_METRICS=False)
+    def test_disabled(self):
+        self.assertFalse(post(self.client, '/api/batch', [WELL_10]).has_header('Server-Timing'))
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+def b64_decode(arr: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(arr['data']), dtype=arr['dtype']).reshape(arr['shape'])
+
+
+@override_settings(SKIN_CACHE=False, SKIN_STORE=False)
+class EncodingTest(TestCase):
+    """
+    Двоичные и столбцовые форматы ответа совпадают с JSON
+    """
+    def test_profile(self):
+        expected = post(self.client, '/api/plot0', WELL_20).json()
+        response = post(self.client, '/api/plot0?format=npy', WELL_20)
+        self.assertEqual(response['Content-Type'], 'application/x-npy')
+        arr = np.load(io.BytesIO(response.content))
+        np.testing.assert_array_equal(arr['r'], expected['r_arr'])
+        np.testing.assert_array_equal(arr['p'], expected['p_arr'])
+        type_, values = validate_row(WELL_20)
+        S = calc_skin(type_, {name: np.array([value]) for name, value in values.items()})['S'][0]
+        self.assertAlmostEqual(float(response['X-Skin-S']), S, places=9)
+        accepted = post(self.client, '/api/plot0', WELL_20, HTTP_ACCEPT='application/x-npy')
+        self.assertEqual(accepted.content, response.content)
+        res = post(self.client, '/api/plot0?format=base64&dtype=float32', WELL_20).json()
+        p = b64_decode(res['p_arr'])
+        self.assertEqual(p.dtype, np.dtype('<f4'))
+        np.testing.assert_array_equal(p, np.array(expected['p_arr'], dtype=np.float32))
+
+    def test_batch(self):
+        rows = [WELL_10, WELL_20, {**WELL_10, 'type': 99}]
+        expected, errors = batch_columns(calc_batch(rows))
+        res = post(self.client, '/api/batch?format=columnar', rows).json()
+        self.assertEqual(res['errors'], {str(index): message for index, message in errors.items()})
+        res64 = post(self.client, '/api/batch?format=base64', rows).json()
+        response = post(self.client, '/api/batch?format=npy', rows)
+        self.assertEqual(response['X-Skin-Errors'], '1')
+        arr = np.load(io.BytesIO(response.content))
+        for name, column in expected.items():
+            np.testing.assert_array_equal(np.array(res['columns'][name], dtype=float), column, err_msg=name)
+            np.testing.assert_array_equal(b64_decode(res64['columns'][name]), column, err_msg=name)
+            np.testing.assert_array_equal(arr[name], column, err_msg=name)
+
+    def test_not_acceptable(self):
+        for path in ('/api/plot0?format=xml', '/api/plot0?format=columnar', '/api/plot0?dtype=float16'):
+            with self.subTest(path=path):
+                self.assertEqual(post(self.client, path, WELL_10).status_code, 406)
+        self.assertEqual(post(self.client, '/api/batch?format=xml', [WELL_10]).status_code, 406)
+
+
+class TransientTest(TestCase):
+    """
+    Давление при переменном дебите: решение линейного источника и способы суперпозиции
+    """
+    args = {'Pres': 250, 'k': 50, 'h': 10, 'mu': 1, 'B': 1.2, 'S': 2, 'phi': 0.2, 'ct': 1e-5, 'rw': 0.1}
+
+    def test_exp1(self):
+        np.testing.assert_allclose(exp1([0.01, 0.5, 1, 5, 50]),
+                                   [4.037929576538114, 0.5597735947761608, 0.219383934395520,
+                                    0.001148295591275326, 3.783264029550459e-24], rtol=1e-13)
+
+    def test_drawdown(self):
+        t = np.array([1.0, 10, 100])
+        res = pwf_history([0], [100], t_eval=t, method='direct', **self.args)
+        td = td_from_t(t, 50, 0.2, 1, 1e-5, 0.1)
+        dp = 18.41*1*1.2/(50*10)*100*(0.5*exp1(1/(4*td)) + 2)
+        np.testing.assert_allclose(res['dp'], dp, rtol=1e-12)
+        np.testing.assert_allclose(res['p'], 250 - dp, rtol=1e-12)
+
+    def test_methods(self):
+        t = np.arange(0, 48, 0.5)
+        q = 100 + 50*np.sin(t/5)
+        q[60:] = 0
+        uniform = pwf_history(t, q, method='uniform', **self.args)
+        for method in ('direct', 'recursive'):
+            with self.subTest(method=method):
+                res = pwf_history(t, q, method=method, **self.args)
+                np.testing.assert_allclose(res['p'], uniform['p'], rtol=1e-7)
+        # после остановки скважины давление восстанавливается
+        self.assertTrue((np.diff(uniform['p'][60:]) > 0).all())
+
+    def test_endpoint(self):
+        body = {'well': WELL_10, 't': [0, 24], 'q': [100, 0], 't_eval': [1, 24, 48]}
+        res = post(self.client, '/api/transient', body).json()
+        self.assertEqual(res['t'], [1, 24, 48])
+        self.assertLess(res['p'][0], res['p'][2])
+        for changes in ({'q': [100]}, {'t': [24, 0]}, {'method': 'fft'}, {'t': 'abc'},
+                        {'phi': 0}, {'ct': 0}, {'r': -1}, {'t_eval': [-1, 24]}):
+            with self.subTest(changes=changes):
+                response = post(self.client, '/api/transient', {**body, **changes})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+
+
+class InverseTest(TestCase):
+    """
+    Обратный расчет скин-фактора и параметров заканчивания по дебиту
+    """
+    def rate(self, well: dict) -> tuple:
+        type_, values = validate_row(well)
+        S = calc_skin(type_, {name: np.array([value]) for name, value in values.items()})['S']
+        return float(calc_rate({name: np.array([values[name]]) for name in RATE_FIELDS}, S)[0]), float(S[0])
+
+    def test_skin(self):
+        q, S = self.rate(WELL_20)
+        type_, values = validate_row(WELL_20)
+        self.assertAlmostEqual(float(skin_from_rate(*(values[name] for name in RATE_FIELDS), q)), S, places=9)
+        res = solve_inverse([{**WELL_20, 'q': q}])[0]
+        self.assertAlmostEqual(res['S'], S, places=9)
+
+    def test_params(self):
+        wells = [WELL_10, {**WELL_10, 'kd': 2}, WELL_20, {**WELL_20, 'kd': 30}]
+        rates = [self.rate(well)[0] for well in wells]
+        results = solve_inverse([{**well, 'q': q, 'kd': None} for well, q in zip(wells, rates)], 'kd')
+        for well, res in zip(wells, results):
+            self.assertAlmostEqual(res['kd'], well['kd'], places=6)
+            self.assertEqual(res['n_roots'], 1)
+        q = self.rate({**WELL_20, 'Lp': 0.5})[0]
+        self.assertAlmostEqual(solve_inverse([{**WELL_20, 'q': q}], 'Lp')[0]['Lp'], 0.5, places=6)
+
+    def test_errors(self):
+        results = solve_inverse([{**WELL_10, 'q': -1}, {**WELL_10, 'q': 1e6}, {**WELL_10}], 'kd')
+        self.assertTrue(all('error' in res for res in results))
+        self.assertEqual(post(self.client, '/api/inverse', {'wells': [WELL_10], 'solve_for': 'k'}).status_code, 400)
+        res = post(self.client, '/api/inverse', {'wells': [WELL_10], 'solve_for': 'Lp'}).json()
+        self.assertEqual(res['n_errors'], 1)
+
+
+class HistoryMatchTest(TestCase):
+    """
+    Подбор проницаемости и скин-фактора по синтетической истории давления
+    """
+    t, q = [0, 24], [100, 0]
+    t_obs = np.geomspace(0.1, 48, 40)
+
+    def observed(self, k: float, S: float, noise: float = 0) -> np.ndarray:
+        p = pwf_history(self.t, self.q, 250, k, 10, 1, 1.2, S, t_eval=self.t_obs, method='direct')['p']
+        return p + noise*np.random.default_rng(0).standard_normal(p.size)
+
+    def test_recover(self):
+        type_, values = validate_row(WELL_10)
+        res = history_match(type_, {**values, 'k': 10}, self.t, self.q, self.t_obs, self.observed(30, 3))
+        self.assertTrue(res['converged'])
+        self.assertAlmostEqual(res['fitted']['k'], 30, places=4)
+        self.assertAlmostEqual(res['fitted']['S'], 3, places=4)
+        self.assertLess(res['rmse'], 1e-6)
+
+    def test_confidence(self):
+        type_, values = validate_row(WELL_10)
+        res = history_match(type_, values, self.t, self.q, self.t_obs, self.observed(30, 3, noise=0.05))
+        for name, true in (('k', 30), ('S', 3)):
+            low, high = res['ci'][name]
+            self.assertLess(low, res['fitted'][name])
+            self.assertLess(res['fitted'][name], high)
+            self.assertLess(low, true)
+            self.assertLess(true, high)
+
+    def test_endpoint(self):
+        body = {'well': {**WELL_10, 'Pres': 250, 'k': 10}, 't': self.t, 'q': self.q, 't_obs': self.t_obs.tolist(),
+                'p_obs': self.observed(30, 3).tolist()}
+        self.assertAlmostEqual(post(self.client, '/api/history_match', body).json()['fitted']['k'], 30, places=4)
+        self.assertEqual(post(self.client, '/api/history_match', {**body, 'fit': ['mu']}).status_code, 400)
+
+
+class IPRTest(TestCase):
+    """
+    Кривые притока по скважинам и сценариям скин-фактора
+    """
+    def test_curves(self):
+        wells = [WELL_10, {**WELL_20, 'Pwf': None}, {**WELL_10, 'Pres': None}]
+        scenarios = [{'label': 'base'}, {'label': 'ОПЗ', 'S': -2}, {'label': 'kd', 'kd': 50}]
+        res = ipr(wells, scenarios, n_points=11)
+        self.assertEqual(res['errors'], [{'index': 2, 'error': res['errors'][0]['error']}])
+        self.assertEqual(res['q'].shape, (6, 11))
+        np.testing.assert_array_equal(res['q'][:, 0], 0)
+        np.testing.assert_allclose(res['Pwf'][:, -1], 0)
+        for curve, q in zip(res['curves'], res['q']):
+            well = {**wells[curve['well']], **scenarios[curve['scenario']]}
+            well.pop('label')
+            type_, values = validate_row({**well, 'S': None, 'Pwf': 0})
+            S = well['S'] if 'S' in well else calc_skin(
+                type_, {name: np.array([value]) for name, value in values.items()})['S'][0]
+            self.assertAlmostEqual(curve['S'], S, places=12)
+            q_max = calc_rate({name: np.array([values[name]]) for name in RATE_FIELDS}, np.array([S]))[0]
+            self.assertAlmostEqual(curve['q_max'], q_max, places=9)
+            self.assertEqual(curve['q_op'] is None, curve['well'] == 1)
+        # дебит в рабочей точке лежит на кривой притока (линейной по депрессии)
+        curve = res['curves'][0]
+        self.assertAlmostEqual(curve['q_op'], curve['q_max']*(1 - WELL_10['Pwf']/WELL_10['Pres']), places=9)
+
+    def test_endpoint(self):
+        res = post(self.client, '/api/ipr', {'well': WELL_10, 'skins': [0, 5], 'n_points': 5}).json()
+        self.assertEqual([curve['label'] for curve in res['curves']], ['S=0', 'S=5'])
+        self.assertGreater(res['curves'][0]['q_max'], res['curves'][1]['q_max'])
+        # параметр сценария, не входящий в расчет типа заканчивания, - ошибка скважины
+        res = post(self.client, '/api/ipr', {'well': WELL_10, 'scenarios': [{'Lp': 0.5}]}).json()
+        self.assertEqual([error['index'] for error in res['errors']], [0])
+        for body in ({'well': WELL_10, 'n_points': 1}, {'well': WELL_10, 'skins': [0], 'scenarios': [{}]},
+                     {'wells': []}):
+            with self.subTest(body=body):
+                self.assertEqual(post(self.client, '/api/ipr', body).status_code, 400)
+
+    def test_n_points(self):
+        for n_points in (0, 1, 10**6):
+            with self.subTest(n_points=n_points):
+                response = post(self.client, '/api/ipr', {'well': WELL_10, 'n_points': n_points})
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SKIN_CACHE=True, SKIN_STORE=False)
+class ResponseCacheTest(TestCase):
+    """
+    Кэш ответов: повторный запрос - из кэша, совпадение If-None-Match - 304 без тела
+    """
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+
+    def test_hit_and_not_modified(self):
+        first = post(self.client, '/api/plot0', WELL_10)
+        self.assertEqual(first['X-Skin-Cache'], 'miss')
+        # та же скважина в другой записи: порядок полей и представление чисел не влияют на ключ
+        second = post(self.client, '/api/plot0', {name: str(value) for name, value in reversed(WELL_10.items())})
+        self.assertEqual(second['X-Skin-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        not_modified = post(self.client, '/api/plot0', WELL_10, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+        changed = post(self.client, '/api/plot0', {**WELL_10, 'k': 60}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed['X-Skin-Cache'], 'miss')
+
+    def test_errors_not_cached(self):
+        for _ in range(2):
+            response = post(self.client, '/api/plot0', {**WELL_10, 'type': 99})
+            self.assertEqual(response.status_code, 422)
+            self.assertFalse(response.has_header('X-Skin-Cache'))
+
+
+class LayersTest(TestCase):
+    """
+    Совместная эксплуатация нескольких пластов: дебит скважины - сумма дебитов пластов
+    """
+    wells = [
+        {**WELL_10, 'layers': [{'k': 50, 'h': 10}, {'k': 5, 'h': 4, 'kd': 1}, {**WELL_20, 'h': 6}]},
+        {**WELL_10, 'layers': [{'k': 20}, {'type': 99}]},
+        {**WELL_10, 'layers': []},
+    ]
+
+    def test_commingled(self):
+        res = commingled(self.wells)
+        layers = res['layers']
+        self.assertEqual(layers['well'].tolist(), [0, 0, 0, 1, 1])
+        self.assertEqual(layers['layer'].tolist(), [0, 1, 2, 0, 1])
+        self.assertEqual([error['index'] for error in res['errors']], [1, 2])
+        self.assertIn('пласт 1', res['errors'][0]['error'])
+        ok = layers['well'] == 0
+        self.assertAlmostEqual(res['wells']['q'][0], layers['q'][ok].sum(), places=9)
+        self.assertAlmostEqual(layers['fraction'][ok].sum(), 1, places=12)
+        self.assertEqual(res['wells']['kh'][0], 50*10 + 5*4 + 50*6)
+        self.assertTrue(np.isnan(res['wells']['q'][1:]).all())
+        # пласт рассчитывается как отдельная скважина с параметрами пласта
+        single = calc_batch([{**WELL_10, 'k': 5, 'h': 4, 'kd': 1}, {**WELL_20, 'h': 6}])
+        np.testing.assert_allclose(layers['q'][1:3], [row['q'] for row in single], rtol=1e-12)
+        np.testing.assert_allclose(layers['S'][1:3], [row['S'] for row in single], rtol=1e-12)
+
+    def test_endpoint(self):
+        res = post(self.client, '/api/layers', {'wells': self.wells}).json()
+        self.assertEqual(len(res['errors']), 2)
+        self.assertEqual(post(self.client, '/api/layers', {'wells': 'abc'}).status_code, 400)
+
+
+class CompareTest(TestCase):
+    """
+    Сравнение типов заканчивания по одному набору параметров
+    """
+    well = {**WELL_11, **WELL_20, 'teta': 30, 'Lwpc': 8}
+
+    def test_table(self):
+        res = compare_completions(self.well, n_points=20)
+        table = res['table']
+        self.assertEqual([row['rank'] for row in table], list(range(1, len(table) + 1)))
+        q = [row['q'] for row in table]
+        self.assertEqual(q, sorted(q, reverse=True))
+        self.assertEqual(table[0]['q_ratio'], 1)
+        self.assertEqual(len(table) + len(res['skipped']), 8)
+        self.assertEqual(res['p'].shape, (len(table), 20))
+        for row, p in zip(table, res['p']):
+            result = calc_batch([{**self.well, 'type': row['type']}])[0]
+            self.assertAlmostEqual(row['S'], result['S'], places=12)
+            self.assertAlmostEqual(row['q'], result['q'], places=9)
+            np.testing.assert_allclose(p, [p_ss_atma(250, row['q'], 1, 1.2, 50, 10, 500, row['S'], r)
+                                           for r in res['r'].tolist()], rtol=1e-12)
+
+    def test_skipped(self):
+        res = compare_completions(WELL_10, types=[10, 20])
+        self.assertEqual([row['type'] for row in res['table']], [10])
+        self.assertEqual([row['type'] for row in res['skipped']], [20])
+
+    def test_endpoint(self):
+        res = post(self.client, '/api/compare', {'well': self.well, 'types': [20, 10], 'n_points': 5}).json()
+        self.assertEqual(len(res['r']), 5)
+        for body in ({'well': self.well, 'types': [99]}, {'well': WELL_10, 'types': [20]},
+                     {'well': self.well, 'spacing': 'x'}):
+            with self.subTest(body=body):
+                self.assertEqual(post(self.client, '/api/compare', body).status_code, 400)
+
+    def test_profile_bounds(self):
+        for changes in ({'n_points': 0}, {'n_points': 1}, {'r_max': 0.05}, {'well': {**self.well, 're': 0.1}}):
+            with self.subTest(changes=changes):
+                body = {'well': self.well, **changes}
+                self.assertEqual(post(self.client, '/api/compare', body).status_code, 400)
+
+
+class KernelTest(TestCase):
+    """
+    Объекты расчета скин-фактора не хранят состояния, таблица коэффициентов неизменяема
+    """
+    def test_stateless(self):
+        skin = Skin()
+        self.assertEqual(skin.set_coeff(90), kt_coeff(90))
+        skin.calc_Sp(60, 0.1, 0.3, 0.01, 20, 50, 5)
+        self.assertEqual(vars(skin), {})
+        with self.assertRaises(TypeError):
+            KT_TABLE[90] = KT_TABLE[60]
+        with self.assertRaises(ValueError):
+            KT_COEFF[0, 0] = 1
+
+    def test_vector_coeff(self):
+        np.testing.assert_array_equal(kt_coeff_arr([90, 0, 180]), [KT_TABLE[90], KT_TABLE[0], KT_TABLE[180]])
+        with self.assertRaises(ValueError):
+            kt_coeff_arr([90, 75])
+
+    def test_threads(self):
+        phis = [0, 45, 60, 90, 120, 180]*20
+        expected = [Skin().calc_Sp(phi, 0.1, 0.3, 0.01, 20, 50, 5) for phi in phis]
+        skin, results = Skin(), [None]*len(phis)
+
+        def work(i):
+            results[i] = skin.calc_Sp(phis[i], 0.1, 0.3, 0.01, 20, 50, 5)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(len(phis))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+
+
+class JobRecoveryTest(TestCase):
+    """
+    Незавершенные задачи других процессов без подтверждения завершаются с ошибкой
+    """
+    def test_orphans(self):
+        stale = timezone.now() - timedelta(seconds=2*ORPHAN_TIMEOUT)
+        orphan = Job.objects.create(kind='sweep', payload={}, status=Job.RUNNING, worker='other:1', heartbeat=stale)
+        silent = Job.objects.create(kind='sweep', payload={}, status=Job.QUEUED, worker='other:1')
+        alive = Job.objects.create(kind='sweep', payload={}, status=Job.RUNNING, worker='other:2',
+                                   heartbeat=timezone.now())
+        for job in (orphan, silent, alive):
+            queue.recover(job.id)
+        self.assertEqual(Job.objects.get(id=orphan.id).status, Job.FAILED)
+        self.assertEqual(Job.objects.get(id=silent.id).status, Job.FAILED)
+        self.assertEqual(Job.objects.get(id=alive.id).status, Job.RUNNING)
+
+
+class SweepJobTest(TestCase):
+    """
+    Фоновый расчет сетки: столбцы результата хранятся двоично и выдаются в форматах /sweep
+    """
+    payload = {'well': WELL_20, 'axes': [{'param': 'Lp', 'start': 0.1, 'stop': 1, 'num': 30},
+                                         {'param': 'ns', 'values': [10, 20, 30]}]}
+
+    def test_run_sweep(self):
+        fractions = []
+        res = RUNNERS['sweep'][1](self.payload, fractions.append)
+        self.assertEqual((res['axes'], res['size']), (['Lp', 'ns'], 90))
+        type_, values = validate_row(WELL_20)
+        chunks = list(sweep(type_, values, self.payload['axes']))
+        for name, column in res['columns'].items():
+            np.testing.assert_array_equal(column, np.concatenate([chunk[name] for chunk in chunks]), err_msg=name)
+        self.assertEqual(fractions[-1], 1)
+
+    def test_result(self):
+        res = RUNNERS['sweep'][1](self.payload, lambda fraction: None)
+        columns = res.pop('columns')
+        job = Job.objects.create(kind='sweep', payload=self.payload, status=Job.DONE, result=res,
+                                 data=npy_bytes(columns, '<f8'))
+        arr = np.load(io.BytesIO(self.client.get(f'/api/jobs/{job.id}/result?format=npy').content))
+        data = self.client.get(f'/api/jobs/{job.id}/result').json()
+        self.assertEqual(data['axes'], ['Lp', 'ns'])
+        for name, column in columns.items():
+            np.testing.assert_array_equal(arr[name], column, err_msg=name)
+            np.testing.assert_array_equal(data[name], column, err_msg=name)
+
+    def test_size_cap(self):
+        payload = {'well': WELL_20, 'axes': [{'param': 'Lp', 'start': 0.1, 'stop': 1, 'num': 1001},
+                                             {'param': 'ns', 'start': 1, 'stop': 30, 'num': 1000}]}
+        with self.assertRaises(ValueError):
+            check_sweep(payload)
+        self.assertEqual(post(self.client, '/api/jobs', {'kind': 'sweep', 'payload': payload}).status_code, 400)
+
+
+@override_settings(SKIN_CACHE=False, SKIN_STORE=False)
+class SchemaTest(TestCase):
+    """
+    Проверка параметров plot0 схемой запроса: ошибки - 422 с указанием поля
+    """
+    def test_valid(self):
+        for well in (WELL_10, WELL_11, WELL_20, {**WELL_11, 'type': '11', 'y': '', 'n_points': ''}):
+            response = post(self.client, '/api/plot0', well)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertTrue(np.isfinite(response.json()['p_arr']).all())
+
+    def test_rejected(self):
+        wells = {
+            'y': {**WELL_11, 'y': 0},
+            'type': {**WELL_10, 'type': 99},
+            'kd': {key: value for key, value in WELL_10.items() if key != 'kd'},
+            'phi': {**WELL_20, 'phi': 91},
+            'k': {**WELL_10, 'k': 'abc'},
+        }
+        for field, well in wells.items():
+            with self.subTest(field=field):
+                response = post(self.client, '/api/plot0', well)
+                self.assertEqual(response.status_code, 422, response.content)
+                self.assertIn(field, json.dumps(response.json()['detail']))
+
+    def test_profile_bounds(self):
+        for changes in ({'n_points': 0}, {'n_points': -5}, {'n_points': 10**7}, {'r_max': 0.05}, {'re': 0.05}):
+            with self.subTest(changes=changes):
+                response = post(self.client, '/api/plot0', {**WELL_10, **changes})
+                self.assertEqual(response.status_code, 422, response.content)
+                self.assertIn(next(iter(changes)), json.dumps(response.json()['detail'], ensure_ascii=False))
+        p = post(self.client, '/api/plot0', {**WELL_10, 'n_points': 2, 'r_max': 0.2}).json()['p_arr']
+        self.assertEqual(len(p), 2)
+        self.assertLess(p[0], p[1])
+
+
+@override_settings(SKIN_STORE=True)
+class StoreTest(TestCase):
+    """
+    Хранилище сценариев: попадания учитываются в памяти, устаревшие и лишние записи удаляются
+    """
+    def setUp(self):
+        store.flush_hits()
+
+    def test_hits(self):
+        rows = [WELL_10, WELL_20, {**WELL_10, 'type': 99}]
+        first = store.calc_batch_stored(rows)
+        self.assertEqual(Scenario.objects.count(), 2)
+        with self.assertNumQueries(1):
+            second = store.calc_batch_stored(rows)
+        self.assertEqual([res.get('error') for res in second], [res.get('error') for res in first])
+        self.assertEqual([res.get('q') for res in second], [res.get('q') for res in first])
+        self.assertEqual(set(Scenario.objects.values_list('hits', flat=True)), {0})
+        store.flush_hits()
+        self.assertEqual(set(Scenario.objects.values_list('hits', flat=True)), {1})
+
+    def test_evict(self):
+        store.calc_batch_stored([{**WELL_10, 'k': k} for k in (10, 20, 30, 40)])
+        now = timezone.now()
+        for days, k in ((40, 10), (3, 20), (2, 30), (1, 40)):
+            Scenario.objects.filter(inputs__k=float(k)).update(used=now - timedelta(days=days))
+        with override_settings(SKIN_STORE_RETENTION_DAYS=30, SKIN_STORE_MAX_ROWS=2):
+            self.assertEqual(store.evict(now), 2)
+        self.assertEqual(sorted(Scenario.objects.values_list('inputs__k', flat=True)), [30.0, 40.0])
+
+    @override_settings(SKIN_CACHE=False)
+    def test_plot0_deferred(self):
+        first = post(self.client, '/api/plot0', WELL_20).json()
+        # запрос не ждет записи в базу: результат сохраняется отложенно
+        self.assertEqual(Scenario.objects.count(), 0)
+        store.flush_pending()
+        record = Scenario.objects.get()
+        type_, values = validate_row(WELL_20)
+        skin = calc_skin(type_, {name: np.array([value]) for name, value in values.items()})
+        self.assertAlmostEqual(record.S, skin['S'][0], places=12)
+        self.assertEqual(set(record.skin), set(skin) - {'S'})
+        self.assertAlmostEqual(record.skin['Sd'], skin['Sd'][0], places=12)
+        with self.assertNumQueries(1):
+            second = post(self.client, '/api/plot0', WELL_20).json()
+        self.assertEqual(second, first)
+
+
+class BatchColumnsTest(TestCase):
+    """
+    Столбцовый расчет (calc_columns, разбор CSV) совпадает с построчным (calc_batch, batch_columns)
+    """
+    rows = [
+        WELL_10, WELL_11, WELL_20,
+        {**WELL_10, 'k': 5, 'kd': 1},
+        {**WELL_11, 'y': 0.5},
+        {**WELL_10, 'kd': 'abc'},
+        {**WELL_20, 'phi': 91},
+        {**WELL_11, 'hw': None},
+        {**WELL_10, 'k': 'nan'},
+        {**WELL_10, 'type': 99},
+        {**WELL_10, 'type': 10.5},
+        {**WELL_10, 'type': 'abc'},
+        {**WELL_10, 'type': None},
+    ]
+
+    def csv_chunk(self) -> tuple:
+        names = sorted({name for row in self.rows for name in row})
+        lines = []
+        for row in self.rows:
+            out = io.StringIO()
+            csv.writer(out, lineterminator='\n').writerow(['' if row.get(name) is None else row[name] for name in names])
+            lines.append(out.getvalue().encode('utf-8'))
+        return 'csv', names, lines, ','
+
+    def test_same_results_and_errors(self):
+        rows = [{name: value for name, value in row.items() if value is not None} for row in self.rows]
+        expected, expected_errors = batch_columns(calc_batch(rows))
+        columns, errors = calc_columns(*parse_chunk(self.csv_chunk()))
+        self.assertEqual(errors, expected_errors)
+        # тип 10.5 рассчитывается как 10
+        self.assertEqual(set(errors), {5, 6, 7, 8, 9, 11, 12})
+        np.testing.assert_array_equal(columns['type'], expected['type'])
+        for name, column in expected.items():
+            np.testing.assert_allclose(columns[name], column, rtol=1e-12, equal_nan=True, err_msg=name)
+
+    def test_numeric_path(self):
+        rows = self.rows[:5]
+        names = sorted({name for row in rows for name in row})
+        lines = [(','.join(str(row.get(name, '')) for name in names) + '\n').encode('utf-8') for row in rows]
+        cols, invalid = parse_chunk(('csv', names, lines, ','))
+        self.assertEqual(invalid, {})
+        columns, errors = calc_columns(cols, invalid)
+        expected, expected_errors = batch_columns(calc_batch(rows))
+        self.assertEqual(errors, expected_errors)
+        for name, column in expected.items():
+            np.testing.assert_allclose(columns[name], column, rtol=1e-12, equal_nan=True, err_msg=name)
+
+
+class IPRPartsTest(TestCase):
+    """
+    Двоичный ответ кривых притока: точки кривых либо описание кривых (?part=curves)
+    """
+    body = {'wells': [WELL_10, WELL_20, {**WELL_10, 'Pres': None}], 'skins': [0, 5], 'n_points': 7}
+
+    def test_parts(self):
+        expected = post(self.client, '/api/ipr', self.body).json()
+        response = post(self.client, '/api/ipr?format=npy', self.body)
+        self.assertEqual(response['X-Skin-Errors'], '1')
+        points = np.load(io.BytesIO(response.content))
+        self.assertEqual(points['curve'].tolist(), np.repeat(np.arange(4), 7).tolist())
+        np.testing.assert_allclose(points['q'], np.ravel(expected['q']), rtol=1e-12)
+        curves = np.load(io.BytesIO(post(self.client, '/api/ipr?format=npy&part=curves', self.body).content))
+        self.assertEqual(curves.dtype.names, ('curve',) + IPR_CURVE_COLUMNS)
+        for name in IPR_CURVE_COLUMNS:
+            values = [np.nan if curve[name] is None else curve[name] for curve in expected['curves']]
+            np.testing.assert_array_equal(curves[name], values, err_msg=name)
+        self.assertEqual(post(self.client, '/api/ipr?format=npy&part=table', self.body).status_code, 400)
+
+
+class CompareTableTest(TestCase):
+    """
+    Двоичный ответ сравнения: профили давления либо таблица типов (?part=table)
+    """
+    def test_parts(self):
+        body = {'well': CompareTest.well, 'n_points': 6}
+        expected = post(self.client, '/api/compare', body).json()
+        points = np.load(io.BytesIO(post(self.client, '/api/compare?format=npy', body).content))
+        np.testing.assert_allclose(points['p'], np.ravel(expected['p']), rtol=1e-12)
+        table = np.load(io.BytesIO(post(self.client, '/api/compare?format=npy&part=table', body).content))
+        self.assertEqual(table.dtype.names, COMPARE_TABLE_COLUMNS)
+        for name in COMPARE_TABLE_COLUMNS:
+            np.testing.assert_array_equal(table[name], [row[name] for row in expected['table']], err_msg=name)
+        self.assertEqual(post(self.client, '/api/compare?format=npy&part=curves', body).status_code, 400)
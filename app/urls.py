@@ -3,7 +3,9 @@ from app.views import (
     index,
     api
 )
+from app.metrics import metrics
 urlpatterns = [
     path("", index, name="index"),
     path("api/", api.urls),
+    path("metrics", metrics, name="metrics"),
 ]
@@ -1,14 +1,55 @@
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
 import numpy as np
+import io
 import json
-from ninja import NinjaAPI
+import threading
+import uuid
+from collections import OrderedDict
+from ninja import Body
 from app.skin.skin import *
-from app.skin.uncased_vertical_well import UncasedVW
-from app.skin.perforated_vertical_well import PerfVW
-from app.skin.unanchored_directional_well import UnanchDW
-from app.skin.perforated_directional_well import PerfDW
+from app.skin.batch import batch_columns, calc_batch, coerce_value, validate_row
+from app.skin.completions import calc_skin, check_phi
+from app.skin.sensitivity import sensitivity as calc_sensitivity
+from app.skin import monte_carlo as mc
+from app.skin import sweep as sw
+from app.skin.optimizer import optimize_perforation
+from app.skin.session import SkinSession
+from app.skin import transient
+from app.skin.inverse import solve_inverse
+from app.skin import history
+from app.skin import ipr as ipr_curves
+from app.skin import layers as layered
+from app.skin import comparison
+from app.jobs import queue
+from app import store
+from app.skin.completions import COMPLETIONS
+from app.models import Job
+from app.metrics import InstrumentedAPI, mark, stage, set_type
+from app.renderers import NumpyJSONRenderer
+from app import encoding as enc
+from app.schemas import Plot0In
 
-api = NinjaAPI()
+api = InstrumentedAPI(renderer=NumpyJSONRenderer())
+
+MAX_SESSIONS = 256
+
+# Форматы ответа конечных точек (app.encoding)
+PROFILE_FORMATS = ('json', 'base64', 'npy', 'arrow')
+SWEEP_FORMATS = ('json', 'base64', 'npy', 'arrow')
+TRANSIENT_FORMATS = ('json', 'base64', 'npy', 'arrow')
+IPR_FORMATS = ('json', 'base64', 'npy', 'arrow')
+LAYER_FORMATS = ('json', 'base64', 'npy', 'arrow')
+COMPARE_FORMATS = ('json', 'base64', 'npy', 'arrow')
+
+# Части результата в двоичном ответе (параметр part) и столбцы описания кривых
+IPR_PARTS = ('points', 'curves')
+IPR_CURVE_COLUMNS = ('well', 'type', 'scenario', 'S', 'q_max', 'q_op')
+COMPARE_PARTS = ('points', 'table')
+COMPARE_TABLE_COLUMNS = ('rank', 'type', 'S', 'q', 'q_ratio')
+
+sessions = OrderedDict()
+sessions_lock = threading.Lock()
 
 def index(request):
 	"""
@@ -18,62 +59,490 @@ def index(request):
 	return render(request, "app/index.html")
 
 @api.post("/plot0")
-def plot0(request, data0):
-	data0 = dict_verify(json.loads(data0))
-	uncased_vertical_well = UncasedVW()
-	perf_vertical_well = PerfVW()
-	unanchored_directional_well = UnanchDW()
-	perforated_directional_well = PerfDW()
-	if data0['type'] == 10:
-		S = uncased_vertical_well.perfect_s(data0['k'], data0['kd'], data0['rw'], data0['rd'])
-		res_l = 'Производительность совершенной по степени вскрытия вертикальной скважины'
-	elif data0['type'] == 11:
-		S = uncased_vertical_well.unperfect_s(data0['model'], data0['h'], data0['hw'], data0['rw'], data0['zw'], data0['k'], data0['kv'], data0['k'], data0['kd'], data0['rd'], data0['y'])
-		res_l = 'Производительность несовершенной по степени вскрытия вертикальной скважины'
-	elif data0['type'] == 20:
-		S = perf_vertical_well.full_perf_s(data0['k'], data0['kd'], data0['rw'], data0['rd'], data0['phi'], data0['Lp'], data0['rp'], data0['ns'], data0['k'], data0['kv'], data0['kcz'], data0['rcz'])
-		res_l = 'Производительность полностью перфорированной вертикальной скважины'
-	elif data0['type'] == 21:
-		S = perf_vertical_well.part_perf_s(data0['k'], data0['kd'], data0['rw'], data0['rd'], data0['phi'], data0['Lp'], data0['rp'], data0['ns'], data0['k'], data0['kv'], data0['kcz'], data0['rcz'], data0['h'], data0['hw'], data0['model'], data0['zw'], data0['y'])
-		res_l = 'Производительность частично перфорированной вертикальной скважины'
-	elif data0['type'] == 30:
-		S = unanchored_directional_well.perfect_s(data0['k'], data0['kd'], data0['rw'], data0['rd'], data0['model'], data0['teta'], data0['k'], data0['kv'], data0['h'], data0['hw'], data0['zw'])
-		res_l = 'Производительность совершенной по степени вскрытия необсаженной наклонно-направленной скважины'
-	elif data0['type'] == 31:
-		S = unanchored_directional_well.unperfect_s(data0['k'], data0['kd'], data0['rw'], data0['rd'], data0['h'], data0['Lwpc'], data0['teta'], data0['k'], data0['kv'], data0['hw'], data0['zw'])
-		res_l = 'Производительность несовершенной по степени вскрытия наклонно-направленной скважины'
-	elif data0['type'] == 40:
-		S = perforated_directional_well.full_perf_s(data0['k'], data0['kd'], data0['rw'], data0['rd'], data0['teta'], data0['phi'], data0['Lp'], data0['rp'], data0['ns'], data0['k'], data0['kv'], data0['kcz'], data0['rcz'], data0['model'], data0['h'], data0['hw'], data0['zw'])
-		res_l = 'Производительность полностью перфорированной наклонно-направленной скважины'
-	elif data0['type'] == 41:
-		S = perforated_directional_well.part_perf_s(data0['k'], data0['kd'], data0['rw'], data0['rd'], data0['teta'], data0['phi'], data0['Lp'], data0['rp'], data0['ns'], data0['k'], data0['kv'], data0['kcz'], data0['rcz'], data0['h'], data0['hw'], data0['zw'])
-		res_l = 'Производительность частично перфорированной наклонно-направленной скважины'
-
-	
-	q = q_well(data0['k'], data0['h'], data0['Pres'], data0['Pwf'], data0['mu'], data0['B'], data0['re'], data0['rw'], S)
-	r_arr, p_arr = np.linspace(data0['rw'], 100, 500).tolist(), []
-	for r in r_arr:
-		p_arr.append(p_ss_atma(
-			data0['Pres'],
-			q,
-			data0['mu'],
-			data0['B'],
-			data0['k'],
-			data0['h'],
-			data0['re'],
-			S,
-			r
-			))
-	return {"res": f'{res_l} - {round(q,1)} м3/сут', "r_arr":r_arr , "p_arr":p_arr }
-
-def dict_verify(dict_: dict):
-	"""
-	## Функция валидации необязательных параметров
-	"""
-	for key in dict_:
-		if isinstance(dict_[key], str):
-			if dict_[key] != '':
-				dict_[key] = float(dict_[key])
+def plot0(request, data0: Body[Plot0In]):
+	"""
+	# Расчет дебита и профиля давления скважины
+
+	Тело запроса - JSON с параметрами скважины; набор обязательных полей определяется типом заканчивания type
+	"""
+	mark(request, 'parse')
+	try:
+		fmt, dtype = enc.negotiate(request, PROFILE_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	set_type(request, data0.type)
+	data0 = data0.model_dump()
+	key = store.scenario_key('plot0', data0)
+	with stage(request, 'store'):
+		record = store.lookup(key)
+	if record is not None:
+		S, q, res_l = record.S, record.q, COMPLETIONS[data0['type']][3]
+		r_arr, p_arr = store.from_bytes(record.r_arr), store.from_bytes(record.p_arr)
+	else:
+		with stage(request, 'skin'):
+			S, skin, res_l = calc_plot0_skin(data0)
+		with stage(request, 'rate'):
+			q = q_well(data0['k'], data0['h'], data0['Pres'], data0['Pwf'], data0['mu'], data0['B'], data0['re'], data0['rw'], S)
+		with stage(request, 'profile'):
+			n_points = 100 if data0['n_points'] is None else data0['n_points']
+			r_arr, p_arr = p_profile(data0['Pres'], q, data0['mu'], data0['B'], data0['k'], data0['h'], data0['re'], S,
+				data0['rw'], n_points, data0['r_max'], data0['spacing'])
+		with stage(request, 'store'):
+			store.save_later([store.plot0_record(key, data0['type'], data0, S, skin, q, r_arr, p_arr)])
+	res = f'{res_l} - {round(q,1)} м3/сут'
+	if fmt == 'json':
+		return {"res": res, "r_arr": r_arr, "p_arr": p_arr}
+	with stage(request, 'encode'):
+		if fmt != 'base64':
+			return enc.columns_response({"r": r_arr, "p": p_arr}, fmt, dtype, {"X-Skin-S": float(S), "X-Skin-Rate": float(q)})
+		arrays = enc.b64_columns({"r_arr": r_arr, "p_arr": p_arr}, dtype)
+	return {"res": res, **arrays}
+
+def calc_plot0_skin(data0):
+	"""
+	Расчет скин-фактора скважины и его составляющих по параметрам запроса plot0 (векторный расчет
+	для массива из одной скважины; составляющие сохраняются в хранилище сценариев без пересчета)
+
+	:return: (скин-фактор, словарь составляющих скин-фактора, подпись результата)
+	"""
+	_, _, fields, res_l = COMPLETIONS[data0['type']]
+	cols = {name: np.array([data0[name]], dtype=float) for name in fields if data0.get(name) is not None}
+	with np.errstate(all='ignore'):
+		skin = calc_skin(data0['type'], cols)
+	S = float(skin.pop('S')[0])
+	return S, {name: float(value[0]) for name, value in skin.items()}, res_l
+
+@api.post("/batch")
+def batch(request):
+	"""
+	# Пакетный расчет множества скважин
+
+	Тело запроса - JSON-массив параметров скважин (как в plot0) либо NDJSON (по одной скважине в строке).
+	Ошибки валидации возвращаются построчно, не прерывая расчет остальных скважин.
+	Форматы ответа (?format=): json - список строк, columnar/base64 - JSON со столбцами
+	(в base64 - двоичные массивы), npy/arrow - двоичные столбцы без сообщений об ошибках.
+	"""
+	try:
+		fmt, dtype = enc.negotiate(request)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	body = request.body.decode('utf-8')
+	if 'ndjson' in request.content_type or not body.lstrip().startswith('['):
+		rows = []
+		for line in body.splitlines():
+			if not line.strip():
+				continue
+			try:
+				rows.append(json.loads(line))
+			except ValueError as e:
+				rows.append(ValueError(f'некорректный JSON: {e}'))
+	else:
+		try:
+			rows = json.loads(body)
+		except ValueError as e:
+			return api.create_response(request, {"detail": f'некорректный JSON: {e}'}, status=400)
+		if not isinstance(rows, list):
+			return api.create_response(request, {"detail": 'ожидается JSON-массив скважин'}, status=400)
+	results = calc_batch(rows)
+	n_errors = sum('error' in res for res in results)
+	if fmt == 'json':
+		return {"n_ok": len(results) - n_errors, "n_errors": n_errors, "results": results}
+	with stage(request, 'encode'):
+		columns, errors = batch_columns(results)
+		if fmt in ('npy', 'arrow'):
+			return enc.columns_response(columns, fmt, dtype, {"X-Skin-Errors": n_errors})
+		if fmt == 'base64':
+			columns = enc.b64_columns(columns, dtype)
+	return {"n_ok": len(results) - n_errors, "n_errors": n_errors, "columns": columns, "errors": errors}
+
+@api.post("/sensitivity")
+def sensitivity(request):
+	"""
+	# Анализ чувствительности скин-фактора и дебита
+
+	Тело запроса: {"well": {параметры скважины как в plot0}, "ranges": {"kd": [мин, макс], ...}}
+	"""
+	try:
+		body = json.loads(request.body)
+		type_, values = validate_row(body.get('well'))
+		return calc_sensitivity(type_, values, body.get('ranges'))
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+
+@api.post("/monte_carlo")
+def monte_carlo(request):
+	"""
+	# Оценка неопределенности скин-фактора и дебита методом Монте-Карло
+
+	Тело запроса: {"well": {параметры скважины как в plot0},
+	"distributions": {"kd": {"dist": "lognormal", "mu": 2.3, "sigma": 0.3}, ...},
+	"n_samples": 100000, "seed": 0, "bins": 50, "processes": 1}
+	"""
+	try:
+		return mc.monte_carlo(**mc.request_args(json.loads(request.body)))
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+
+@api.post("/sweep")
+def sweep(request):
+	"""
+	# Расчет скин-фактора и дебита на сетке по одному или двум параметрам
+
+	Тело запроса: {"well": {параметры скважины как в plot0},
+	"axes": [{"param": "Lp", "start": 0.1, "stop": 1, "num": 100}, {"param": "ns", "values": [...]}]}
+	Ответ - NDJSON: первая строка описывает сетку, далее по строке со столбцами на каждую порцию узлов
+	(при ?format=base64 - столбцы в виде двоичных массивов); при format=npy/arrow - двоичный поток столбцов.
+	"""
+	try:
+		fmt, dtype = enc.negotiate(request, SWEEP_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	try:
+		args = sw.request_args(json.loads(request.body))
+		chunks = sw.sweep(**args)
+	except (ValueError, TypeError, AttributeError, KeyError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	names = tuple(axis['param'] for axis in args['axes']) + ('S', 'q')
+	if fmt in ('npy', 'arrow'):
+		return enc.columns_stream(chunks, sw.grid_size(args['axes']), names, fmt, dtype)
+
+	def stream():
+		yield json.dumps({"type": args['type_'], "axes": [axis.get('param') for axis in args['axes']]}) + '\n'
+		for chunk in chunks:
+			if fmt == 'base64':
+				yield json.dumps(enc.b64_columns(chunk, dtype)) + '\n'
+			else:
+				yield json.dumps({name: finite_list(column) for name, column in chunk.items()}) + '\n'
+
+	return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+@api.post("/optimize")
+def optimize(request):
+	"""
+	# Подбор параметров перфорации (фазировка, длина и радиус каналов, плотность перфорации)
+
+	Тело запроса: {"well": {параметры скважины как в plot0},
+	"design": {"phi": [60, 90], "Lp": {"start": 0.1, "stop": 1, "num": 10}, "ns": [10, 20, 30]},
+	"objective": "q", "cost": {"shot": 1, "Lp_cost": 0, "rp_cost": 0}, "max_cost": null, "top": 10}
+	"""
+	try:
+		body = json.loads(request.body)
+		type_, values = validate_row(body.get('well'))
+		max_cost = body.get('max_cost')
+		return optimize_perforation(type_, values, body.get('design'), body.get('objective', 'q'),
+			body.get('cost'), None if max_cost is None else float(max_cost), int(body.get('top', 10)))
+	except (ValueError, TypeError, AttributeError, KeyError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+
+@api.post("/inverse")
+def inverse(request):
+	"""
+	# Обратный расчет: скин-фактор и параметр заканчивания по замеренному дебиту и забойному давлению
+
+	Тело запроса: {"wells": [{параметры скважины как в plot0, "q": замеренный дебит}, ...],
+	"solve_for": "S" | "kd" | "rd" | "Lp" | "ns", "bracket": [минимум, максимум] (необязательно)}
+	"""
+	try:
+		body = json.loads(request.body)
+		wells = body.get('wells')
+		if not isinstance(wells, list):
+			raise ValueError('ожидается JSON-массив скважин wells')
+		results = solve_inverse(wells, body.get('solve_for', 'S'), body.get('bracket'))
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	n_errors = sum('error' in res for res in results)
+	return {"n_ok": len(results) - n_errors, "n_errors": n_errors, "results": results}
+
+@api.post("/transient")
+def transient_pressure(request):
+	"""
+	# Расчет давления при переменном дебите (решение линейного источника со скин-фактором)
+
+	Тело запроса: {"well": {параметры скважины как в plot0}, "t": [ч], "q": [м3/сут],
+	"t_eval": [ч] (необязательно), "phi": 0.2, "ct": 1e-5, "r": null, "method": "auto"}
+	"""
+	try:
+		fmt, dtype = enc.negotiate(request, TRANSIENT_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	try:
+		args = transient.request_args(json.loads(request.body))
+		with stage(request, 'pressure'):
+			result = transient.pwf_history(**args)
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	if fmt == 'json':
+		return {"S": args['S'], **result}
+	with stage(request, 'encode'):
+		if fmt != 'base64':
+			return enc.columns_response(result, fmt, dtype, {"X-Skin-S": args['S']})
+		arrays = enc.b64_columns(result, dtype)
+	return {"S": args['S'], **arrays}
+
+@api.post("/ipr")
+def ipr(request):
+	"""
+	# Кривые притока: дебит в зависимости от забойного давления от Pres до 0
+
+	Тело запроса: {"wells": [{параметры скважины как в plot0}, ...] (или "well": {...}),
+	"scenarios": [{"label": "base"}, {"label": "ОПЗ", "S": -2}, {"label": "kd=50", "kd": 50}]
+	(или "skins": [0, 5, 10]), "n_points": 101}
+	Ответ: матрицы Pwf и q (кривая x точка) и описание кривых; при format=npy/arrow - столбцы
+	curve, Pwf, q по всем точкам всех кривых, с параметром part=curves - описание кривых (столбцы
+	curve, well, type, scenario, S, q_max, q_op; подписи сценариев - в ответе json/base64).
+	"""
+	try:
+		fmt, dtype = enc.negotiate(request, IPR_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	try:
+		part = enc.response_part(request, IPR_PARTS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	try:
+		with stage(request, 'rate'):
+			result = ipr_curves.ipr(**ipr_curves.request_args(json.loads(request.body)))
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	if fmt == 'json':
+		return result
+	with stage(request, 'encode'):
+		if fmt != 'base64':
+			n_curves, n_points = result['q'].shape
+			if part == 'curves':
+				columns = {"curve": np.arange(n_curves), **enc.records_columns(result['curves'], IPR_CURVE_COLUMNS)}
+			else:
+				columns = {"curve": np.repeat(np.arange(n_curves), n_points), "Pwf": result['Pwf'].ravel(), "q": result['q'].ravel()}
+			return enc.columns_response(columns, fmt, dtype, {"X-Skin-Errors": len(result['errors'])})
+		arrays = enc.b64_columns({"Pwf": result['Pwf'], "q": result['q']}, dtype)
+	return {**result, **arrays}
+
+@api.post("/layers")
+def layers(request):
+	"""
+	# Расчет скважин, совместно эксплуатирующих несколько пластов
+
+	Тело запроса: {"wells": [{общие параметры скважины как в plot0, "layers": [{"k": 50, "h": 5, "kd": 10}, ...]}, ...]}
+	(или "well": {...}); параметры пласта дополняют и переопределяют параметры скважины, включая type.
+	Ответ: столбцы пластов (well, layer, type, S, q, fraction, составляющие скин-фактора), суммарный
+	дебит скважин и ошибки; при format=npy/arrow - только столбцы пластов.
+	"""
+	try:
+		fmt, dtype = enc.negotiate(request, LAYER_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	try:
+		with stage(request, 'rate'):
+			result = layered.commingled(**layered.request_args(json.loads(request.body)))
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	if fmt == 'json':
+		return result
+	with stage(request, 'encode'):
+		if fmt != 'base64':
+			return enc.columns_response(result['layers'], fmt, dtype, {"X-Skin-Errors": len(result['errors'])})
+		arrays = enc.b64_columns(result['layers'], dtype)
+	return {**result, "layers": arrays}
+
+@api.post("/compare")
+def compare(request):
+	"""
+	# Сравнение типов заканчивания скважины по одному набору параметров
+
+	Тело запроса: {"well": {параметры скважины - объединение параметров сравниваемых типов},
+	"types": [10, 11, 20, ...] (необязательно), "n_points": 100, "r_max": null, "spacing": "log"}
+	(или параметры скважины на верхнем уровне, как в plot0).
+	Ответ: таблица типов по убыванию дебита (скин-фактор и его составляющие, дебит), общая сетка r
+	и профили давления p; при format=npy/arrow - столбцы rank, r, p по всем точкам всех профилей,
+	с параметром part=table - таблица (столбцы rank, type, S, q, q_ratio; составляющие скин-фактора -
+	в ответе json/base64).
+	"""
+	try:
+		fmt, dtype = enc.negotiate(request, COMPARE_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	try:
+		part = enc.response_part(request, COMPARE_PARTS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	try:
+		with stage(request, 'skin'):
+			result = comparison.compare_completions(**comparison.request_args(json.loads(request.body)))
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	if not result['table']:
+		return api.create_response(request, {"detail": 'ни один тип заканчивания не рассчитан', "skipped": result['skipped']}, status=400)
+	if fmt == 'json':
+		return result
+	with stage(request, 'encode'):
+		if fmt != 'base64':
+			n_curves, n_points = result['p'].shape
+			if part == 'table':
+				columns = enc.records_columns(result['table'], COMPARE_TABLE_COLUMNS)
 			else:
-				dict_[key] = None
-	return dict_
\ No newline at end of file
+				columns = {"rank": np.repeat(np.arange(1, n_curves + 1), n_points), "r": np.tile(result['r'], n_curves), "p": result['p'].ravel()}
+			return enc.columns_response(columns, fmt, dtype)
+		arrays = enc.b64_columns({"r": result['r'], "p": result['p']}, dtype)
+	return {**result, **arrays}
+
+@api.post("/history_match")
+def history_match(request):
+	"""
+	# Подбор проницаемости и скин-фактора по истории забойного давления и дебита (Левенберг-Марквардт)
+
+	Тело запроса: {"well": {параметры скважины как в plot0}, "t": [ч], "q": [м3/сут], "t_obs": [ч],
+	"p_obs": [атм], "fit": ["k", "S"], "initial": {"k": 10}, "phi": 0.2, "ct": 1e-5, "confidence": 0.95}
+	либо {"wells": [описания скважин], "processes": 1} - подбор по нескольким скважинам
+	"""
+	try:
+		body = json.loads(request.body)
+		problems, processes = history.request_problems(body)
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	with stage(request, 'fit'):
+		fitted = iter(history.fit_many([args for args in problems if isinstance(args, dict)], processes))
+	results = [next(fitted) if isinstance(args, dict) else {"error": args} for args in problems]
+	if 'wells' not in body:
+		if 'error' in results[0]:
+			return api.create_response(request, {"detail": results[0]['error']}, status=400)
+		return results[0]
+	n_errors = sum('error' in res for res in results)
+	return {"n_ok": len(results) - n_errors, "n_errors": n_errors, "results": results}
+
+@api.post("/session")
+def session_create(request):
+	"""
+	# Создание сессии инкрементального расчета скважины
+
+	Тело запроса - параметры скважины как в plot0. Ответ содержит идентификатор сессии и результат расчета.
+	"""
+	try:
+		type_, values = validate_row(json.loads(request.body))
+	except (ValueError, TypeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	session = SkinSession(type_, values)
+	session_id = uuid.uuid4().hex
+	with sessions_lock:
+		sessions[session_id] = session
+		while len(sessions) > MAX_SESSIONS:
+			sessions.popitem(last=False)
+	return {"session": session_id, **session_result(session.result())}
+
+@api.post("/session/{session_id}")
+def session_update(request, session_id: str):
+	"""
+	# Изменение параметров в сессии и инкрементальный пересчет
+
+	Тело запроса - изменяемые параметры; значение-список задает сканирование по параметру.
+	Пересчитываются только составляющие скин-фактора, зависящие от измененных параметров.
+	"""
+	with sessions_lock:
+		session = sessions.get(session_id)
+		if session is not None:
+			sessions.move_to_end(session_id)
+	if session is None:
+		return api.create_response(request, {"detail": 'сессия не найдена'}, status=404)
+	try:
+		changes = {}
+		for name, value in json.loads(request.body).items():
+			value = np.asarray(value, dtype=float) if isinstance(value, list) else coerce_value(value)
+			if value is None or not np.isfinite(value).all():
+				raise ValueError(f'параметр {name} должен быть конечным числом или списком чисел')
+			if name == 'phi' and not check_phi(value):
+				raise ValueError(f'неизвестная фазировка перфорационных зарядов: {value}')
+			changes[name] = value
+		with session.lock:
+			result = session.update(**changes)
+	except (ValueError, TypeError, AttributeError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	return {"session": session_id, **session_result(result)}
+
+@api.delete("/session/{session_id}")
+def session_delete(request, session_id: str):
+	"""
+	# Удаление сессии
+	"""
+	with sessions_lock:
+		sessions.pop(session_id, None)
+	return {"session": session_id}
+
+@api.post("/jobs")
+def job_submit(request):
+	"""
+	# Постановка фоновой задачи расчета в очередь
+
+	Тело запроса: {"kind": "batch" | "sweep" | "monte_carlo", "payload": тело соответствующего синхронного запроса}
+	"""
+	try:
+		body = json.loads(request.body)
+		job = queue.submit(body.get('kind'), body.get('payload'))
+	except (ValueError, TypeError, AttributeError, KeyError) as e:
+		return api.create_response(request, {"detail": str(e)}, status=400)
+	return api.create_response(request, job.as_dict(), status=202)
+
+@api.get("/jobs/{job_id}")
+def job_status(request, job_id: uuid.UUID):
+	"""
+	# Состояние и прогресс фоновой задачи
+	"""
+	job = queue.get(job_id)
+	if job is None:
+		return api.create_response(request, {"detail": 'задача не найдена'}, status=404)
+	return job.as_dict()
+
+@api.get("/jobs/{job_id}/result")
+def job_result(request, job_id: uuid.UUID):
+	"""
+	# Результат выполненной фоновой задачи
+
+	Столбцы сетки (sweep) - в формате по ?format= или Accept, как у /sweep: json, base64, npy, arrow.
+	"""
+	job = queue.get(job_id)
+	if job is None:
+		return api.create_response(request, {"detail": 'задача не найдена'}, status=404)
+	if job.status != Job.DONE:
+		return api.create_response(request, job.as_dict(), status=409)
+	if job.data is None:
+		return job.result
+	try:
+		fmt, dtype = enc.negotiate(request, SWEEP_FORMATS)
+	except ValueError as e:
+		return api.create_response(request, {"detail": str(e)}, status=406)
+	arr = np.load(io.BytesIO(job.data))
+	columns = {name: arr[name] for name in arr.dtype.names}
+	if fmt in ('npy', 'arrow'):
+		return enc.columns_response(columns, fmt, dtype)
+	if fmt == 'base64':
+		return {**job.result, **enc.b64_columns(columns, dtype)}
+	return {**job.result, **{name: finite_list(column) for name, column in columns.items()}}
+
+@api.post("/jobs/{job_id}/cancel")
+def job_cancel(request, job_id: uuid.UUID):
+	"""
+	# Отмена фоновой задачи
+	"""
+	if not Job.objects.filter(id=job_id).exists():
+		return api.create_response(request, {"detail": 'задача не найдена'}, status=404)
+	return queue.cancel(job_id).as_dict()
+
+def session_result(result: dict) -> dict:
+	"""
+	## Перевод результата сессии (скаляры или массивы) в JSON-совместимый вид
+	"""
+	def convert(value):
+		return finite_list(value) if np.ndim(value) else float(value)
+	return {
+		"S": convert(result['S']),
+		"skin": {name: convert(value) for name, value in result['skin'].items()},
+		"q": convert(result['q']),
+		"recomputed": result['recomputed'],
+	}
+
+def finite_list(arr: np.ndarray) -> list:
+	"""
+	## Перевод массива в список с заменой нечисловых значений на None (null в JSON)
+	"""
+	finite = np.isfinite(arr)
+	if finite.all():
+		return arr.tolist()
+	return np.where(finite, arr, None).tolist()
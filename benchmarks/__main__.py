@@ -0,0 +1,101 @@
+"""
+Набор измерений производительности расчета скин-фактора
+
+    python -m benchmarks run -o bench.json                 - измерение и сохранение результатов
+    python -m benchmarks run --suite skin --suite wells     - без сквозных запросов plot0
+    python -m benchmarks compare baseline.json bench.json   - сравнение с базовыми результатами;
+                                                              код возврата 1 при ухудшении
+    python -m benchmarks load -c 1 -c 4 -c 16 -o load.json  - нагрузочный тест plot0 (приложение
+                                                              запускается локально: skin.wsgi на gunicorn)
+    python -m benchmarks serve --port 8000                  - запуск приложения для нагрузочного теста
+"""
+import argparse
+import json
+import sys
+from .compare import compare, format_table
+from .corpus import TYPES
+from .load import SERVERS, WORKERS, load_test, serve
+from .run import run
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='запуск измерений')
+    run_parser.add_argument('-o', '--output', help='файл результатов JSON (по умолчанию - вывод на экран)')
+    run_parser.add_argument('-n', type=int, default=2000, help='число скважин в наборе')
+    run_parser.add_argument('--repeat', type=int, default=5, help='число повторов')
+    run_parser.add_argument('--plot0-n', type=int, default=50, help='число запросов plot0 на тип заканчивания')
+    run_parser.add_argument('--suite', action='append', choices=('skin', 'wells', 'plot0'),
+                            help='состав измерений (по умолчанию - все)')
+    compare_parser = commands.add_parser('compare', help='сравнение с базовыми результатами')
+    compare_parser.add_argument('baseline', help='файл базовых результатов JSON')
+    compare_parser.add_argument('current', help='файл текущих результатов JSON')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение, доли')
+    load_parser = commands.add_parser('load', help='нагрузочный тест plot0')
+    load_parser.add_argument('-o', '--output', help='файл отчета JSON (по умолчанию - вывод на экран)')
+    load_parser.add_argument('-c', '--concurrency', type=int, action='append',
+                             help='число одновременных клиентов (можно несколько; по умолчанию 1, 4, 16)')
+    load_parser.add_argument('-d', '--duration', type=float, default=10, help='длительность измерения уровня, с')
+    load_parser.add_argument('--warmup', type=float, default=2, help='длительность прогрева перед уровнем, с')
+    load_parser.add_argument('--server', choices=SERVERS, default='wsgi',
+                             help='запуск приложения: wsgi - gunicorn, asgi - uvicorn, dev - сервер Django')
+    load_parser.add_argument('-w', '--workers', type=int, default=WORKERS,
+                             help=f'число рабочих процессов gunicorn/uvicorn (по умолчанию {WORKERS})')
+    load_parser.add_argument('--url', help='адрес запущенного приложения (сервер не запускается)')
+    load_parser.add_argument('--type', type=int, action='append', choices=TYPES,
+                             help='типы заканчивания в смеси запросов (по умолчанию - все)')
+    load_parser.add_argument('-n', type=int, default=200, help='число различных скважин каждого типа')
+    load_parser.add_argument('--cache', action='store_true', help='не отключать кэш ответов и хранилище сценариев')
+    serve_parser = commands.add_parser('serve', help='запуск приложения для нагрузочного теста')
+    serve_parser.add_argument('--server', choices=SERVERS, default='wsgi')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('-w', '--workers', type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        if args.workers < 1:
+            parser.error('число рабочих процессов должно быть положительным')
+        serve(args.server, args.host, args.port, args.workers)
+        return 0
+
+    if args.command in ('run', 'load'):
+        if args.command == 'run':
+            result = run(args.n, args.repeat, args.plot0_n, tuple(args.suite or ('skin', 'wells', 'plot0')))
+        else:
+            if any(c < 1 for c in args.concurrency or ()) or args.duration <= 0 or args.n < 1 or args.workers < 1:
+                parser.error('число клиентов, длительность, число скважин и процессов должны быть положительными')
+            try:
+                result = load_test(tuple(args.concurrency or (1, 4, 16)), args.duration, args.warmup, args.server,
+                                   args.url, tuple(args.type or TYPES), args.n, cache=args.cache, workers=args.workers)
+            except RuntimeError as e:
+                print(f'ошибка: {e}', file=sys.stderr)
+                return 2
+            if result['meta']['server'] == 'dev' and args.server != 'dev':
+                print(f'предупреждение: не установлен {"gunicorn" if args.server == "wsgi" else "uvicorn"}, '
+                      f'измерение выполнено на сервере разработки Django', file=sys.stderr)
+        text = json.dumps(result, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    print(format_table(rows))
+    regressions = [row['name'] for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f'\nУхудшение более чем на {args.threshold:.0%}: {len(regressions)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    """
+    Сравнение результатов измерений с базовыми
+
+    :param baseline: результаты run() базовой версии;
+    :param current: результаты run() текущей версии;
+    :param threshold: допустимое относительное ухудшение (0.1 - на 10 %);
+
+    :return: список строк сравнения {"name", "baseline", "current", "ratio", "status"},
+        status: regression, improvement, ok, new, missing
+    """
+    base, cur = baseline['results'], current['results']
+    rows = []
+    for name in sorted(set(base) | set(cur)):
+        if name not in base or name not in cur:
+            rows.append({'name': name, 'baseline': base.get(name, {}).get('value'),
+                         'current': cur.get(name, {}).get('value'), 'ratio': None,
+                         'status': 'new' if name not in base else 'missing'})
+            continue
+        ratio = cur[name]['value']/base[name]['value'] if base[name]['value'] else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1/(1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({'name': name, 'baseline': base[name]['value'], 'current': cur[name]['value'],
+                     'ratio': ratio, 'status': status})
+    return rows
+
+
+def format_table(rows: list) -> str:
+    """
+    Текстовая таблица сравнения
+    """
+    lines = [f'{"name":60} {"baseline":>12} {"current":>12} {"ratio":>7}  status']
+    for row in rows:
+        base = f'{row["baseline"]:.3e}' if row['baseline'] is not None else '-'
+        cur = f'{row["current"]:.3e}' if row['current'] is not None else '-'
+        ratio = f'{row["ratio"]:.2f}' if row['ratio'] is not None else '-'
+        lines.append(f'{row["name"]:60} {base:>12} {cur:>12} {ratio:>7}  {row["status"]}')
+    return '\n'.join(lines)
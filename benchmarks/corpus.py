@@ -0,0 +1,57 @@
+import numpy as np
+
+TYPES = (10, 11, 20, 21, 30, 31, 40, 41)
+PHASINGS = (0, 45, 60, 90, 120, 180, 360)
+
+
+def corpus(type_: int, n: int, seed: int = 0) -> dict:
+    """
+    Воспроизводимый набор параметров n скважин заданного типа заканчивания
+
+    Значения выбираются из физически допустимых диапазонов (hw/2 <= zw <= h-hw/2, kd < k и т.д.),
+    поэтому все скважины набора рассчитываются без ошибок.
+
+    :param type_: тип заканчивания (10, 11, 20, 21, 30, 31, 40, 41);
+    :param n: число скважин;
+    :param seed: начальное значение генератора;
+
+    :return: словарь столбцов (как в запросе plot0)
+    """
+    rng = np.random.default_rng([seed, type_])
+    h = rng.uniform(5, 30, n)
+    hw = h*rng.uniform(0.2, 0.9, n)
+    k = rng.uniform(5, 200, n)
+    return {
+        'type': np.full(n, type_),
+        'k': k,
+        'h': h,
+        'Pres': rng.uniform(150, 300, n),
+        'Pwf': rng.uniform(30, 120, n),
+        'mu': rng.uniform(0.5, 5, n),
+        'B': rng.uniform(1, 1.4, n),
+        're': rng.uniform(200, 500, n),
+        'rw': rng.uniform(0.07, 0.12, n),
+        'kd': k*rng.uniform(0.1, 0.9, n),
+        'rd': rng.uniform(0.2, 1, n),
+        'model': rng.integers(0, 2, n),
+        'hw': hw,
+        'zw': hw/2 + rng.uniform(0.05, 0.95, n)*(h - hw),
+        'kv': k*rng.uniform(0.05, 1, n),
+        'y': rng.uniform(0.5, 1, n),
+        'phi': rng.choice(PHASINGS, n),
+        'Lp': rng.uniform(0.1, 0.5, n),
+        'rp': rng.uniform(0.005, 0.01, n),
+        'ns': rng.uniform(5, 40, n),
+        'kcz': k*rng.uniform(0.05, 0.3, n),
+        'rcz': rng.uniform(0.01, 0.03, n),
+        'teta': rng.uniform(0.1, 1.2, n),
+        'Lwpc': hw*rng.uniform(1.05, 2, n),
+    }
+
+
+def rows(cols: dict) -> list:
+    """
+    Перевод словаря столбцов в список словарей скважин с питоновскими скалярами
+    """
+    names = list(cols)
+    return [dict(zip(names, values)) for values in zip(*(cols[name].tolist() for name in names))]
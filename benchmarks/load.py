@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from importlib.util import find_spec
+from urllib.parse import urlsplit
+import numpy as np
+from .corpus import TYPES, corpus, rows
+
+# Время ожидания запуска и остановки сервера и ответа на запрос, с
+START_TIMEOUT = 30
+STOP_TIMEOUT = 10
+REQUEST_TIMEOUT = 60
+
+# Процентили задержки в отчете
+PERCENTILES = (50, 90, 99)
+
+# Серверы приложения: wsgi - gunicorn, asgi - uvicorn, dev - сервер Django (при отсутствии пакетов)
+SERVERS = ('wsgi', 'asgi', 'dev')
+
+# Число рабочих процессов сервера приложения по умолчанию (фиксируется в отчете)
+WORKERS = os.cpu_count() or 1
+
+# Очередь соединений сервера: все одновременные клиенты теста (иначе повтор SYN через 1 с)
+BACKLOG = 1024
+
+
+def server_command(server: str, host: str, port: int, workers: int) -> tuple:
+    """
+    Команда запуска приложения: wsgi - skin.wsgi на gunicorn, asgi - skin.asgi на uvicorn, с заданным
+    числом рабочих процессов; при отсутствии пакета сервера, а также для dev - многопоточный сервер
+    Django в одном процессе (как runserver)
+
+    :return: (команда, имя сервера: gunicorn, uvicorn либо dev)
+    """
+    if server == 'wsgi' and find_spec('gunicorn') is not None:
+        return [sys.executable, '-m', 'gunicorn', 'skin.wsgi:application', '--bind', f'{host}:{port}',
+                '--workers', str(workers), '--backlog', str(BACKLOG), '--log-level', 'warning'], 'gunicorn'
+    if server == 'asgi' and find_spec('uvicorn') is not None:
+        return [sys.executable, '-m', 'uvicorn', 'skin.asgi:application', '--host', host, '--port', str(port),
+                '--workers', str(workers), '--backlog', str(BACKLOG), '--log-level', 'warning',
+                '--no-access-log'], 'uvicorn'
+    return [sys.executable, '-m', 'benchmarks', 'serve', '--server', 'dev', '--host', host, '--port', str(port)], 'dev'
+
+
+def serve(server: str, host: str, port: int, workers: int = WORKERS) -> None:
+    """
+    Запуск приложения (см. server_command): gunicorn/uvicorn замещают текущий процесс,
+    сервер Django работает в нем
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skin.settings')
+    command, name = server_command(server, host, port, workers)
+    if name != 'dev':
+        os.execv(command[0], command)
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from skin.wsgi import application
+
+    class QuietHandler(WSGIRequestHandler):
+        # без задержки мелких пакетов (заголовки и тело ответа пишутся раздельно), как в серверах приложений
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    class Server(ThreadedWSGIServer):
+        request_queue_size = BACKLOG
+
+    httpd = Server((host, port), QuietHandler)
+    httpd.set_app(application)
+    httpd.serve_forever()
+
+
+def free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server: str, host: str, workers: int, env: dict = None) -> tuple:
+    """
+    Запуск приложения в отдельном процессе (см. server_command) и ожидание готовности к приему соединений
+
+    :return: (процесс, адрес http://host:port, имя сервера)
+    """
+    port = free_port(host)
+    command, name = server_command(server, host, port, workers)
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, env={**os.environ, **(env or {})}, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        if process.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(f'сервер не запустился: {log.read().decode("utf-8", "replace")[-2000:]}')
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process, f'http://{host}:{port}', name
+        except OSError:
+            if time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f'сервер не запустился за {START_TIMEOUT} с')
+            time.sleep(0.1)
+
+
+def stop_server(process) -> None:
+    process.terminate()
+    try:
+        process.wait(STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+class Connection:
+    """
+    Соединение HTTP/1.1 на потоках asyncio с повторным использованием (keep-alive); при закрытии
+    соединения сервером следующий запрос открывает новое
+    """
+    def __init__(self, host: str, port: int) -> None:
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, path: str, body: bytes) -> tuple:
+        """
+        POST-запрос JSON
+
+        :return: (код ответа, тело ответа)
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(b'POST %s HTTP/1.1\r\nHost: %s:%d\r\nContent-Type: application/json\r\n'
+                          b'Content-Length: %d\r\n\r\n%s' % (path.encode(), self.host.encode(), self.port, len(body), body))
+        try:
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError('соединение закрыто сервером')
+            version, status = status_line.split(None, 2)[:2]
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if 'content-length' in headers:
+                content = await self.reader.readexactly(int(headers['content-length']))
+            elif headers.get('transfer-encoding', '').lower() == 'chunked':
+                content = await self.read_chunked()
+            else:
+                content = await self.reader.read()
+                headers['connection'] = 'close'
+        except BaseException:
+            self.close()
+            raise
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if not keep_alive:
+            self.close()
+        return int(status), content
+
+    async def read_chunked(self) -> bytes:
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b''.join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def request_bodies(types: tuple, n: int, seed: int) -> list:
+    """
+    Тела запросов plot0: по n различных скважин каждого типа заканчивания, в случайном порядке
+
+    :return: список (тип заканчивания, тело запроса)
+    """
+    bodies = [(type_, json.dumps(row).encode('utf-8')) for type_ in types for row in rows(corpus(type_, n, seed))]
+    random.Random(seed).shuffle(bodies)
+    return bodies
+
+
+async def client(connection: Connection, bodies: list, start: int, deadline: float, samples: list) -> None:
+    """
+    Клиент с замкнутым циклом: следующий запрос отправляется после получения ответа на предыдущий
+    """
+    i = start
+    while time.perf_counter() < deadline:
+        type_, body = bodies[i % len(bodies)]
+        i += 1
+        begin = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(connection.request('/api/plot0', body), REQUEST_TIMEOUT)
+            error = None if status == 200 else f'http_{status}'
+        except (OSError, asyncio.TimeoutError, ValueError, asyncio.IncompleteReadError) as e:
+            connection.close()
+            error = type(e).__name__
+        samples.append((type_, time.perf_counter() - begin, error))
+    connection.close()
+
+
+async def run_level(url: str, bodies: list, concurrency: int, duration: float, warmup: float) -> dict:
+    """
+    Нагрузка заданным числом одновременных клиентов: прогрев warmup с, затем измерение duration с
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(client(Connection(host, port), bodies, j*len(bodies)//concurrency, deadline, [])
+                               for j in range(concurrency)))
+    samples = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(Connection(host, port), bodies, j*len(bodies)//concurrency,
+                                  start + duration, samples) for j in range(concurrency)))
+    return level_report(concurrency, samples, time.perf_counter() - start)
+
+
+def latency_stats(latency: np.ndarray) -> dict:
+    if not latency.size:
+        return {}
+    stats = {f'p{p}': float(value) for p, value in zip(PERCENTILES, np.percentile(latency, PERCENTILES))}
+    stats.update(mean=float(latency.mean()), max=float(latency.max()))
+    return stats
+
+
+def level_report(concurrency: int, samples: list, elapsed: float) -> dict:
+    """
+    Сводка по уровню нагрузки: пропускная способность, процентили задержки (успешных запросов), ошибки
+    """
+    types = np.array([sample[0] for sample in samples], dtype=np.int64)
+    latency = np.array([sample[1] for sample in samples])
+    failed = np.array([sample[2] is not None for sample in samples], dtype=bool)
+    errors = {}
+    for sample in samples:
+        if sample[2] is not None:
+            errors[sample[2]] = errors.get(sample[2], 0) + 1
+    n = len(samples)
+    return {
+        'concurrency': concurrency,
+        'requests': n,
+        'seconds': elapsed,
+        'throughput': (n - int(failed.sum()))/elapsed,
+        'error_rate': float(failed.mean()) if n else 0.0,
+        'errors': errors,
+        'latency': latency_stats(latency[~failed]),
+        'types': {str(type_): {'requests': int((types == type_).sum()), **latency_stats(latency[~failed & (types == type_)])}
+                  for type_ in sorted(set(types.tolist()))},
+    }
+
+
+def load_test(levels: tuple = (1, 4, 16), duration: float = 10, warmup: float = 2, server: str = 'wsgi',
+              url: str = None, types: tuple = TYPES, n: int = 200, seed: int = 0, cache: bool = False,
+              workers: int = WORKERS) -> dict:
+    """
+    Нагрузочное тестирование plot0: смесь типов заканчивания, несколько уровней одновременности
+
+    Parameters
+    ----------
+    :param levels: числа одновременных клиентов (asyncio, соединения keep-alive);
+    :param duration: длительность измерения на каждом уровне, с;
+    :param warmup: длительность прогрева перед каждым уровнем, с;
+    :param server: запуск приложения локально: wsgi (skin.wsgi на gunicorn), asgi (skin.asgi на uvicorn)
+        либо dev (сервер Django); при отсутствии gunicorn/uvicorn - сервер Django, см. meta.server;
+    :param url: адрес уже запущенного приложения (сервер не запускается);
+    :param types: типы заканчивания в смеси запросов (в равных долях);
+    :param n: число различных скважин каждого типа;
+    :param seed: начальное значение генератора набора скважин;
+    :param cache: не отключать кэш ответов и хранилище сценариев запускаемого приложения
+        (по умолчанию отключаются, чтобы измерялся расчет, а не повторная выдача);
+    :param workers: число рабочих процессов gunicorn/uvicorn;
+
+    :return: {"meta": {...}, "levels": [сводки уровней], "results": {имя: {"unit": "s", "value"}}} -
+        results в формате benchmarks run (меньшее значение лучше) для сравнения версий
+
+    ----------
+    """
+    bodies = request_bodies(tuple(types), n, seed)
+    process, server_name = None, 'external'
+    if url is None:
+        env = {} if cache else {'SKIN_CACHE': '0', 'SKIN_STORE': '0'}
+        process, url, server_name = start_server(server, '127.0.0.1', workers, env)
+    try:
+        reports = [asyncio.run(run_level(url, bodies, concurrency, duration, warmup)) for concurrency in levels]
+    finally:
+        if process is not None:
+            stop_server(process)
+    results = {}
+    for report in reports:
+        name = f'load.plot0.c{report["concurrency"]}'
+        if report['throughput']:
+            results[f'{name}.time_per_request'] = {'unit': 's', 'value': 1/report['throughput']}
+        for p in PERCENTILES:
+            if f'p{p}' in report['latency']:
+                results[f'{name}.latency_p{p}'] = {'unit': 's', 'value': report['latency'][f'p{p}']}
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'server': server_name,
+            'workers': workers if server_name in ('gunicorn', 'uvicorn') else None,
+            'url': url,
+            'duration': duration,
+            'warmup': warmup,
+            'types': list(types),
+            'n': n,
+            'cache': cache,
+        },
+        'levels': reports,
+        'results': results,
+    }
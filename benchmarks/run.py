@@ -0,0 +1,164 @@
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import numpy as np
+from app.skin.skin import Skin
+from app.skin.vector_skin import VectorSkin
+from app.skin.uncased_vertical_well import UncasedVW
+from app.skin.perforated_vertical_well import PerfVW
+from app.skin.unanchored_directional_well import UnanchDW
+from app.skin.perforated_directional_well import PerfDW
+from app.skin.completions import COMPLETIONS, calc_skin
+from .corpus import TYPES, corpus, rows
+
+# Скалярный расчет: тип заканчивания -> (объект, метод, функция аргументов по строке, как в plot0)
+SCALAR_WELLS = {
+    10: (UncasedVW(), 'perfect_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'])),
+    11: (UncasedVW(), 'unperfect_s', lambda r: (r['model'], r['h'], r['hw'], r['rw'], r['zw'], r['k'], r['kv'], r['k'], r['kd'], r['rd'], r['y'])),
+    20: (PerfVW(), 'full_perf_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'], r['phi'], r['Lp'], r['rp'], r['ns'], r['k'], r['kv'], r['kcz'], r['rcz'])),
+    21: (PerfVW(), 'part_perf_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'], r['phi'], r['Lp'], r['rp'], r['ns'], r['k'], r['kv'], r['kcz'], r['rcz'], r['h'], r['hw'], r['model'], r['zw'], r['y'])),
+    30: (UnanchDW(), 'perfect_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'], r['model'], r['teta'], r['k'], r['kv'], r['h'], r['hw'], r['zw'])),
+    31: (UnanchDW(), 'unperfect_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'], r['h'], r['Lwpc'], r['teta'], r['k'], r['kv'], r['hw'], r['zw'])),
+    40: (PerfDW(), 'full_perf_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'], r['teta'], r['phi'], r['Lp'], r['rp'], r['ns'], r['k'], r['kv'], r['kcz'], r['rcz'], r['model'], r['h'], r['hw'], r['zw'])),
+    41: (PerfDW(), 'part_perf_s', lambda r: (r['k'], r['kd'], r['rw'], r['rd'], r['teta'], r['phi'], r['Lp'], r['rp'], r['ns'], r['k'], r['kv'], r['kcz'], r['rcz'], r['h'], r['hw'], r['zw'])),
+}
+
+
+def skin_cases() -> dict:
+    """
+    Вызовы методов Skin/VectorSkin: имя -> функция (метод, аргументы) по словарю столбцов или строке
+    """
+    return {
+        'calc_Sd': lambda r: ('calc_Sd', (r['k'], r['kd'], r['rw'], r['rd'])),
+        'calc_Spp[papatzacos]': lambda r: ('calc_Spp', (0, r['h'], r['hw'], r['rw'], r['zw'], r['k'], r['kv'])),
+        'calc_Spp[vrbik]': lambda r: ('calc_Spp', (1, r['h'], r['hw'], r['rw'], r['zw'], r['k'], r['kv'])),
+        'Vrbik_func': lambda r: ('Vrbik_func', (r['hw']/r['h'], r['h']/r['rw'])),
+        'calc_Sp': lambda r: ('calc_Sp', (r['phi'], r['rw'], r['Lp'], r['rp'], r['ns'], r['k'], r['kv'])),
+        'calc_Sh': lambda r: ('calc_Sh', (r['rw'], 0.726, r['Lp'])),
+        'calc_Sv': lambda r: ('calc_Sv', ([-1.905, 0.1038, 1.5674, 1.6935], r['rp'], r['ns'], r['Lp'], r['k'], r['kv'])),
+        'calc_Swb': lambda r: ('calc_Swb', ([1.9/10**3, 6.155], r['rw'], r['Lp'])),
+        'calc_Scz': lambda r: ('calc_Scz', (r['ns'], r['Lp'], r['k'], r['kcz'], r['kd'], r['rcz'], r['rp'])),
+        'calc_Steta[cinco_ley]': lambda r: ('calc_Steta', (0, r['teta'], r['k'], r['kv'], r['h'], r['hw'], r['rw'], r['zw'])),
+        'calc_Steta[ozkan]': lambda r: ('calc_Steta', (1, r['teta'], r['k'], r['kv'], r['h'], r['hw'], r['rw'], r['zw'])),
+        'calc_Sopp': lambda r: ('calc_Sopp', (r['teta'], r['k'], r['kv'], r['h'], r['hw'], r['rw'], r['zw'])),
+        'g_func': lambda r: ('g_func', (r['hw'], r['rw'], -r['h'], r['h'])),
+    }
+
+
+def best_time(func, number: int, repeat: int) -> float:
+    """
+    Лучшее из repeat измерений времени number вызовов, в пересчете на один вызов, с
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat))/number
+
+
+def bench_skin(n: int, repeat: int) -> dict:
+    results = {}
+    c = corpus(41, n)
+    r_list = rows(c)
+    skin, vskin = Skin(), VectorSkin()
+    for name, case in skin_cases().items():
+        calls = [case(r) for r in r_list]
+        method = getattr(skin, calls[0][0])
+        args = [call[1] for call in calls]
+
+        def scalar():
+            for a in args:
+                method(*a)
+        per_call = best_time(scalar, 1, repeat)/n
+        results[f'skin.{name}.per_call'] = {'unit': 's', 'value': per_call}
+        method_name, vargs = case(c)
+        vmethod = getattr(vskin, method_name)
+        per_batch = best_time(lambda: vmethod(*vargs), 1, repeat)
+        results[f'skin.{name}.batch'] = {'unit': 's', 'value': per_batch, 'rows': n}
+    return results
+
+
+def bench_wells(n: int, repeat: int) -> dict:
+    results = {}
+    for type_ in TYPES:
+        c = corpus(type_, n)
+        r_list = rows(c)
+        well, method, args = SCALAR_WELLS[type_]
+        func = getattr(well, method)
+        arg_list = [args(r) for r in r_list]
+
+        def scalar():
+            for a in arg_list:
+                func(*a)
+        results[f'well.{type_}.{type(well).__name__}.{method}.per_call'] = {
+            'unit': 's', 'value': best_time(scalar, 1, repeat)/n}
+        results[f'well.{type_}.{type(well).__name__}.{method}.batch'] = {
+            'unit': 's', 'value': best_time(lambda: calc_skin(type_, c), 1, repeat), 'rows': n}
+    return results
+
+
+def bench_plot0(n: int, repeat: int) -> dict:
+    """
+    Сквозная задержка plot0 через тестовый клиент Django
+
+    Кеш ответов и хранилище сценариев отключаются: при повторах измерялось бы чтение
+    из кеша, а не расчет, и в базу данных не записываются результаты измерений.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skin.settings')
+    import django
+    django.setup()
+    from django.test import Client, override_settings
+    with override_settings(SKIN_CACHE=False, SKIN_STORE=False):
+        return _bench_plot0(Client(), n, repeat)
+
+
+def _bench_plot0(client, n: int, repeat: int) -> dict:
+    results = {}
+    for type_ in TYPES:
+        r_list = rows(corpus(type_, n))
+        times = []
+        for _ in range(repeat):
+            for r in r_list:
+                body = json.dumps({key: str(value) for key, value in r.items()})
+                start = time.perf_counter()
+                response = client.post('/api/plot0', body, content_type='application/json')
+                times.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f'plot0 {type_}: {response.status_code} {response.content[:200]}')
+        times = np.array(times)
+        results[f'plot0.{type_}.latency_p50'] = {'unit': 's', 'value': float(np.percentile(times, 50))}
+        results[f'plot0.{type_}.latency_p95'] = {'unit': 's', 'value': float(np.percentile(times, 95))}
+    return results
+
+
+def run(n: int = 2000, repeat: int = 5, plot0_n: int = 50, suites: tuple = ('skin', 'wells', 'plot0')) -> dict:
+    """
+    Запуск набора измерений
+
+    :param n: число скважин в наборе для методов Skin и классов скважин;
+    :param repeat: число повторов (берется лучшее время, для plot0 - все вызовы);
+    :param plot0_n: число запросов plot0 на каждый тип заканчивания;
+    :param suites: состав измерений: skin, wells, plot0;
+
+    :return: словарь {"meta": {...}, "results": {имя: {"unit": "s", "value": ...}}}, меньшее значение лучше
+    """
+    results = {}
+    if 'skin' in suites:
+        results.update(bench_skin(n, repeat))
+    if 'wells' in suites:
+        results.update(bench_wells(n, repeat))
+    if 'plot0' in suites:
+        results.update(bench_plot0(plot0_n, repeat))
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'n': n,
+            'repeat': repeat,
+            'plot0_n': plot0_n,
+            'types': list(COMPLETIONS),
+        },
+        'results': results,
+    }
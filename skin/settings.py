@@ -16,6 +16,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -23,6 +24,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.cache.ResponseCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'skin.urls'
@@ -73,3 +75,33 @@ USE_L10N = True
 USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+
+# Число одновременно выполняемых фоновых задач расчета (app.jobs)
+SKIN_JOBS_MAX_WORKERS = int(os.environ.get('SKIN_JOBS_MAX_WORKERS', 2))
+
+# Учет длительности этапов обработки запросов API (заголовок Server-Timing, /metrics)
+SKIN_METRICS = os.environ.get('SKIN_METRICS', '1') not in ('0', 'false', 'False', '')
+
+# Хранилище рассчитанных сценариев (app.store): включение, предельное число записей
+# и срок хранения записи с момента последнего обращения, сут
+SKIN_STORE = os.environ.get('SKIN_STORE', '1') not in ('0', 'false', 'False', '')
+SKIN_STORE_MAX_ROWS = int(os.environ.get('SKIN_STORE_MAX_ROWS', 100_000))
+SKIN_STORE_RETENTION_DAYS = float(os.environ.get('SKIN_STORE_RETENTION_DAYS', 30))
+
+# Кэш ответов расчетных конечных точек (app.cache): включение, число записей, срок хранения, с,
+# предельные размеры тела запроса и ответа, байт; при заданном SKIN_CACHE_DIR - файловый кэш
+SKIN_CACHE = os.environ.get('SKIN_CACHE', '1') not in ('0', 'false', 'False', '')
+SKIN_CACHE_MAX_BODY = int(os.environ.get('SKIN_CACHE_MAX_BODY', 1_000_000))
+SKIN_CACHE_MAX_BYTES = int(os.environ.get('SKIN_CACHE_MAX_BYTES', 5_000_000))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache' if os.environ.get('SKIN_CACHE_DIR')
+        else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.environ.get('SKIN_CACHE_DIR', 'skin-responses'),
+        'TIMEOUT': int(os.environ.get('SKIN_CACHE_TIMEOUT', 3600)),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('SKIN_CACHE_MAX_ENTRIES', 1000))},
+    },
+}